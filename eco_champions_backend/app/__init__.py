@@ -2,8 +2,9 @@ from flask import Flask
 from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
+from werkzeug.middleware.proxy_fix import ProxyFix
 from .config import Config
-from .database import db
+from .database import check_dialect, db
 from .socket import socketio
 
 migrate = Migrate()
@@ -13,13 +14,24 @@ jwt = JWTManager()
 def create_app() -> Flask:
 	app = Flask(__name__)
 	app.config.from_object(Config)
+	hops = app.config.get("PROXY_FIX_HOPS", 0)
+	if hops:
+		# real client address (rate limits per IP) behind the load balancer
+		app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops)
 
 	CORS(app, resources={r"/api/*": {"origins": app.config.get("CORS_ORIGINS", "*")}}, supports_credentials=True)
 
 	db.init_app(app)
+	check_dialect(app)
 	migrate.init_app(app, db)
 	jwt.init_app(app)
-	socketio.init_app(app, cors_allowed_origins=app.config.get("CORS_ORIGINS", "*"))
+	from .utils.tokens import token_revoked
+	jwt.token_in_blocklist_loader(token_revoked)
+	socketio.init_app(
+		app,
+		message_queue=app.config.get("SOCKETIO_MESSAGE_QUEUE"),
+		cors_allowed_origins=app.config.get("CORS_ORIGINS", "*"),
+	)
 
 	# Register blueprints (modules may be empty placeholders initially)
 	from .routes.auth import auth_bp
@@ -42,4 +54,7 @@ def create_app() -> Flask:
 	app.register_blueprint(events_bp, url_prefix="/api/events")
 	app.register_blueprint(community_bp, url_prefix="/api/community")
 
+	from .utils.metrics import init_metrics
+	init_metrics(app)
+
 	return app
@@ -5,19 +5,110 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _engine_options(url: str) -> dict:
+	"""Pool settings for SQLALCHEMY_ENGINE_OPTIONS (also applied to the replica bind).
+
+	Under eventlet every greenlet of a worker can hold a connection, so size
+	DB_POOL_SIZE + DB_MAX_OVERFLOW to the DB concurrency one worker should use
+	(not to SERVER_GREENLETS); greenlets beyond that queue for DB_POOL_TIMEOUT.
+	"""
+	if url.startswith("sqlite"):
+		# single file, no server-side connection limits; keep SQLAlchemy's defaults
+		return {}
+	return {
+		"pool_size": int(os.getenv("DB_POOL_SIZE", "10")),
+		"max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "20")),
+		"pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+		# below typical server/proxy idle timeouts, so pooled connections are not found dead
+		"pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+		"pool_pre_ping": True,
+	}
+
+
 class Config:
 	SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
 	JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "jwt-dev-secret")
 	SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///eco_champions.db")
 	SQLALCHEMY_TRACK_MODIFICATIONS = False
+	SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+	# Optional read replica for read-only views marked @read_replica (see database.RoutingSession)
+	DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+	SQLALCHEMY_BINDS = {"replica": DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
 
-	JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=7)
+	# Production server (serve.py): eventlet worker processes, concurrent greenlets per
+	# worker, and how long shutdown waits for in-flight requests after disconnecting sockets
+	SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+	SERVER_PORT = int(os.getenv("SERVER_PORT", "5000"))
+	SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+	SERVER_GREENLETS = int(os.getenv("SERVER_GREENLETS", "1000"))
+	SHUTDOWN_GRACE_SECONDS = float(os.getenv("SHUTDOWN_GRACE_SECONDS", "20"))
+	# run the cluster refresher on this host; set 0 on all hosts but one
+	SERVER_RUN_JOBS = os.getenv("SERVER_RUN_JOBS", "1") == "1"
+
+	# Access tokens are stateless and outlive /revoke until they expire
+	JWT_ACCESS_TOKEN_EXPIRES = timedelta(days=int(os.getenv("JWT_ACCESS_TOKEN_DAYS", "7")))
+	JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv("JWT_REFRESH_TOKEN_DAYS", "30")))
 
 	CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
 
 	# Socket.IO message queue (optional for scaling)
 	SOCKETIO_MESSAGE_QUEUE = os.getenv("REDIS_URL")
 
+	# Community clustering: number of clusters and background centroid refresh interval
+	CLUSTER_K = int(os.getenv("CLUSTER_K", "3"))
+	CLUSTER_REFRESH_SECONDS = int(os.getenv("CLUSTER_REFRESH_SECONDS", "600"))
+
+	# Socket chat sends: group-commit window and max rows per commit
+	CHAT_GROUP_COMMIT_MS = float(os.getenv("CHAT_GROUP_COMMIT_MS", "5"))
+	CHAT_GROUP_COMMIT_MAX = int(os.getenv("CHAT_GROUP_COMMIT_MAX", "500"))
+
+	# Max entries accepted by POST /api/recycling/bulk
+	RECYCLING_BULK_MAX = int(os.getenv("RECYCLING_BULK_MAX", "10000"))
+
+	# Leaderboards: optional shared Redis sorted sets; in-process boards resync from the DB
+	LEADERBOARD_REDIS_URL = os.getenv("LEADERBOARD_REDIS_URL")
+	LEADERBOARD_RESYNC_SECONDS = float(os.getenv("LEADERBOARD_RESYNC_SECONDS", "300"))
+
+	# Process cache for hot profile fields (is_premium, community, role); 0 disables
+	USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+
+	# Password hashing: werkzeug method string (e.g. "scrypt:32768:8:1", "pbkdf2:sha256:600000").
+	# Hashes are computed in eventlet's thread pool; older hashes are upgraded at login.
+	PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+	PASSWORD_SALT_LENGTH = int(os.getenv("PASSWORD_SALT_LENGTH", "16"))
+	PASSWORD_HASH_OFFLOAD = os.getenv("PASSWORD_HASH_OFFLOAD", "1") == "1"
+
+	# Token-bucket limits ("<requests>/<seconds>") on auth endpoints, checked before any DB
+	# work or hashing. Buckets live in process unless RATE_LIMIT_REDIS_URL (default REDIS_URL) is set.
+	RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+	RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", os.getenv("REDIS_URL"))
+	RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+	LOGIN_LIMIT_PER_IP = os.getenv("LOGIN_LIMIT_PER_IP", "20/60")
+	LOGIN_LIMIT_PER_EMAIL = os.getenv("LOGIN_LIMIT_PER_EMAIL", "5/60")
+	SIGNUP_LIMIT_PER_IP = os.getenv("SIGNUP_LIMIT_PER_IP", "5/60")
+	# Reverse proxies / load balancers in front of the app whose X-Forwarded-For and
+	# X-Forwarded-Proto are trusted; 0 uses the socket peer address (direct exposure)
+	PROXY_FIX_HOPS = int(os.getenv("PROXY_FIX_HOPS", "0"))
+
+	# Request metrics served on /metrics (Prometheus text; restrict it at the proxy), and the
+	# per-request SQL statement count above which a possible N+1 is logged
+	METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+	QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "20"))
+
+	# Cache lifetime of community member counts in the chat directory
+	COMMUNITY_COUNT_TTL_SECONDS = float(os.getenv("COMMUNITY_COUNT_TTL_SECONDS", "60"))
+
+	# Raw coin ledger rows older than this are compacted into daily rollups by
+	# `flask eco archive-ledger`; monthly partitions created ahead on Postgres
+	COIN_LEDGER_RETENTION_DAYS = int(os.getenv("COIN_LEDGER_RETENTION_DAYS", "365"))
+	COIN_LEDGER_PARTITIONS_AHEAD = int(os.getenv("COIN_LEDGER_PARTITIONS_AHEAD", "3"))
+
+	# Idempotency-Key responses for award/trade/log endpoints: kept this long, in process
+	# (LRU, at most IDEMPOTENCY_MAX_KEYS) unless IDEMPOTENCY_REDIS_URL (default REDIS_URL) is set
+	IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+	IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+	IDEMPOTENCY_REDIS_URL = os.getenv("IDEMPOTENCY_REDIS_URL", os.getenv("REDIS_URL"))
+
 	# Uploads
 	CLOUDINARY_URL = os.getenv("CLOUDINARY_URL")
 	UPLOAD_FOLDER = os.getenv("UPLOAD_FOLDER", "uploads")
@@ -29,3 +120,12 @@ class Config:
 	MAIL_PASSWORD = os.getenv("MAIL_PASSWORD")
 	MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", "true").lower() == "true"
 	MAIL_DEFAULT_SENDER = os.getenv("MAIL_DEFAULT_SENDER")
+
+	# Outbound mail queue (SQLite file, no Redis needed) and its worker pool
+	MAIL_QUEUE_PATH = os.getenv("MAIL_QUEUE_PATH", "mail_queue.db")
+	MAIL_WORKERS = int(os.getenv("MAIL_WORKERS", "2"))
+	MAIL_BATCH_SIZE = int(os.getenv("MAIL_BATCH_SIZE", "20"))
+	MAIL_MAX_ATTEMPTS = int(os.getenv("MAIL_MAX_ATTEMPTS", "5"))
+	MAIL_RETRY_BASE_SECONDS = float(os.getenv("MAIL_RETRY_BASE_SECONDS", "30"))
+	MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "1"))
+
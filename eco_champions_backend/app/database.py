@@ -1,5 +1,53 @@
+from flask import g, has_request_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+
+class RoutingSession(Session):
+	"""Sends the queries of views marked @read_replica to the "replica" bind
+	(DATABASE_REPLICA_URL) when one is configured. Flushes and INSERT/UPDATE/DELETE
+	statements always go to the primary.
+	"""
+
+	def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+		if (
+			bind is None
+			and not self._flushing
+			and not isinstance(clause, UpdateBase)
+			and has_request_context()
+			and g.get("read_replica")
+		):
+			replica = self._db.engines.get("replica")
+			if replica is not None:
+				return replica
+		return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
 
 # Global db instance
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+# dialects with INSERT ... ON CONFLICT, which upsert_insert (and so /log, awards) relies on
+SUPPORTED_DIALECTS = ("postgresql", "sqlite")
+
+
+def check_dialect(app) -> None:
+	"""Fail at startup, not on the first write, when the database can't upsert."""
+	with app.app_context():
+		dialect = db.engine.dialect.name
+	if dialect not in SUPPORTED_DIALECTS:
+		raise RuntimeError(f"Unsupported database {dialect!r}; use one of: {', '.join(SUPPORTED_DIALECTS)}")
+
+
+def upsert_insert(model):
+	"""Dialect INSERT supporting ``on_conflict_do_update`` (Postgres and SQLite)."""
+	dialect = db.session.get_bind().dialect.name
+	if dialect == "postgresql":
+		from sqlalchemy.dialects.postgresql import insert
+	elif dialect == "sqlite":
+		from sqlalchemy.dialects.sqlite import insert
+	else:
+		raise RuntimeError(f"Unsupported database {dialect!r}; use one of: {', '.join(SUPPORTED_DIALECTS)}")
+	return insert(model)
@@ -1,8 +1,25 @@
 import uuid
 from datetime import datetime
-from sqlalchemy.dialects.postgresql import UUID
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.types import TypeDecorator
 from .database import db
+from .utils.passwords import hash_password, verify_password
+
+
+class UUID(TypeDecorator):
+	"""Postgres UUID column that also accepts string ids (e.g. JWT identities).
+	Needed on SQLite, where the generic UUID bind step only takes uuid.UUID values.
+	"""
+
+	impl = PG_UUID
+	cache_ok = True
+
+	def process_bind_param(self, value, dialect):
+		if value is None or isinstance(value, uuid.UUID):
+			return value
+		return uuid.UUID(str(value))
 
 
 class User(db.Model):
@@ -20,7 +37,15 @@ class User(db.Model):
 	# Optional geolocation for clustering
 	latitude = db.Column(db.Float)
 	longitude = db.Column(db.Float)
+	# Geohash of (latitude, longitude) for indexed radius queries (see utils/spatial.py)
+	geohash = db.Column(db.String(12), index=True)
+	# Precomputed community cluster (see utils/clustering.py)
+	cluster_id = db.Column(db.Integer, index=True)
 	role = db.Column(db.String(50), default="Eco Learner")
+	# Running count of recycling logs (drives the every-third-log bonus)
+	recycling_log_count = db.Column(db.Integer, default=0)
+	# Bumped to revoke refresh tokens (see utils/tokens.py)
+	token_version = db.Column(db.Integer, default=0)
 	created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 	# relationships
@@ -31,10 +56,34 @@ class User(db.Model):
 	project_participations = db.relationship("ProjectParticipation", backref="user", lazy=True)
 
 	def set_password(self, password: str) -> None:
-		self.password_hash = generate_password_hash(password)
+		self.password_hash = hash_password(password)
 
 	def check_password(self, password: str) -> bool:
-		return check_password_hash(self.password_hash, password)
+		return verify_password(self.password_hash, password)
+
+
+class name_sort_key(FunctionElement):
+	"""``lower(name)`` in code point order: COLLATE "C" on Postgres, whose default
+	collations may not keep a name prefix contiguous (SQLite's BINARY already does).
+	"""
+	type = db.String()
+	inherit_cache = True
+
+
+@compiles(name_sort_key)
+def _name_sort_key(element, compiler, **kw):
+	return "lower(%s)" % compiler.process(element.clauses, **kw)
+
+
+@compiles(name_sort_key, "postgresql")
+def _name_sort_key_pg(element, compiler, **kw):
+	return 'lower(%s) COLLATE "C"' % compiler.process(element.clauses, **kw)
+
+
+# Chat directory (utils/directory.py): name-ordered keyset pages and name-prefix ranges,
+# per community and global; the community prefix also serves member counts
+db.Index("ix_user_community_name", User.community, name_sort_key(User.name), User.id)
+db.Index("ix_user_name", name_sort_key(User.name), User.id)
 
 
 class RecyclingLog(db.Model):
@@ -48,8 +97,26 @@ class RecyclingLog(db.Model):
 	date = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+class RecyclingMonthlyStat(db.Model):
+	"""Per-user, per-month, per-material totals, maintained alongside RecyclingLog inserts."""
+	__tablename__ = "recycling_monthly_stat"
+
+	user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'), primary_key=True)
+	month = db.Column(db.String(7), primary_key=True)  # "YYYY-MM"
+	material_type = db.Column(db.String(50), primary_key=True)
+	log_count = db.Column(db.Integer, default=0, nullable=False)
+	total_weight = db.Column(db.Float, default=0, nullable=False)
+
+
 class Project(db.Model):
 	__tablename__ = "project"
+	__table_args__ = (
+		# keyset listing (created_at desc, id desc) under each filter combination
+		db.Index("ix_project_status_material_created", "status", "goal_material", "created_at", "id"),
+		db.Index("ix_project_status_created", "status", "created_at", "id"),
+		db.Index("ix_project_material_created", "goal_material", "created_at", "id"),
+		db.Index("ix_project_created", "created_at", "id"),
+	)
 
 	id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 	title = db.Column(db.String(100))
@@ -61,6 +128,8 @@ class Project(db.Model):
 	days_left = db.Column(db.Integer)
 	created_by = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'))
 	created_at = db.Column(db.DateTime, default=datetime.utcnow)
+	# bumped on every ORM or Core UPDATE; feeds the listing ETag
+	updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 	participants = db.relationship("ProjectParticipation", backref="project", lazy=True)
 
@@ -75,21 +144,93 @@ class ProjectParticipation(db.Model):
 	joined_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+def conversation_key(user_a, user_b) -> str:
+	"""Order-independent key for the conversation between two users."""
+	a, b = sorted((str(user_a), str(user_b)))
+	return f"{a}:{b}"
+
+
+class Event(db.Model):
+	"""An event people register for. ``registered_count`` is only changed by the
+	conditional UPDATE in the register route, so it never passes ``capacity``.
+	"""
+	__tablename__ = "event"
+
+	id = db.Column(db.String(64), primary_key=True)  # client-facing eventId
+	title = db.Column(db.String(200))
+	capacity = db.Column(db.Integer)  # None = unlimited
+	registered_count = db.Column(db.Integer, default=0, nullable=False)
+	created_by = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'))
+	created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class EventRegistration(db.Model):
+	__tablename__ = "event_registration"
+	__table_args__ = (
+		db.Index("ux_event_registration_event_user", "event_id", "user_id", unique=True),
+		# attendee pages: event_id = ? AND (created_at, id) > cursor
+		db.Index("ix_event_registration_event_created", "event_id", "created_at", "id"),
+	)
+
+	id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+	event_id = db.Column(db.String(64), db.ForeignKey('event.id'), nullable=False)
+	user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'), nullable=False)
+	paid = db.Column(db.Boolean, default=False, nullable=False)
+	created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
 class ChatMessage(db.Model):
 	__tablename__ = "chat_message"
+	__table_args__ = (
+		# history pages are one range scan: key = ? AND (timestamp, id) < cursor
+		db.Index("ix_chat_message_conversation", "conversation_key", "timestamp", "id"),
+	)
 
 	id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 	sender_id = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'))
 	receiver_id = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'))
+	conversation_key = db.Column(db.String(73))
 	message = db.Column(db.Text)
 	timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
 
 class CoinTransaction(db.Model):
+	"""Append-only coin ledger. On Postgres it can be range-partitioned by month
+	(``flask eco partition-ledger``); old rows are compacted into CoinDailyRollup.
+	"""
 	__tablename__ = "coin_transaction"
+	__table_args__ = (
+		# per-user history pages: user_id = ? AND (timestamp, id) < cursor
+		db.Index("ix_coin_transaction_user_time", "user_id", "timestamp", "id"),
+		# archival and month rebuilds scan by time
+		db.Index("ix_coin_transaction_time", "timestamp"),
+	)
 
 	id = db.Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 	user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'))
 	amount = db.Column(db.Integer)
 	reason = db.Column(db.String(100))
 	timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class CoinDailyRollup(db.Model):
+	"""Per-user, per-UTC-day coin totals, maintained alongside CoinTransaction inserts."""
+	__tablename__ = "coin_daily_rollup"
+	__table_args__ = (
+		db.Index("ix_coin_daily_rollup_day", "day"),
+	)
+
+	user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('user.id'), primary_key=True)
+	day = db.Column(db.Date, primary_key=True)
+	total = db.Column(db.Integer, default=0, nullable=False)
+	tx_count = db.Column(db.Integer, default=0, nullable=False)
+
+
+class CommunityCluster(db.Model):
+	__tablename__ = "community_cluster"
+
+	id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+	latitude = db.Column(db.Float, nullable=False)
+	longitude = db.Column(db.Float, nullable=False)
+	member_count = db.Column(db.Integer, default=0)
+	updated_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,14 +1,19 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 from ..database import db
 from ..models import User
+from ..utils.decorators import current_user, jwt_required_json
+from ..utils.directory import member_counts
+from ..utils.passwords import needs_rehash, verify_password
+from ..utils.rate_limit import client_ip, json_email, rate_limit
+from ..utils.tokens import issue_tokens, revoke_tokens
 from ..utils.validators import require_fields
 
 auth_bp = Blueprint("auth", __name__)
 
 
 @auth_bp.post("/signup")
+@rate_limit("signup", [(client_ip, "SIGNUP_LIMIT_PER_IP")])
 def signup():
 	data = request.get_json() or {}
 	try:
@@ -18,19 +23,22 @@ def signup():
 
 	if User.query.filter_by(email=data["email"]).first():
 		return jsonify({"error": "Email already registered"}), 400
+	# end the read so the pooled connection is not held through the slow hash below
+	db.session.commit()
 
 	user = User(
 		name=data["name"],
 		email=data["email"],
 		community=data.get("community"),
 	)
-	user.password_hash = generate_password_hash(data["password"]) 
+	user.set_password(data["password"])
 	db.session.add(user)
 	db.session.commit()
+	if user.community:
+		member_counts.invalidate(user.community)
 
-	token = create_access_token(identity=str(user.id))
 	return jsonify({
-		"token": token,
+		**issue_tokens(user),
 		"user": {
 			"id": str(user.id),
 			"name": user.name,
@@ -42,6 +50,7 @@ def signup():
 
 
 @auth_bp.post("/login")
+@rate_limit("login", [(client_ip, "LOGIN_LIMIT_PER_IP"), (json_email, "LOGIN_LIMIT_PER_EMAIL")])
 def login():
 	data = request.get_json() or {}
 	try:
@@ -50,12 +59,18 @@ def login():
 		return jsonify({"error": str(e)}), 400
 
 	user = User.query.filter_by(email=data["email"]).first()
-	if not user or not check_password_hash(user.password_hash, data["password"]):
+	pwhash = user.password_hash if user else None
+	# end the read so the pooled connection is not held through the slow hash below
+	db.session.commit()
+	if not user or not verify_password(pwhash, data["password"]):
 		return jsonify({"error": "Invalid credentials"}), 401
+	if needs_rehash(pwhash):
+		# hashing parameters changed since this hash was made: upgrade it while we have the password
+		user.set_password(data["password"])
+		db.session.commit()
 
-	token = create_access_token(identity=str(user.id))
 	return jsonify({
-		"token": token,
+		**issue_tokens(user),
 		"user": {
 			"id": str(user.id),
 			"name": user.name,
@@ -64,3 +79,28 @@ def login():
 			"role": user.role,
 		}
 	}), 200
+
+
+@auth_bp.post("/refresh")
+def refresh():
+	"""Exchange a refresh token (Authorization: Bearer <refreshToken>) for new tokens."""
+	try:
+		verify_jwt_in_request(refresh=True)
+	except Exception:
+		# also raised for refresh tokens revoked by /revoke
+		return jsonify({"error": "Unauthorized"}), 401
+	user = current_user()
+	if not user:
+		return jsonify({"error": "User not found"}), 404
+	return jsonify(issue_tokens(user)), 200
+
+
+@auth_bp.post("/revoke")
+@jwt_required_json
+def revoke():
+	"""Sign out everywhere: invalidates all refresh tokens of the caller.
+	Outstanding access tokens lapse at JWT_ACCESS_TOKEN_EXPIRES.
+	"""
+	if not revoke_tokens(get_jwt_identity()):
+		return jsonify({"error": "User not found"}), 404
+	return jsonify({"ok": True}), 200
@@ -1,86 +1,136 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import get_jwt_identity
+from flask import Blueprint, abort, jsonify, make_response, request
+from sqlalchemy import and_, or_
 from ..database import db
-from ..socket import socketio
-from ..models import User, ChatMessage
-from ..utils.decorators import jwt_required_json, premium_required
+from ..socket import emit_to_users
+from ..models import User, ChatMessage, conversation_key
+from ..utils.decorators import caller_profile, current_user, jwt_required_json, premium_required, read_replica
+from ..utils.chat_writer import message_payload, new_message_row
+from ..utils.directory import community_member_count, directory_page
+from ..utils.pagination import decode_time_cursor, encode_cursor, parse_limit
+from ..utils.user_cache import cached_profile
 
 chat_bp = Blueprint("chat", __name__)
 
 
 @chat_bp.get("/community")
+@read_replica
 @jwt_required_json
 def list_community_users():
-	user = User.query.get(get_jwt_identity())
-	if not user:
+	"""Members of the caller's community in name order.
+	Optional query params: q (name prefix), limit (default 50, max 200), cursor (from nextCursor)
+	"""
+	me = caller_profile()
+	if not me:
 		return jsonify({"error": "User not found"}), 404
-	users = User.query.filter(User.community == user.community, User.id != user.id).all()
-	return jsonify([{ "id": str(u.id), "name": u.name, "community": u.community } for u in users])
+	if not me["community"]:
+		return jsonify({"users": [], "nextCursor": None, "memberCount": 0}), 200
+	query = User.query.filter(User.community == me["community"], User.id != me["id"])
+	page = _directory(query)
+	page["memberCount"] = community_member_count(me["community"])
+	return jsonify(page), 200
 
 
 @chat_bp.get("/global")
+@read_replica
 @premium_required
 def list_global_users():
-	current_user = User.query.get(get_jwt_identity())
-	users = User.query.filter(User.id != current_user.id).all()
-	return jsonify([{ "id": str(u.id), "name": u.name, "community": u.community } for u in users])
+	"""All users in name order (premium only). Same query params as /community."""
+	me = caller_profile()
+	return jsonify(_directory(User.query.filter(User.id != me["id"]))), 200
+
+
+def _directory(query) -> dict:
+	"""A directory page for the request's q/limit/cursor; aborts with 400 on bad params."""
+	try:
+		limit = parse_limit(request.args)
+		users, next_cursor = directory_page(query, request.args.get("q"), limit, request.args.get("cursor"))
+	except ValueError:
+		abort(make_response(jsonify({"error": "Invalid limit or cursor"}), 400))
+	return {
+		"users": [{ "id": str(u.id), "name": u.name, "community": u.community } for u in users],
+		"nextCursor": next_cursor,
+	}
 
 
 @chat_bp.get("/conversation/<user_id>")
+@read_replica
 @jwt_required_json
 def conversation(user_id):
-	me = User.query.get(get_jwt_identity())
-	other = User.query.get(user_id)
-	if not other:
+	"""Conversation history, newest page first.
+	Optional query params: limit (default 50, max 200), before (cursor from nextBefore)
+	"""
+	me = caller_profile()
+	other = cached_profile(user_id)
+	if not me or not other:
 		return jsonify({"error": "User not found"}), 404
 	# non-premium restriction
-	if not me.is_premium and me.community != other.community:
+	if not me["is_premium"] and me["community"] != other["community"]:
 		return jsonify({"error": "Free users can only chat within community"}), 403
 
-	msgs = ChatMessage.query.filter(
-		((ChatMessage.sender_id == me.id) & (ChatMessage.receiver_id == other.id)) |
-		((ChatMessage.sender_id == other.id) & (ChatMessage.receiver_id == me.id))
-	).order_by(ChatMessage.timestamp.asc()).all()
-
-	return jsonify([
-		{
-			"id": str(m.id),
-			"from": str(m.sender_id),
-			"to": str(m.receiver_id),
-			"message": m.message,
-			"timestamp": m.timestamp.isoformat(),
-		}
-		for m in msgs
-	])
+	try:
+		limit = parse_limit(request.args)
+		before = decode_time_cursor(request.args["before"]) if request.args.get("before") else None
+	except ValueError:
+		return jsonify({"error": "Invalid limit or before cursor"}), 400
+
+	# newest page first via the (conversation_key, timestamp, id) index, returned oldest-first
+	query = ChatMessage.query.filter(ChatMessage.conversation_key == conversation_key(me["id"], other["id"]))
+	if before:
+		ts, msg_id = before
+		query = query.filter(or_(
+			ChatMessage.timestamp < ts,
+			and_(ChatMessage.timestamp == ts, ChatMessage.id < msg_id),
+		))
+	msgs = query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(limit + 1).all()
+	has_more = len(msgs) > limit
+	msgs = msgs[:limit][::-1]
+
+	return jsonify({
+		"messages": [
+			{
+				"id": str(m.id),
+				"from": str(m.sender_id),
+				"to": str(m.receiver_id),
+				"message": m.message,
+				"timestamp": m.timestamp.isoformat(),
+			}
+			for m in msgs
+		],
+		# pass as ?before= to load the next older page
+		"nextBefore": encode_cursor(msgs[0].timestamp, msgs[0].id) if has_more else None,
+	})
 
 
 @chat_bp.post("/message")
 @jwt_required_json
 def send_message():
-	me = User.query.get(get_jwt_identity())
+	"""REST fallback for clients without a socket; the socket send_message event is preferred."""
+	me = caller_profile()
 	data = request.get_json() or {}
 	to = data.get("to")
 	message = data.get("message")
-	other = User.query.get(to)
-	if not other:
+	other = cached_profile(to) if to else None
+	if not me or not other:
 		return jsonify({"error": "User not found"}), 404
 	if not message:
 		return jsonify({"error": "Message required"}), 400
 
-	if not me.is_premium and me.community != other.community:
+	if not me["is_premium"] and me["community"] != other["community"]:
 		return jsonify({"error": "Free users can only chat within community"}), 403
 
-	msg = ChatMessage(sender_id=me.id, receiver_id=other.id, message=message)
-	db.session.add(msg)
+	row = new_message_row(me["id"], other["id"], message)
+	db.session.add(ChatMessage(**row))
 	db.session.commit()
+	# push in real time too, so REST senders need no second socket emit
+	emit_to_users("receive_message", message_payload(row), [other["id"], me["id"]])
 
-	return jsonify({"id": str(msg.id)}), 201
+	return jsonify({"id": str(row["id"])}), 201
 
 
 @chat_bp.delete("/message/<message_id>")
 @jwt_required_json
 def delete_message(message_id):
-	me = User.query.get(get_jwt_identity())
+	me = current_user()
 	msg = ChatMessage.query.get(message_id)
 	if not msg:
 		return jsonify({"error": "Message not found"}), 404
@@ -94,7 +144,22 @@ def delete_message(message_id):
 		db.session.delete(msg)
 		db.session.commit()
 		# Emit real-time deletion event to clients
-		socketio.emit("message_deleted", {"id": deleted_id, **chat_between}, broadcast=True)
+		emit_to_users("message_deleted", {"id": deleted_id, **chat_between}, [chat_between["from"], chat_between["to"]])
 		return jsonify({"ok": True}), 200
 	except Exception:
 		return jsonify({"error": "Failed to delete"}), 500
+
+
+@chat_bp.cli.command("backfill-keys")
+def backfill_conversation_keys():
+	"""Fill conversation_key on messages stored before the column existed."""
+	total = 0
+	while True:
+		batch = ChatMessage.query.filter(ChatMessage.conversation_key.is_(None)).limit(1000).all()
+		if not batch:
+			break
+		for m in batch:
+			m.conversation_key = conversation_key(m.sender_id, m.receiver_id)
+		db.session.commit()
+		total += len(batch)
+	print(f"Backfilled {total} messages")
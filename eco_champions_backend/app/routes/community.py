@@ -1,28 +1,34 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import get_jwt_identity
 from ..database import db
 from ..models import User
-from ..utils.decorators import jwt_required_json
-from ..utils.geo import haversine_km, kmeans_once
+from ..utils.decorators import current_user, jwt_required_json
+from ..utils.geo import haversine_km
+from ..utils.clustering import assign_user_cluster, refresh_clusters
+from ..utils.spatial import nearby_users, set_user_location
+from ..utils.validators import parse_coordinates, parse_radius_km
 
 
 community_bp = Blueprint("community", __name__)
 
+MAX_RADIUS_KM = 500.0
+
 
 @community_bp.post("/location")
 @jwt_required_json
 def save_location():
 	data = request.get_json() or {}
-	lat = data.get("latitude")
-	lon = data.get("longitude")
-	if lat is None or lon is None:
+	if data.get("latitude") is None or data.get("longitude") is None:
 		return jsonify({"error": "latitude and longitude required"}), 400
-	user = User.query.get(get_jwt_identity())
+	try:
+		lat, lon = parse_coordinates(data["latitude"], data["longitude"])
+	except ValueError as e:
+		return jsonify({"error": str(e)}), 400
+	user = current_user()
 	if not user:
 		return jsonify({"error": "User not found"}), 404
 	try:
-		user.latitude = float(lat)
-		user.longitude = float(lon)
+		set_user_location(user, lat, lon)
+		assign_user_cluster(user)
 		db.session.commit()
 		return jsonify({"ok": True}), 200
 	except Exception:
@@ -32,41 +38,66 @@ def save_location():
 @community_bp.get("/clusters")
 @jwt_required_json
 def clusters():
-	"""Cluster users based on lat/lon; returns clusters for the caller's area.
-	Optional query params: k (default 3), radiusKm (filter cluster neighbors by distance)
+	"""Return members of the caller's precomputed cluster.
+	Assignments are kept current by save_location and the background refresher
+	(utils/clustering.py); the cluster count comes from Config.CLUSTER_K.
+	Optional query params: radiusKm (filter cluster neighbors by distance, max 500)
+	"""
+	try:
+		radius = parse_radius_km(request.args.get("radiusKm"), 0, MAX_RADIUS_KM)
+	except ValueError as e:
+		return jsonify({"error": str(e)}), 400
+	current = current_user()
+	if not current or current.latitude is None or current.longitude is None:
+		return jsonify({"error": "Current user location not set"}), 400
+	if current.cluster_id is None:
+		if assign_user_cluster(current) is None:
+			# no centroids yet (fresh deployment): the refresher seeds them at startup
+			resp = jsonify({"error": "Clusters are still being built"})
+			resp.headers["Retry-After"] = "30"
+			return resp, 503
+		db.session.commit()
+
+	members = User.query.filter(User.cluster_id == current.cluster_id)
+	if radius:
+		pairs = nearby_users(current.latitude, current.longitude, radius, query=members)
+	else:
+		pairs = [
+			(u, haversine_km(current.latitude, current.longitude, u.latitude, u.longitude))
+			for u in members.all()
+		]
+	return jsonify({"cluster": [_located_user(u, dist) for u, dist in pairs]}), 200
+
+
+@community_bp.get("/nearby")
+@jwt_required_json
+def nearby():
+	"""Users within radiusKm of the caller, nearest first.
+	Optional query params: radiusKm (default 10, max 500), limit (default 50, max 200)
 	"""
-	current = User.query.get(get_jwt_identity())
+	current = current_user()
 	if not current or current.latitude is None or current.longitude is None:
 		return jsonify({"error": "Current user location not set"}), 400
-	users = User.query.filter(User.latitude.isnot(None), User.longitude.isnot(None)).all()
-	points = [(u.latitude, u.longitude) for u in users]
-	k = int(request.args.get("k", 3))
-	clusters = kmeans_once(points, k)
-	# find which cluster current user belongs to (closest centroid heuristic)
-	# simple approach: choose cluster that contains current user's index if exact match; else nearest by distance
 	try:
-		me_index = users.index(current)
-		for ci, cluster in enumerate(clusters):
-			if me_index in cluster:
-				my_cluster = ci
-				break
-		except ValueError:
-		my_cluster = 0
+		radius = parse_radius_km(request.args.get("radiusKm"), 10, MAX_RADIUS_KM)
+		limit = min(max(int(request.args.get("limit", 50)), 1), 200)
+	except ValueError:
+		return jsonify({"error": "radiusKm and limit must be numbers"}), 400
+	pairs = nearby_users(current.latitude, current.longitude, radius, limit=limit, query=User.query.filter(User.id != current.id))
+	return jsonify({"users": [_located_user(u, dist) for u, dist in pairs]}), 200
+
 
-	result = []
-	radius = float(request.args.get("radiusKm", 0))
-	for idx in clusters[my_cluster]:
-		u = users[idx]
-		dist = haversine_km(current.latitude, current.longitude, u.latitude, u.longitude)
-		if radius and dist > radius:
-			continue
-		result.append({
-			"id": str(u.id),
-			"name": u.name,
-			"latitude": u.latitude,
-			"longitude": u.longitude,
-			"distanceKm": round(dist, 2),
-		})
-	return jsonify({"cluster": result}), 200
+def _located_user(u: User, dist: float) -> dict:
+	return {
+		"id": str(u.id),
+		"name": u.name,
+		"latitude": u.latitude,
+		"longitude": u.longitude,
+		"distanceKm": round(dist, 2),
+	}
 
 
+@community_bp.cli.command("refresh-clusters")
+def refresh_clusters_command():
+	"""Build (or rebuild) the community cluster centroids and assignments."""
+	print(f"Reassigned {refresh_clusters()} users")
@@ -1,7 +1,16 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import get_jwt_identity
-from ..utils.decorators import jwt_required_json
-from ..utils.coin_manager import award_coins
+from datetime import datetime, timedelta
+import click
+from flask import Blueprint, current_app, request, jsonify
+from ..database import db
+from ..utils.decorators import caller_profile, current_user, jwt_required_json, read_replica
+from ..utils.coin_ledger import (
+	archive_before, backfill_rollups, convert_to_partitioned, earned_summary, ensure_partitions, history_page,
+	is_partitioned,
+)
+from ..utils.coin_manager import award_coins_bulk
+from ..utils.idempotency import idempotent
+from ..utils.leaderboard import GLOBAL, community_board, leaderboards, month_board
+from ..utils.pagination import decode_time_cursor, encode_cursor, parse_limit
 from ..models import User
 
 eco_score_bp = Blueprint("eco", __name__)
@@ -9,14 +18,165 @@ eco_score_bp = Blueprint("eco", __name__)
 
 @eco_score_bp.post("/award")
 @jwt_required_json
+@idempotent
 def award():
 	data = request.get_json() or {}
 	amount = int(data.get("amount", 0))
 	reason = data.get("reason", "Manual Award")
-	user_id = get_jwt_identity()
-	user = award_coins(user_id, amount, reason)
+	user = current_user()
+	if not user:
+		return jsonify({"error": "User not found"}), 404
+	# the UPDATE ... RETURNING values, so the response needs no reload
+	coins, role = award_coins_bulk([(user.id, amount, reason)])[user.id]
 	return jsonify({
 		"id": str(user.id),
-		"ecoCoins": user.eco_coins,
-		"role": user.role,
+		"ecoCoins": coins,
+		"role": role,
 	}), 200
+
+
+def _board_key(scope: str, user: User):
+	if scope == "global":
+		return GLOBAL
+	if scope == "community":
+		return community_board(user.community) if user.community else None
+	if scope == "monthly":
+		month = request.args.get("month")
+		if month:
+			try:
+				datetime.strptime(month, "%Y-%m")
+			except ValueError:
+				return None
+		return month_board(month)
+	return None
+
+
+@eco_score_bp.get("/leaderboard")
+@jwt_required_json
+def leaderboard():
+	"""Top-N ranking plus the caller's own rank.
+	Optional query params: scope (global | community | monthly, default global),
+	month ("YYYY-MM" for monthly), limit (default 10, max 100)
+	"""
+	user = current_user()
+	if not user:
+		return jsonify({"error": "User not found"}), 404
+	scope = request.args.get("scope", "global")
+	key = _board_key(scope, user)
+	if key is None:
+		return jsonify({"error": "Invalid scope or month"}), 400
+	try:
+		limit = parse_limit(request.args, default=10, maximum=100)
+	except ValueError:
+		return jsonify({"error": "Invalid limit"}), 400
+
+	board = leaderboards.board(key)
+	top = board.top(limit)
+	names = {
+		str(uid): name
+		for uid, name in db.session.query(User.id, User.name).filter(User.id.in_([uid for uid, _ in top]))
+	} if top else {}
+	mine = board.rank(str(user.id))
+	return jsonify({
+		"scope": scope,
+		"entries": [
+			{"rank": i + 1, "userId": uid, "name": names.get(uid), "score": int(score)}
+			for i, (uid, score) in enumerate(top)
+		],
+		"me": {"rank": mine[0] + 1, "score": int(mine[1])} if mine else None,
+	}), 200
+
+
+@eco_score_bp.get("/leaderboard/me")
+@jwt_required_json
+def leaderboard_rank():
+	"""The caller's rank in each scope (monthly is the current month)."""
+	user = current_user()
+	if not user:
+		return jsonify({"error": "User not found"}), 404
+	result = {}
+	for scope in ("global", "community", "monthly"):
+		key = _board_key(scope, user)
+		mine = leaderboards.board(key).rank(str(user.id)) if key else None
+		result[scope] = {"rank": mine[0] + 1, "score": int(mine[1])} if mine else None
+	return jsonify(result), 200
+
+
+@eco_score_bp.get("/coins/history")
+@read_replica
+@jwt_required_json
+def coin_history():
+	"""The caller's coin transactions, newest first.
+	Optional query params: limit (default 50, max 200), before (from nextCursor).
+	Rows older than COIN_LEDGER_RETENTION_DAYS may have been archived into the summary.
+	"""
+	me = caller_profile()
+	if not me:
+		return jsonify({"error": "User not found"}), 404
+	try:
+		limit = parse_limit(request.args)
+		before = decode_time_cursor(request.args["before"]) if request.args.get("before") else None
+	except ValueError:
+		return jsonify({"error": "Invalid limit or before cursor"}), 400
+	rows, next_key = history_page(me["id"], limit, before)
+	return jsonify({
+		"transactions": [
+			{"id": str(t.id), "amount": t.amount, "reason": t.reason, "timestamp": t.timestamp.isoformat()}
+			for t in rows
+		],
+		"nextCursor": encode_cursor(*next_key) if next_key else None,
+	}), 200
+
+
+@eco_score_bp.get("/coins/summary")
+@read_replica
+@jwt_required_json
+def coin_summary():
+	"""Coins earned today, this week (from Monday) and this month, UTC."""
+	me = caller_profile()
+	if not me:
+		return jsonify({"error": "User not found"}), 404
+	return jsonify(earned_summary(me["id"])), 200
+
+
+@eco_score_bp.cli.command("backfill-rollups")
+def backfill_coin_rollups():
+	"""Rebuild daily coin rollups from the ledger (run while awards are quiet)."""
+	print(f"Wrote {backfill_rollups()} rollup rows")
+
+
+@eco_score_bp.cli.command("rebuild-leaderboards")
+def rebuild_leaderboards():
+	"""Reload the global, per-community and current-month boards from the database,
+	e.g. after a failed leaderboard update left the shared Redis boards behind.
+	"""
+	communities = [c for (c,) in db.session.query(User.community).filter(User.community.isnot(None)).distinct()]
+	keys = [GLOBAL, month_board()] + [community_board(c) for c in communities]
+	for key in keys:
+		leaderboards.rebuild(key)
+	print(f"Rebuilt {len(keys)} leaderboards")
+
+
+@eco_score_bp.cli.command("partition-ledger")
+def partition_ledger():
+	"""Postgres: partition coin_transaction by month (once), then create upcoming months.
+	Run monthly, e.g. from cron.
+	"""
+	if db.session.get_bind().dialect.name != "postgresql":
+		print("Ledger partitioning needs Postgres; other databases rely on the indexes and archive-ledger")
+		return
+	ahead = current_app.config["COIN_LEDGER_PARTITIONS_AHEAD"]
+	if not is_partitioned():
+		print(f"Partitioned coin_transaction, copied {convert_to_partitioned(ahead)} rows")
+	created = ensure_partitions(ahead)
+	db.session.commit()
+	print(f"Created partitions: {', '.join(created) or 'none'}")
+
+
+@eco_score_bp.cli.command("archive-ledger")
+@click.option("--days", type=int, default=None, help="Keep this many days of raw rows (default COIN_LEDGER_RETENTION_DAYS).")
+def archive_ledger(days):
+	"""Compact raw coin transactions older than the retention window into daily rollups."""
+	days = current_app.config["COIN_LEDGER_RETENTION_DAYS"] if days is None else days
+	removed = archive_before(datetime.utcnow() - timedelta(days=days))
+	print(f"Archived {removed} coin transactions")
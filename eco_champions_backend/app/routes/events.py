@@ -1,44 +1,215 @@
+import uuid
+import click
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import get_jwt_identity
-from ..database import db
-from ..models import User
-from ..utils.decorators import jwt_required_json
-from ..utils.mailer import send_mail
+from sqlalchemy import and_, or_, update
+from ..database import db, upsert_insert
+from ..models import Event, EventRegistration, User
+from ..utils.decorators import current_user, jwt_required_json, read_replica
+from ..utils.mail_queue import enqueue_mail
+from ..utils.pagination import decode_time_cursor, encode_cursor, parse_limit
 
 
 events_bp = Blueprint("events", __name__)
 
 
+def _parse_capacity(value):
+	"""None (unlimited) or a non-negative int; raises ValueError otherwise."""
+	if value is None:
+		return None
+	try:
+		capacity = int(value)
+	except (TypeError, ValueError):
+		raise ValueError("capacity must be an integer")
+	if capacity < 0:
+		raise ValueError("capacity must not be negative")
+	return capacity
+
+
+@events_bp.post("/create")
+@jwt_required_json
+def create_event():
+	"""Create an event owned by the caller, who can later change it with PATCH.
+	Body: { "title": string, "capacity": int (optional, omit for unlimited) }
+	The id is generated, so nobody can take over an id registrations already use.
+	"""
+	data = request.get_json() or {}
+	try:
+		capacity = _parse_capacity(data.get("capacity"))
+	except ValueError as e:
+		return jsonify({"error": str(e)}), 400
+	event_id = str(uuid.uuid4())
+
+	db.session.add(Event(id=event_id, title=data.get("title"), capacity=capacity, created_by=get_jwt_identity()))
+	db.session.commit()
+	return jsonify({"eventId": event_id, "capacity": capacity}), 201
+
+
+@events_bp.patch("/<event_id>")
+@jwt_required_json
+def update_event(event_id):
+	"""Change an event's title or capacity; creator only.
+	Body: { "title": string (optional), "capacity": int or null (optional, null = unlimited) }
+	Capacity can't go below the seats already taken.
+	"""
+	data = request.get_json() or {}
+	values = {}
+	if "title" in data:
+		values["title"] = data["title"]
+	if "capacity" in data:
+		try:
+			values["capacity"] = _parse_capacity(data["capacity"])
+		except ValueError as e:
+			return jsonify({"error": str(e)}), 400
+	if not values:
+		return jsonify({"error": "Nothing to update"}), 400
+
+	event = db.session.get(Event, event_id)
+	if not event:
+		return jsonify({"error": "Event not found"}), 404
+	if event.created_by != uuid.UUID(str(get_jwt_identity())):
+		return jsonify({"error": "Only the organiser can change the event"}), 403
+	# checked in the UPDATE so a registration racing with it can't overbook
+	conditions = [Event.id == event_id]
+	if values.get("capacity") is not None:
+		conditions.append(Event.registered_count <= values["capacity"])
+	row = db.session.execute(
+		update(Event).where(*conditions).values(**values)
+		.returning(Event.title, Event.capacity, Event.registered_count)
+		.execution_options(synchronize_session=False)
+	).first()
+	if row is None:
+		db.session.rollback()
+		return jsonify({"error": "capacity is below the number of registrations"}), 409
+	db.session.commit()
+	return jsonify({"eventId": event_id, "title": row.title, "capacity": row.capacity, "registeredCount": row.registered_count}), 200
+
+
 @events_bp.post("/register")
 @jwt_required_json
 def register_event():
 	"""Register user for an event. If free, mark as registered. If paid,
 	client should process payment first, then call this with paid=true.
 	Body: { "eventId": string, "free": bool, "paid": bool, "title": string }
+	Unknown eventIds (the app's built-in event list) are created with unlimited capacity
+	and no owner; operators set their capacity with `flask events set-capacity`.
+	A confirmation email is queued for the mail workers once the seat is committed.
 	"""
 	data = request.get_json() or {}
-	user = User.query.get(get_jwt_identity())
-	if not user:
-		return jsonify({"error": "User not found"}), 404
-	if not data.get("eventId"):
+	user_id = get_jwt_identity()
+	event_id = str(data.get("eventId") or "")
+	if not event_id:
 		return jsonify({"error": "eventId required"}), 400
+	if len(event_id) > 64:
+		return jsonify({"error": "eventId too long"}), 400
 
 	free = bool(data.get("free", False))
 	paid = bool(data.get("paid", False))
 	if not free and not paid:
 		return jsonify({"error": "Payment required for paid event"}), 400
+	user = current_user()
+	if not user:
+		return jsonify({"error": "User not found"}), 404
 
-	# Here you'd persist registration to DB; for now, acknowledge.
-	# Send notification email
-	title = data.get("title") or "your event"
-	mail_err = send_mail(
-		user.email,
-		"Thank you for registering",
-		f"Thank you for registering for {title}. See you there!",
+	db.session.execute(
+		upsert_insert(Event).values(id=event_id, title=data.get("title"), registered_count=0)
+		.on_conflict_do_nothing(index_elements=["id"])
 	)
+	# the unique (event_id, user_id) index makes a repeat a no-op
+	reg_id = db.session.execute(
+		upsert_insert(EventRegistration).values(id=uuid.uuid4(), event_id=event_id, user_id=user_id, paid=paid)
+		.on_conflict_do_nothing(index_elements=["event_id", "user_id"])
+		.returning(EventRegistration.id)
+	).scalar()
+	if reg_id is None:
+		db.session.rollback()
+		return jsonify({"registered": True, "alreadyRegistered": True}), 200
+
+	# take a seat only if one is left; the row lock serializes concurrent registrations
+	seat = db.session.execute(
+		update(Event)
+		.where(Event.id == event_id, or_(Event.capacity.is_(None), Event.registered_count < Event.capacity))
+		.values(registered_count=Event.registered_count + 1)
+		.returning(Event.registered_count, Event.capacity, Event.title)
+		.execution_options(synchronize_session=False)
+	).first()
+	if seat is None:
+		db.session.rollback()
+		return jsonify({"error": "Event is sold out"}), 409
+	email = user.email
+	db.session.commit()
+
+	result = {"registered": True, "registeredCount": seat.registered_count, "capacity": seat.capacity}
+	title = seat.title or data.get("title") or "your event"
+	mail_err = enqueue_mail(email, "Thank you for registering", f"Thank you for registering for {title}. See you there!")
 	if mail_err:
-		# Non-blocking: return success but include mail error
-		return jsonify({"registered": True, "mailError": mail_err}), 200
-	return jsonify({"registered": True}), 200
+		# the registration stands; report the mail problem alongside it
+		result["mailError"] = mail_err
+	return jsonify(result), 200
 
 
+@events_bp.get("/<event_id>/attendees")
+@read_replica
+@jwt_required_json
+def list_attendees(event_id):
+	"""Registrants in registration order; visible to the event's creator and attendees.
+	Optional query params: limit (default 50, max 200), cursor (from nextCursor)
+	"""
+	event = db.session.get(Event, event_id)
+	if not event:
+		return jsonify({"error": "Event not found"}), 404
+	me = uuid.UUID(str(get_jwt_identity()))
+	if event.created_by != me and not db.session.query(
+		EventRegistration.query.filter_by(event_id=event_id, user_id=me).exists()
+	).scalar():
+		return jsonify({"error": "Only the organiser and attendees can see the attendee list"}), 403
+	try:
+		limit = parse_limit(request.args)
+		cursor = decode_time_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+	except ValueError:
+		return jsonify({"error": "Invalid limit or cursor"}), 400
+
+	query = db.session.query(
+		EventRegistration.id, EventRegistration.user_id, EventRegistration.created_at, User.name
+	).join(User, User.id == EventRegistration.user_id).filter(EventRegistration.event_id == event_id)
+	if cursor:
+		ts, reg_id = cursor
+		query = query.filter(or_(
+			EventRegistration.created_at > ts,
+			and_(EventRegistration.created_at == ts, EventRegistration.id > reg_id),
+		))
+	rows = query.order_by(EventRegistration.created_at, EventRegistration.id).limit(limit + 1).all()
+	has_more = len(rows) > limit
+	rows = rows[:limit]
+	return jsonify({
+		"attendees": [
+			{"userId": str(r.user_id), "name": r.name, "registeredAt": r.created_at.isoformat()}
+			for r in rows
+		],
+		"nextCursor": encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None,
+		"registeredCount": event.registered_count,
+		"capacity": event.capacity,
+	}), 200
+
+
+@events_bp.cli.command("set-capacity")
+@click.argument("event_id")
+@click.argument("capacity", required=False)
+def set_capacity(event_id, capacity):
+	"""Set an event's capacity (omit CAPACITY for unlimited), e.g. for events created by
+	registrations, which have no owner to PATCH them.
+	"""
+	try:
+		capacity = _parse_capacity(capacity)
+	except ValueError as e:
+		raise click.BadParameter(str(e))
+	conditions = [Event.id == event_id]
+	if capacity is not None:
+		conditions.append(Event.registered_count <= capacity)
+	updated = db.session.execute(
+		update(Event).where(*conditions).values(capacity=capacity).execution_options(synchronize_session=False)
+	).rowcount
+	db.session.commit()
+	if not updated:
+		raise click.ClickException("No such event, or capacity is below the number of registrations")
+	print(f"Capacity of {event_id} is now {'unlimited' if capacity is None else capacity}")
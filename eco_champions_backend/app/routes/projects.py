@@ -1,10 +1,15 @@
-from flask import Blueprint, request, jsonify
+import hashlib
+from flask import Blueprint, make_response, request, jsonify
+from sqlalchemy import and_, func, or_, update
+from sqlalchemy.exc import StatementError
+from sqlalchemy.orm import defer
 from flask_jwt_extended import get_jwt_identity
 from ..database import db
 from ..models import Project, ProjectParticipation, User
-from ..utils.decorators import jwt_required_json
+from ..utils.decorators import jwt_required_json, read_replica
+from ..utils.pagination import decode_time_cursor, encode_cursor, parse_limit
 from ..utils.validators import require_fields
-from ..utils.coin_manager import award_coins
+from ..utils.coin_manager import award_coins, award_coins_bulk
 
 projects_bp = Blueprint("projects", __name__)
 
@@ -36,30 +41,74 @@ def create_project():
 
 
 @projects_bp.get("")
+@read_replica
 @jwt_required_json
 def list_projects():
+	"""Project board, newest first.
+	Optional query params: status, material, limit (default 50, max 200),
+	cursor (from nextCursor), fields=summary (omit descriptions).
+	Sends an ETag and answers If-None-Match with 304 when nothing changed.
+	"""
 	status = request.args.get("status")
 	material = request.args.get("material")
+	summary = request.args.get("fields") == "summary"
+	try:
+		limit = parse_limit(request.args)
+		cursor = decode_time_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+	except ValueError:
+		return jsonify({"error": "Invalid limit or cursor"}), 400
+
 	query = Project.query
 	if status:
 		query = query.filter_by(status=status)
 	if material:
 		query = query.filter_by(goal_material=material)
-	items = query.order_by(Project.created_at.desc()).all()
-	return jsonify([
-		{
-			"id": str(p.id),
-			"title": p.title,
-			"description": p.description,
-			"goalMaterial": p.goal_material,
-			"goalWeight": p.goal_weight,
-			"collectedWeight": p.collected_weight,
-			"status": p.status,
-			"daysLeft": p.days_left,
-			"createdBy": str(p.created_by) if p.created_by else None,
-		}
-		for p in items
-	]), 200
+
+	# cheap validator over the filtered set: any insert, update or delete changes it
+	# (rows from before updated_at existed count from created_at; see backfill-updated-at)
+	count, last_change = query.with_entities(
+		func.count(Project.id), func.max(func.coalesce(Project.updated_at, Project.created_at))
+	).one()
+	etag = hashlib.sha1(f"{count}:{last_change}:{request.query_string.decode()}".encode()).hexdigest()
+	if etag in request.if_none_match:
+		resp = make_response("", 304)
+		resp.set_etag(etag)
+		return resp
+
+	if cursor:
+		created, project_id = cursor
+		query = query.filter(or_(
+			Project.created_at < created,
+			and_(Project.created_at == created, Project.id < project_id),
+		))
+	if summary:
+		query = query.options(defer(Project.description))
+	items = query.order_by(Project.created_at.desc(), Project.id.desc()).limit(limit + 1).all()
+	has_more = len(items) > limit
+	items = items[:limit]
+
+	resp = jsonify({
+		"projects": [_project_json(p, summary) for p in items],
+		"nextCursor": encode_cursor(items[-1].created_at, items[-1].id) if has_more else None,
+	})
+	resp.set_etag(etag)
+	return resp, 200
+
+
+def _project_json(p: Project, summary: bool = False) -> dict:
+	data = {
+		"id": str(p.id),
+		"title": p.title,
+		"goalMaterial": p.goal_material,
+		"goalWeight": p.goal_weight,
+		"collectedWeight": p.collected_weight,
+		"status": p.status,
+		"daysLeft": p.days_left,
+		"createdBy": str(p.created_by) if p.created_by else None,
+	}
+	if not summary:
+		data["description"] = p.description
+	return data
 
 
 @projects_bp.post("/participate/<project_id>")
@@ -69,34 +118,59 @@ def participate(project_id):
 	data = request.get_json() or {}
 	contrib = float(data.get("contributedWeight", 0))
 
-	project = Project.query.get(project_id)
+	# atomic increment: concurrent joins add up instead of overwriting each other
+	try:
+		project = db.session.execute(
+			update(Project)
+			.where(Project.id == project_id)
+			.values(collected_weight=func.coalesce(Project.collected_weight, 0) + contrib)
+			.returning(Project.id, Project.created_by, Project.collected_weight)
+			.execution_options(synchronize_session=False)
+		).first()
+	except StatementError:
+		project = None
 	if not project:
+		db.session.rollback()
 		return jsonify({"error": "Project not found"}), 404
 
-	pp = ProjectParticipation(user_id=user_id, project_id=project.id, contributed_weight=contrib)
-	db.session.add(pp)
-	project.collected_weight = (project.collected_weight or 0) + contrib
-	db.session.commit()
+	db.session.add(ProjectParticipation(user_id=user_id, project_id=project.id, contributed_weight=contrib))
 
-	# Participation rewards
-	award_coins(user_id, 10, "Join Project")
-	# Reward project creator 5 coins for each participation by others
+	# Participation rewards, plus 5 coins to the project creator for each participation by others
+	awards = [(user_id, 10, "Join Project")]
 	if project.created_by and str(project.created_by) != str(user_id):
-		try:
-			award_coins(project.created_by, 5, "Participant Joined Project")
-		except Exception:
-			pass
-
-	# Completion check
-	if project.collected_weight >= (project.goal_weight or 0) and project.status != "Completed":
-		project.status = "Completed"
-		db.session.commit()
-		# reward all participants
-		participants = ProjectParticipation.query.filter_by(project_id=project.id).all()
-		for part in participants:
-			try:
-				award_coins(part.user_id, 20, "Complete Project")
-			except Exception:
-				pass
-
-	return jsonify({"ok": True}), 200
+		awards.append((project.created_by, 5, "Participant Joined Project"))
+
+	# Completion: the conditional transition matches for exactly one request, even when
+	# several joins cross the goal at once (the others see status = 'Completed')
+	completed = db.session.execute(
+		update(Project)
+		.where(
+			Project.id == project.id,
+			or_(Project.status.is_(None), Project.status != "Completed"),
+			Project.collected_weight >= func.coalesce(Project.goal_weight, 0),
+		)
+		.values(status="Completed")
+		.returning(Project.id)
+		.execution_options(synchronize_session=False)
+	).first() is not None
+	if completed:
+		# reward all participants (including this one, autoflushed above)
+		participants = db.session.query(ProjectParticipation.user_id).filter_by(project_id=project.id).all()
+		awards.extend((part.user_id, 20, "Complete Project") for part in participants)
+
+	# one UPDATE + one ledger insert, committed with the participation and status change
+	award_coins_bulk(awards)
+
+	return jsonify({"ok": True, "collectedWeight": project.collected_weight, "completed": completed}), 200
+
+
+@projects_bp.cli.command("backfill-updated-at")
+def backfill_updated_at():
+	"""Set updated_at = created_at on projects stored before the column existed."""
+	filled = db.session.execute(
+		update(Project).where(Project.updated_at.is_(None))
+		.values(updated_at=func.coalesce(Project.created_at, func.now()))
+		.execution_options(synchronize_session=False)
+	).rowcount
+	db.session.commit()
+	print(f"Backfilled {filled} projects")
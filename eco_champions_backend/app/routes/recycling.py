@@ -1,79 +1,177 @@
-from datetime import datetime
-from collections import Counter
-from flask import Blueprint, request, jsonify
+import csv
+import io
+import json
+from flask import Blueprint, current_app, request, jsonify
+from sqlalchemy import insert, or_, update
 from flask_jwt_extended import get_jwt_identity
 from ..database import db
 from ..models import RecyclingLog, User
-from ..utils.decorators import jwt_required_json
-from ..utils.validators import require_fields
-from ..utils.coin_manager import award_coins
+from ..utils.decorators import current_user, jwt_required_json
+from ..utils.validators import parse_weight, require_fields
+from ..utils.coin_manager import award_coins, award_coins_bulk
+from ..utils.idempotency import idempotent
+from ..utils.recycling_stats import month_key, monthly_summary, rebuild_stats, record_logs
 
 recycling_bp = Blueprint("recycling", __name__)
 
 
 @recycling_bp.post("/log")
 @jwt_required_json
+@idempotent
 def log_recycling():
 	user_id = get_jwt_identity()
 	data = request.get_json() or {}
 	try:
 		require_fields(data, ["materialType", "weight"])
+		weight = parse_weight(data["weight"])
 	except ValueError as e:
 		return jsonify({"error": str(e)}), 400
 
 	material = data["materialType"].lower()
-	weight = float(data["weight"]) if data.get("weight") is not None else 0
 	photo_url = data.get("photo")
 
 	log = RecyclingLog(user_id=user_id, material_type=material, weight=weight, photo_url=photo_url)
 	db.session.add(log)
-	db.session.commit()
-
-	# coin awards
-	award_coins(user_id, 5, "Log Recycling")
+	try:
+		_, count = record_logs(user_id, [(material, weight)])
+	except ValueError:
+		db.session.rollback()
+		return jsonify({"error": "User not found"}), 404
 
-	# 3rd-log bonus logic
-	count = RecyclingLog.query.filter_by(user_id=user_id).count()
+	# coin awards, with the 3rd-log bonus; committed together with the log and its stats
+	awards = [(user_id, 5, "Log Recycling")]
 	if count % 3 == 0:
-		award_coins(user_id, 15, "Third Recycling Log Bonus")
+		awards.append((user_id, 15, "Third Recycling Log Bonus"))
+	eco_coins, role = next(iter(award_coins_bulk(awards).values()))
+
+	return jsonify({
+		"ecoCoins": eco_coins,
+		"role": role,
+		**monthly_summary(user_id),
+	}), 201
+
 
-	user = User.query.get(user_id)
+def _bulk_entries():
+	"""Yield raw entry dicts from a JSON, NDJSON or CSV body, reading streamed bodies line by line."""
+	mimetype = request.mimetype
+	if mimetype in ("application/x-ndjson", "application/jsonl"):
+		for line in io.TextIOWrapper(request.stream, encoding="utf-8"):
+			if line.strip():
+				try:
+					yield json.loads(line)
+				except ValueError:
+					yield None
+	elif mimetype == "text/csv":
+		yield from csv.DictReader(io.TextIOWrapper(request.stream, encoding="utf-8"))
+	else:
+		data = request.get_json(silent=True)
+		yield from (data.get("entries") if isinstance(data, dict) else data) or []
 
-	# monthly progress and pie
-	start_month = datetime.now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-	month_logs = RecyclingLog.query.filter(RecyclingLog.user_id == user_id, RecyclingLog.date >= start_month).all()
-	materials = [l.material_type for l in month_logs]
-	counts = Counter(materials)
-	total = sum(counts.values()) or 1
-	pie = [{"material": k, "percent": round(v * 100.0 / total, 2)} for k, v in counts.items()]
 
-	monthly_progress = round(sum(l.weight for l in month_logs), 2)
+@recycling_bp.post("/bulk")
+@jwt_required_json
+def log_recycling_bulk():
+	"""Log many weigh-ins for the caller in one transaction.
+	Body: {"entries": [{materialType, weight, photo}]} (or a bare list), NDJSON, or CSV
+	with a materialType,weight,photo header. Returns a per-row status summary.
+	"""
+	user_id = get_jwt_identity()
+	limit = current_app.config["RECYCLING_BULK_MAX"]
+	rows, statuses = [], []
+	for i, entry in enumerate(_bulk_entries()):
+		if i >= limit:
+			return jsonify({"error": f"At most {limit} entries per request"}), 413
+		try:
+			if not isinstance(entry, dict):
+				raise ValueError("Entry must be an object")
+			require_fields(entry, ["materialType", "weight"])
+			weight = parse_weight(entry["weight"])
+		except (ValueError, TypeError) as e:
+			statuses.append({"index": i, "status": "error", "error": str(e)})
+			continue
+		rows.append({
+			"user_id": user_id,
+			"material_type": str(entry["materialType"]).lower(),
+			"weight": weight,
+			"photo_url": entry.get("photo") or None,
+		})
+		statuses.append({"index": i, "status": "ok"})
+
+	if not rows:
+		return jsonify({"accepted": 0, "rejected": len(statuses), "rows": statuses}), 400
+
+	db.session.execute(insert(RecyclingLog), rows)
+	try:
+		before, after = record_logs(user_id, [(r["material_type"], r["weight"]) for r in rows])
+	except ValueError:
+		db.session.rollback()
+		return jsonify({"error": "User not found"}), 404
+	# every log crossing a multiple of three earns the bonus, as in POST /log
+	bonuses = after // 3 - before // 3
+	awards = [(user_id, 5, "Log Recycling")] * len(rows) + [(user_id, 15, "Third Recycling Log Bonus")] * bonuses
+	eco_coins, role = next(iter(award_coins_bulk(awards).values()))
 
 	return jsonify({
-		"ecoCoins": user.eco_coins,
-		"role": user.role,
-		"monthlyProgress": monthly_progress,
-		"pieChart": pie,
+		"accepted": len(rows),
+		"rejected": len(statuses) - len(rows),
+		"bonuses": bonuses,
+		"ecoCoins": eco_coins,
+		"role": role,
+		"rows": statuses,
 	}), 201
 
 
+@recycling_bp.get("/stats")
+@jwt_required_json
+def recycling_stats():
+	"""Monthly progress and material pie for the dashboard.
+	Optional query params: month ("YYYY-MM", default current UTC month)
+	"""
+	user = current_user()
+	if not user:
+		return jsonify({"error": "User not found"}), 404
+	month = request.args.get("month") or month_key()
+	return jsonify({
+		"month": month,
+		"totalLogs": user.recycling_log_count or 0,
+		**monthly_summary(user.id, month),
+	}), 200
+
+
 @recycling_bp.post("/guide/check")
 @jwt_required_json
 def check_recycling_guide():
-	user_id = get_jwt_identity()
-	user = User.query.get(user_id)
+	user = current_user()
 	if not user:
 		return jsonify({"error": "User not found"}), 404
 	if user.guide_bonus_claimed:
 		return jsonify({"error": "Guide bonus already claimed"}), 400
 
-	# award once
-\taward_coins(user_id, 5, "Recycling Guide Checklist")
-	user.guide_bonus_claimed = True
-	db.session.commit()
+	# award once: the conditional UPDATE lets only one concurrent request claim the bonus
+	claimed = db.session.execute(
+		update(User)
+		.where(User.id == user.id, or_(User.guide_bonus_claimed.is_(False), User.guide_bonus_claimed.is_(None)))
+		.values(guide_bonus_claimed=True)
+		.execution_options(synchronize_session=False)
+	).rowcount
+	if not claimed:
+		db.session.rollback()
+		return jsonify({"error": "Guide bonus already claimed"}), 400
+	# commits the claim and the award together
+	user = award_coins(user.id, 5, "Recycling Guide Checklist")
 
 	return jsonify({
 		"ecoCoins": user.eco_coins,
 		"role": user.role,
 		"guideBonusClaimed": True,
 	}), 200
+
+
+@recycling_bp.cli.command("backfill-stats")
+def backfill_recycling_stats():
+	"""Build log counters and monthly aggregates for logs written before they existed."""
+	user_ids = [row.user_id for row in db.session.query(RecyclingLog.user_id).distinct() if row.user_id]
+	for user_id in user_ids:
+		rebuild_stats(user_id)
+		db.session.commit()
+	print(f"Rebuilt recycling stats for {len(user_ids)} users")
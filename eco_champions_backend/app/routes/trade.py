@@ -3,7 +3,8 @@ from flask_jwt_extended import get_jwt_identity
 from ..database import db
 from ..models import User
 from ..utils.decorators import jwt_required_json
-from ..utils.coin_manager import award_coins
+from ..utils.coin_manager import award_coins_bulk
+from ..utils.idempotency import idempotent
 
 
 trade_bp = Blueprint("trade", __name__)
@@ -11,6 +12,7 @@ trade_bp = Blueprint("trade", __name__)
 
 @trade_bp.post("/finalize")
 @jwt_required_json
+@idempotent
 def finalize_trade():
 	"""Finalize an EcoTrade and award 50 coins to both buyer and seller.
 	Expected JSON: { "buyerId": uuid, "sellerId": uuid }
@@ -32,8 +34,10 @@ def finalize_trade():
 		return jsonify({"error": "Buyer or seller not found"}), 404
 
 	# Award 50 coins each
-	award_coins(buyer.id, 50, "EcoTrade Finalized")
-	award_coins(seller.id, 50, "EcoTrade Finalized")
+	award_coins_bulk([
+		(buyer.id, 50, "EcoTrade Finalized"),
+		(seller.id, 50, "EcoTrade Finalized"),
+	])
 
 	return jsonify({
 		"buyer": { "id": str(buyer.id), "ecoCoins": buyer.eco_coins },
@@ -1,16 +1,14 @@
 from flask import Blueprint, jsonify
-from flask_jwt_extended import get_jwt_identity
-from ..utils.decorators import jwt_required_json
-from ..models import User
+from ..utils.decorators import current_user, jwt_required_json, read_replica
 
 user_bp = Blueprint("user", __name__)
 
 
 @user_bp.get("/profile")
+@read_replica
 @jwt_required_json
 def profile():
-	user_id = get_jwt_identity()
-	user = User.query.get(user_id)
+	user = current_user()
 	if not user:
 		return jsonify({"error": "User not found"}), 404
 	return jsonify({
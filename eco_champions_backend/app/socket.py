@@ -1,23 +1,85 @@
-from flask import request
+from flask import request, session
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from .config import Config
+from flask_jwt_extended import decode_token
+from .utils.metrics import count_emit
 
-# Use Redis queue if provided for scaling
-socketio = SocketIO(async_mode="eventlet", message_queue=Config.SOCKETIO_MESSAGE_QUEUE, cors_allowed_origins="*")
+# The Redis queue (if provided for scaling) is passed in create_app: giving it here
+# would build the server at import time and init_app would drop these handlers.
+socketio = SocketIO(async_mode="eventlet", cors_allowed_origins="*")
+
+
+def user_room(user_id) -> str:
+	return f"user:{user_id}"
+
+
+def emit_to_users(event: str, data, user_ids) -> None:
+	"""Deliver ``event`` only to the personal rooms of ``user_ids`` (usable outside handlers)."""
+	rooms = list(dict.fromkeys(user_room(u) for u in user_ids if u))
+	if rooms:
+		socketio.emit(event, data, to=rooms)
+		count_emit(event, len(rooms))
+
+
+def _token_from_handshake(auth) -> str:
+	if isinstance(auth, dict) and auth.get("token"):
+		return auth["token"]
+	header = request.headers.get("Authorization", "")
+	if header.startswith("Bearer "):
+		return header[len("Bearer "):]
+	return request.args.get("token", "")
 
 
 @socketio.on("connect")
-def handle_connect():
+def handle_connect(auth=None):
+	# Authenticate with the same JWT as the REST API: {auth: {token}}, a Bearer header or ?token=
+	from .utils.user_cache import cached_profile
+
+	try:
+		claims = decode_token(_token_from_handshake(auth))
+	except Exception:
+		return False
+	if claims.get("type") != "access":
+		return False
+	user = cached_profile(claims["sub"])
+	if not user:
+		return False
+	session["user_id"] = str(user["id"])
+	join_room(user_room(user["id"]))
 	emit("connect", {"message": "connected"})
 
 
 @socketio.on("disconnect")
 def handle_disconnect():
-	# No payload required
+	# Rooms are left automatically on disconnect
 	pass
 
 
 @socketio.on("send_message")
 def handle_send_message(data):
-	# Expected: {"to": userId, "from": userId, "message": str}
-	emit("receive_message", data, broadcast=True)
+	"""Persist and deliver one chat message.
+	Expected: {"to": userId, "message": str}; the sender is the authenticated user.
+	Acks {"id", "timestamp"} once the message is committed, or {"error"}.
+	"""
+	from .utils.chat_writer import chat_writer, message_payload, new_message_row
+	from .utils.user_cache import cached_profile
+
+	sender = session.get("user_id")
+	if not sender:
+		return {"error": "Unauthorized"}
+	if not isinstance(data, dict) or not data.get("to") or not data.get("message"):
+		return {"error": "to and message required"}
+	# current premium/community, not what they were when the socket connected
+	me = cached_profile(sender)
+	other = cached_profile(data["to"])
+	if not me or not other:
+		return {"error": "User not found"}
+	if not me["is_premium"] and me["community"] != other["community"]:
+		return {"error": "Free users can only chat within community"}
+
+	row = new_message_row(sender, other["id"], data["message"])
+	error = chat_writer.write(row)
+	if error:
+		return {"error": error}
+	payload = message_payload(row)
+	emit_to_users("receive_message", payload, [other["id"], sender])
+	return {"id": payload["id"], "timestamp": payload["timestamp"]}
@@ -0,0 +1,109 @@
+import threading
+import uuid
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import insert
+from ..config import Config
+from ..database import db
+from ..models import ChatMessage, conversation_key
+from ..socket import socketio
+
+
+def _wait(event: threading.Event) -> None:
+	"""Block until ``event`` is set without stalling the eventlet hub.
+
+	Under eventlet without monkey-patching (run.py), Event.wait would block the OS
+	thread and with it every greenlet, including the leader that sets the event;
+	there the follower polls with socketio.sleep instead. Patched or threading
+	mode waits normally.
+	"""
+	server = socketio.server
+	if server is not None and server.async_mode == "eventlet":
+		import eventlet.patcher
+		if not eventlet.patcher.is_monkey_patched("thread"):
+			while not event.is_set():
+				socketio.sleep(0.001)
+			return
+	event.wait()
+
+
+class _Batch:
+	def __init__(self):
+		self.rows: list[dict] = []
+		self.error: Optional[str] = None
+		self.done = threading.Event()
+
+
+class MessageWriter:
+	"""Group commit for chat messages.
+
+	The first writer in a window becomes the leader: it yields for ``window_ms``
+	so concurrent writers can join its batch, then inserts the whole batch in one
+	statement and commits once. Followers wait for the leader's result, however
+	long the commit takes, so nobody is told a write failed that later commits.
+	"""
+
+	def __init__(self, window_ms: float = 5.0, max_batch: int = 500):
+		self.window_ms = window_ms
+		self.max_batch = max_batch
+		self._lock = threading.Lock()
+		self._open: Optional[_Batch] = None
+
+	def write(self, row: dict) -> Optional[str]:
+		"""Persist one ChatMessage row dict. Returns None once committed, else an error string."""
+		with self._lock:
+			batch = self._open
+			leader = batch is None
+			if leader:
+				batch = self._open = _Batch()
+			batch.rows.append(row)
+			full = len(batch.rows) >= self.max_batch
+			if full:
+				# later writers start a new batch; the leader flushes this one
+				self._open = None
+		if not leader:
+			# _flush always sets done, on success or failure
+			_wait(batch.done)
+			return batch.error
+		if not full and self.window_ms > 0:
+			socketio.sleep(self.window_ms / 1000.0)
+		with self._lock:
+			if self._open is batch:
+				self._open = None
+		self._flush(batch)
+		return batch.error
+
+	def _flush(self, batch: _Batch) -> None:
+		try:
+			db.session.execute(insert(ChatMessage), batch.rows)
+			db.session.commit()
+		except Exception as e:
+			db.session.rollback()
+			batch.error = str(e) or "Failed to save message"
+		finally:
+			batch.done.set()
+
+
+def new_message_row(sender_id, receiver_id, message: str) -> dict:
+	return {
+		"id": uuid.uuid4(),
+		"sender_id": sender_id,
+		"receiver_id": receiver_id,
+		"conversation_key": conversation_key(sender_id, receiver_id),
+		"message": message,
+		"timestamp": datetime.utcnow(),
+	}
+
+
+def message_payload(row: dict) -> dict:
+	"""Client-facing shape of a message, as in GET /api/chat/conversation."""
+	return {
+		"id": str(row["id"]),
+		"from": str(row["sender_id"]),
+		"to": str(row["receiver_id"]),
+		"message": row["message"],
+		"timestamp": row["timestamp"].isoformat(),
+	}
+
+
+chat_writer = MessageWriter(Config.CHAT_GROUP_COMMIT_MS, Config.CHAT_GROUP_COMMIT_MAX)
@@ -0,0 +1,115 @@
+from datetime import datetime
+from typing import Optional
+from flask import Flask
+from sqlalchemy import update
+from ..config import Config
+from ..database import db
+from ..models import User, CommunityCluster
+from ..socket import socketio
+from .geo import geohash_encode, haversine_matrix_km, kmeans, nearest_centroid, MINIBATCH_SIZE, MINIBATCH_THRESHOLD
+
+
+def load_centroids() -> list[CommunityCluster]:
+	return CommunityCluster.query.order_by(CommunityCluster.id).all()
+
+
+def assign_user_cluster(user: User, centroids: Optional[list[CommunityCluster]] = None) -> Optional[int]:
+	"""Point ``user.cluster_id`` at the nearest stored centroid. Does not commit.
+	Returns None (leaving the user unassigned) until the first refresh has run.
+	"""
+	if user.latitude is None or user.longitude is None:
+		user.cluster_id = None
+		return None
+	centroids = centroids if centroids is not None else load_centroids()
+	if not centroids:
+		return None
+	ci = nearest_centroid((user.latitude, user.longitude), [(c.latitude, c.longitude) for c in centroids])
+	user.cluster_id = centroids[ci].id
+	return user.cluster_id
+
+
+def _warm_start(previous: list[CommunityCluster], points: list, k: int) -> Optional[list]:
+	"""``k`` initial centroids that keep the stored ones at their ids.
+	With fewer stored than ``k`` (fewer users than CLUSTER_K last time) the rest are the
+	points farthest from the centroids chosen so far; None when nothing is stored.
+	"""
+	if not previous:
+		return None
+	init = [(c.latitude, c.longitude) for c in previous[:k]]
+	while len(init) < k:
+		nearest = haversine_matrix_km(points, init).min(axis=1)
+		init.append(points[int(nearest.argmax())])
+	return init
+
+
+def refresh_clusters(k: Optional[int] = None) -> int:
+	"""Recompute centroids over every located user and rewrite changed assignments.
+	Warm-starts from the stored centroids so cluster ids stay stable between runs,
+	including while there are fewer located users than ``k`` (k is capped at that count).
+	Returns the number of users whose cluster changed.
+	"""
+	rows = db.session.query(User.id, User.latitude, User.longitude, User.cluster_id, User.geohash).filter(
+		User.latitude.isnot(None), User.longitude.isnot(None)
+	).all()
+	if not rows:
+		return 0
+	k = min(k or Config.CLUSTER_K, len(rows))
+	points = [(r.latitude, r.longitude) for r in rows]
+	init = _warm_start(load_centroids(), points, k)
+	batch_size = MINIBATCH_SIZE if len(rows) > MINIBATCH_THRESHOLD else None
+	labels, centroids = kmeans(points, k, batch_size=batch_size, init=init)
+
+	CommunityCluster.query.delete()
+	now = datetime.utcnow()
+	counts = [0] * len(centroids)
+	for label in labels.tolist():
+		counts[label] += 1
+	db.session.add_all([
+		CommunityCluster(id=i, latitude=float(lat), longitude=float(lon), member_count=counts[i], updated_at=now)
+		for i, (lat, lon) in enumerate(centroids.tolist())
+	])
+	changed = [
+		{"id": r.id, "cluster_id": label}
+		for r, label in zip(rows, labels.tolist())
+		if r.cluster_id != label
+	]
+	if changed:
+		# executemany UPDATE by primary key
+		db.session.execute(update(User), changed)
+	# backfill geohashes for users located before the spatial index existed
+	missing = [
+		{"id": r.id, "geohash": geohash_encode(r.latitude, r.longitude)}
+		for r in rows
+		if r.geohash is None
+	]
+	if missing:
+		db.session.execute(update(User), missing)
+	db.session.commit()
+	return len(changed)
+
+
+def start_cluster_refresher(app: Flask) -> None:
+	"""Seed centroids at startup if none are stored, then refresh them every
+	CLUSTER_REFRESH_SECONDS, on a Socket.IO background task.
+	"""
+	interval = app.config.get("CLUSTER_REFRESH_SECONDS", 0)
+
+	def refresh():
+		with app.app_context():
+			try:
+				refresh_clusters(app.config.get("CLUSTER_K"))
+			except Exception:
+				db.session.rollback()
+				app.logger.exception("Cluster refresh failed")
+
+	def loop():
+		with app.app_context():
+			seeded = db.session.query(CommunityCluster.id).first() is not None
+			db.session.rollback()
+		if not seeded:
+			refresh()
+		while interval > 0:
+			socketio.sleep(interval)
+			refresh()
+
+	socketio.start_background_task(loop)
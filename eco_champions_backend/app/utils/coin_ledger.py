@@ -0,0 +1,217 @@
+from datetime import date, datetime, timedelta
+from typing import Optional
+from sqlalchemy import and_, func, or_, text
+from ..database import db, upsert_insert
+from ..models import CoinDailyRollup, CoinTransaction
+
+PARTITION_PREFIX = "coin_transaction_"
+
+
+def add_to_rollups(day: date, per_user: dict) -> None:
+	"""Add ``{user_id: (amount, tx_count)}`` to the users' rollup rows for ``day``. Does not commit."""
+	if not per_user:
+		return
+	stmt = upsert_insert(CoinDailyRollup).values([
+		{"user_id": uid, "day": day, "total": amount, "tx_count": count}
+		for uid, (amount, count) in per_user.items()
+	])
+	db.session.execute(stmt.on_conflict_do_update(
+		index_elements=["user_id", "day"],
+		set_={
+			"total": CoinDailyRollup.total + stmt.excluded.total,
+			"tx_count": CoinDailyRollup.tx_count + stmt.excluded.tx_count,
+		},
+	))
+
+
+def rebuild_rollups(start: datetime, end: datetime) -> int:
+	"""Overwrite the rollups of the days in [start, end) from the raw ledger rows.
+	``start`` and ``end`` must be midnights. Does not commit; returns rows written.
+	"""
+	day = func.date(CoinTransaction.timestamp)
+	rows = db.session.query(
+		CoinTransaction.user_id, day, func.sum(CoinTransaction.amount), func.count()
+	).filter(
+		CoinTransaction.timestamp >= start, CoinTransaction.timestamp < end, CoinTransaction.user_id.isnot(None)
+	).group_by(CoinTransaction.user_id, day).all()
+	db.session.query(CoinDailyRollup).filter(
+		CoinDailyRollup.day >= start.date(), CoinDailyRollup.day < end.date()
+	).delete(synchronize_session=False)
+	if rows:
+		# SQLite's date() returns text
+		db.session.execute(upsert_insert(CoinDailyRollup).values([
+			{"user_id": uid, "day": d if isinstance(d, date) else date.fromisoformat(d), "total": total or 0, "tx_count": count}
+			for uid, d, total, count in rows
+		]))
+	return len(rows)
+
+
+def _month_start(when: datetime) -> datetime:
+	return datetime(when.year, when.month, 1)
+
+
+def _next_month(start: datetime) -> datetime:
+	return start.replace(year=start.year + (start.month == 12), month=start.month % 12 + 1)
+
+
+def _month_windows(start: datetime, end: datetime):
+	"""[lo, hi) windows covering [start, end) that never cross a month boundary."""
+	lo = start
+	while lo < end:
+		hi = min(_next_month(_month_start(lo)), end)
+		yield lo, hi
+		lo = hi
+
+
+def backfill_rollups() -> int:
+	"""Rebuild every rollup from the raw rows still in the ledger, a month per transaction."""
+	first = db.session.query(func.min(CoinTransaction.timestamp)).scalar()
+	if first is None:
+		return 0
+	written = 0
+	end = datetime.combine(datetime.utcnow().date() + timedelta(days=1), datetime.min.time())
+	for lo, hi in _month_windows(datetime.combine(first.date(), datetime.min.time()), end):
+		written += rebuild_rollups(lo, hi)
+		db.session.commit()
+	return written
+
+
+def archive_before(cutoff: datetime) -> int:
+	"""Compact ledger rows older than ``cutoff`` (rounded down to midnight) into rollups.
+
+	Each month is its own transaction: the days' rollups are rebuilt from the raw rows,
+	then the rows are deleted, or the whole partition dropped when the ledger is
+	partitioned, the month lies entirely before the cutoff and its partition exists
+	(months without one keep their rows in the default partition). Returns rows removed.
+	"""
+	cutoff = datetime.combine(cutoff.date(), datetime.min.time())
+	first = db.session.query(func.min(CoinTransaction.timestamp)).scalar()
+	if first is None or first >= cutoff:
+		return 0
+	partitioned = is_partitioned()
+	removed = 0
+	for lo, hi in _month_windows(datetime.combine(first.date(), datetime.min.time()), cutoff):
+		rebuild_rollups(lo, hi)
+		whole_month = lo == _month_start(lo) and hi == _next_month(lo)
+		name = _partition_name(lo)
+		if partitioned and whole_month and _table_exists(name):
+			removed += db.session.execute(text(f"SELECT count(*) FROM {name}")).scalar()
+			db.session.execute(text(f"DROP TABLE {name}"))
+		else:
+			removed += db.session.query(CoinTransaction).filter(
+				CoinTransaction.timestamp >= lo, CoinTransaction.timestamp < hi
+			).delete(synchronize_session=False)
+		db.session.commit()
+	return removed
+
+
+def history_page(user_id, limit: int, before: Optional[tuple] = None) -> tuple[list, Optional[tuple]]:
+	"""The user's ledger rows newest first via (user_id, timestamp, id); returns (rows, next (ts, id))."""
+	query = CoinTransaction.query.filter(CoinTransaction.user_id == user_id)
+	if before:
+		ts, tx_id = before
+		query = query.filter(or_(
+			CoinTransaction.timestamp < ts,
+			and_(CoinTransaction.timestamp == ts, CoinTransaction.id < tx_id),
+		))
+	rows = query.order_by(CoinTransaction.timestamp.desc(), CoinTransaction.id.desc()).limit(limit + 1).all()
+	if len(rows) > limit:
+		rows = rows[:limit]
+		return rows, (rows[-1].timestamp, rows[-1].id)
+	return rows, None
+
+
+def earned_summary(user_id, today: Optional[date] = None) -> dict:
+	"""Coins earned today, this ISO week and this month (UTC), from the rollup rows."""
+	today = today or datetime.utcnow().date()
+	week = today - timedelta(days=today.weekday())
+	month = today.replace(day=1)
+
+	def since(start):
+		return func.coalesce(func.sum(CoinDailyRollup.total).filter(CoinDailyRollup.day >= start), 0)
+
+	row = db.session.query(since(today), since(week), since(month)).filter(
+		CoinDailyRollup.user_id == user_id, CoinDailyRollup.day >= min(week, month)
+	).one()
+	return {"today": int(row[0]), "week": int(row[1]), "month": int(row[2])}
+
+
+# Postgres monthly range partitions
+
+def _partition_name(month: datetime) -> str:
+	return f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+
+
+def _table_exists(name: str) -> bool:
+	return db.session.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def is_partitioned() -> bool:
+	if db.session.get_bind().dialect.name != "postgresql":
+		return False
+	return db.session.execute(text(
+		"SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid"
+		" WHERE c.relname = 'coin_transaction' AND pg_table_is_visible(c.oid))"
+	)).scalar()
+
+
+def ensure_partitions(months_ahead: int, start: Optional[datetime] = None) -> list[str]:
+	"""Create monthly partitions from ``start`` (default this month) through ``months_ahead``
+	months later. Does not commit; returns the names created.
+
+	A month whose rows already landed in the default partition can't get a partition
+	of its own while they are there, so its table is created standalone, the rows are
+	moved into it, and it is then attached.
+	"""
+	month = _month_start(start or datetime.utcnow())
+	last = _month_start(datetime.utcnow())
+	for _ in range(months_ahead):
+		last = _next_month(last)
+	default = f"{PARTITION_PREFIX}default"
+	has_default = _table_exists(default)
+	created = []
+	while month <= last:
+		name = _partition_name(month)
+		if not _table_exists(name):
+			bounds = f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{_next_month(month):%Y-%m-%d}')"
+			if has_default:
+				db.session.execute(text(f"CREATE TABLE {name} (LIKE coin_transaction INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+				db.session.execute(text(
+					f"WITH moved AS (DELETE FROM {default} WHERE timestamp >= :lo AND timestamp < :hi RETURNING *)"
+					f" INSERT INTO {name} SELECT * FROM moved"
+				), {"lo": month, "hi": _next_month(month)})
+				db.session.execute(text(f"ALTER TABLE coin_transaction ATTACH PARTITION {name} {bounds}"))
+			else:
+				db.session.execute(text(f"CREATE TABLE {name} PARTITION OF coin_transaction {bounds}"))
+			created.append(name)
+		month = _next_month(month)
+	return created
+
+
+def convert_to_partitioned(months_ahead: int) -> int:
+	"""Rebuild coin_transaction as a table range-partitioned by month on timestamp.
+
+	Copies the existing rows into one partition per month, plus a default partition
+	that catches rows outside the created months (run ensure_partitions ahead of time
+	so it stays empty). The primary key becomes (id, timestamp), as Postgres requires
+	the partition key in it. Commits; returns rows copied.
+	"""
+	first = db.session.query(func.min(CoinTransaction.timestamp)).scalar()
+	db.session.execute(text("ALTER TABLE coin_transaction RENAME TO coin_transaction_unpartitioned"))
+	db.session.execute(text(
+		"CREATE TABLE coin_transaction (LIKE coin_transaction_unpartitioned INCLUDING DEFAULTS,"
+		" PRIMARY KEY (id, timestamp), FOREIGN KEY (user_id) REFERENCES \"user\" (id))"
+		" PARTITION BY RANGE (timestamp)"
+	))
+	ensure_partitions(months_ahead, start=first)
+	db.session.execute(text(f"CREATE TABLE {PARTITION_PREFIX}default PARTITION OF coin_transaction DEFAULT"))
+	copied = db.session.execute(text(
+		"INSERT INTO coin_transaction SELECT * FROM coin_transaction_unpartitioned"
+	)).rowcount
+	# drops the old indexes too, freeing their names for the partitioned ones
+	db.session.execute(text("DROP TABLE coin_transaction_unpartitioned"))
+	conn = db.session.connection()
+	for index in CoinTransaction.__table__.indexes:
+		index.create(conn)
+	db.session.commit()
+	return copied
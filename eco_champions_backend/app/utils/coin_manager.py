@@ -1,25 +1,83 @@
-from typing import Optional
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import case, func, insert, update
 from ..database import db
 from ..models import User, CoinTransaction
+from .coin_ledger import add_to_rollups
+from .leaderboard import queue_leaderboard_update
+from .user_cache import invalidate_profile_on_commit
 
+# (exclusive upper bound on eco_coins, role); anything above the last bound is "Eco Enabler"
+ROLE_THRESHOLDS = [
+	(10, "Eco Learner"),
+	(30, "Eco Explorer"),
+	(60, "Eco Champion"),
+]
+TOP_ROLE = "Eco Enabler"
 
-def update_user_role(user: User) -> None:
-	if user.eco_coins < 10:
-		user.role = "Eco Learner"
-	elif 10 <= user.eco_coins < 30:
-		user.role = "Eco Explorer"
-	elif 30 <= user.eco_coins < 60:
-		user.role = "Eco Champion"
-	else:
-		user.role = "Eco Enabler"
 
+def role_case(coins_expr):
+	"""SQL expression computing the role for ``coins_expr`` with the same thresholds."""
+	return case(*[(coins_expr < bound, role) for bound, role in ROLE_THRESHOLDS], else_=TOP_ROLE)
 
-def award_coins(user_id, amount: int, reason: str) -> User:
-	user: Optional[User] = User.query.get(user_id)
-	if not user:
+
+def _as_uuid(value) -> uuid.UUID:
+	return value if isinstance(value, uuid.UUID) else uuid.UUID(str(value))
+
+
+def award_coins(user_id, amount: int, reason: str, commit: bool = True) -> User:
+	"""Award coins with a server-side ``eco_coins = eco_coins + n`` increment.
+	Concurrent awards to the same user serialize on the row lock instead of
+	overwriting each other as a Python read-modify-write would.
+	"""
+	if not award_coins_bulk([(user_id, amount, reason)], commit=commit):
 		raise ValueError("User not found")
-	user.eco_coins = (user.eco_coins or 0) + int(amount)
-	update_user_role(user)
-	db.session.add(CoinTransaction(user_id=user.id, amount=int(amount), reason=reason))
-	db.session.commit()
+	user: Optional[User] = db.session.get(User, _as_uuid(user_id))
 	return user
+
+
+def award_coins_bulk(awards: Iterable[tuple], commit: bool = True) -> dict:
+	"""Apply many ``(user_id, amount, reason)`` awards in one UPDATE plus one ledger insert.
+
+	Amounts are summed per user and applied as server-side increments with the role
+	recomputed in the same statement, and added to today's coin rollups. Unknown
+	users are skipped. Leaderboards are
+	updated once the transaction commits. Returns
+	``{user_id: (eco_coins, role)}`` for every user that was updated.
+	"""
+	ledger = [(_as_uuid(uid), int(amount), reason) for uid, amount, reason in awards]
+	if not ledger:
+		return {}
+	totals: dict[uuid.UUID, int] = {}
+	for uid, amount, _ in ledger:
+		totals[uid] = totals.get(uid, 0) + amount
+
+	new_coins = func.coalesce(User.eco_coins, 0) + case(totals, value=User.id, else_=0)
+	rows = db.session.execute(
+		update(User)
+		.where(User.id.in_(list(totals)))
+		.values(eco_coins=new_coins, role=role_case(new_coins))
+		.returning(User.id, User.eco_coins, User.role, User.community)
+		.execution_options(synchronize_session="fetch")
+	).all()
+	updated = {row.id: (row.eco_coins, row.role) for row in rows}
+	# role may have changed
+	invalidate_profile_on_commit(*updated)
+	queue_leaderboard_update([(row.id, row.community, row.eco_coins, totals[row.id]) for row in rows])
+
+	now = datetime.utcnow()
+	ledger_rows = [
+		{"user_id": uid, "amount": amount, "reason": reason, "timestamp": now}
+		for uid, amount, reason in ledger
+		if uid in updated
+	]
+	if ledger_rows:
+		db.session.execute(insert(CoinTransaction), ledger_rows)
+		counts: dict[uuid.UUID, int] = {}
+		for row in ledger_rows:
+			counts[row["user_id"]] = counts.get(row["user_id"], 0) + 1
+		add_to_rollups(now.date(), {uid: (totals[uid], n) for uid, n in counts.items()})
+	if commit:
+		db.session.commit()
+	return updated
@@ -1,7 +1,30 @@
+import uuid
 from functools import wraps
-from flask import jsonify
+from typing import Optional
+from flask import g, jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from ..database import db
 from ..models import User
+from .user_cache import cached_profile
+
+
+def current_user() -> Optional[User]:
+	"""The authenticated User, loaded at most once per request and kept on ``g``."""
+	if "current_user" not in g:
+		try:
+			# a UUID key lets session.get hit the identity map (e.g. after award_coins)
+			g.current_user = db.session.get(User, uuid.UUID(str(get_jwt_identity())))
+		except ValueError:
+			g.current_user = None
+	return g.current_user
+
+
+def caller_profile() -> Optional[dict]:
+	"""``{id, is_premium, community, role}`` of the caller from the profile cache.
+	Not from the token claims: those would stay trusted until the access token
+	expires, while cached profiles are evicted when the user row commits a change.
+	"""
+	return cached_profile(get_jwt_identity())
 
 
 def jwt_required_json(fn):
@@ -19,9 +42,20 @@ def premium_required(fn):
 	@wraps(fn)
 	def wrapper(*args, **kwargs):
 		verify_jwt_in_request()
-		user_id = get_jwt_identity()
-		user = User.query.get(user_id)
-		if not user or not user.is_premium:
+		# answered from the profile cache, not the token's premium claim
+		user = caller_profile()
+		if not user or not user["is_premium"]:
 			return jsonify({"error": "Premium required"}), 403
 		return fn(*args, **kwargs)
 	return wrapper
+
+
+def read_replica(fn):
+	"""Serve the view's queries from the read replica (DATABASE_REPLICA_URL) when configured.
+	Only for read-only views: replica reads can lag the primary slightly.
+	"""
+	@wraps(fn)
+	def wrapper(*args, **kwargs):
+		g.read_replica = True
+		return fn(*args, **kwargs)
+	return wrapper
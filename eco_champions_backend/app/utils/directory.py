@@ -0,0 +1,67 @@
+import uuid
+from typing import Optional
+from sqlalchemy import and_, func, or_
+from ..config import Config
+from ..database import db
+from ..models import User, name_sort_key
+from .pagination import decode_cursor, encode_cursor
+from .user_cache import TTLCache
+
+# Largest code point: in code point order every name with a prefix sorts below prefix + _PREFIX_END
+_PREFIX_END = "\U0010ffff"
+
+# Directory order: case-insensitive name in code point order, then id (matches the indexes on User)
+name_key = name_sort_key(User.name)
+
+member_counts = TTLCache(Config.COMMUNITY_COUNT_TTL_SECONDS, maxsize=1000)
+
+
+def decode_name_cursor(cursor: str) -> tuple[str, uuid.UUID]:
+	"""Decode a (lowercased name, id) cursor as produced by ``encode_cursor``."""
+	values = decode_cursor(cursor)
+	try:
+		name, user_id = values
+		return str(name), uuid.UUID(user_id)
+	except (ValueError, TypeError):
+		raise ValueError("Invalid cursor")
+
+
+def prefix_filter(prefix: str) -> list:
+	"""Conditions matching names that start with ``prefix``, case-insensitively.
+
+	LIKE is the match. The [prefix, prefix + U+10FFFF) range selects the same rows in
+	code point order and lets SQLite use the index (Postgres derives it from LIKE
+	under COLLATE "C"). The prefix is lowered by the database, so it folds case
+	exactly like the index.
+	"""
+	escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+	lowered = func.lower(prefix)
+	return [
+		name_key.like(func.lower(escaped) + "%", escape="\\"),
+		name_key >= lowered,
+		name_key < lowered + _PREFIX_END,
+	]
+
+
+def directory_page(query, prefix: Optional[str], limit: int, cursor: Optional[str]) -> tuple[list[User], Optional[str]]:
+	"""One page of ``query`` in name order, optionally restricted to a name prefix.
+	Both the prefix and the cursor are index range conditions. Returns (users, nextCursor).
+	"""
+	if prefix:
+		query = query.filter(*prefix_filter(prefix))
+	if cursor:
+		name, user_id = decode_name_cursor(cursor)
+		query = query.filter(or_(name_key > name, and_(name_key == name, User.id > user_id)))
+	rows = query.add_columns(name_key).order_by(name_key, User.id).limit(limit + 1).all()
+	has_more = len(rows) > limit
+	rows = rows[:limit]
+	return [row[0] for row in rows], encode_cursor(rows[-1][1], rows[-1][0].id) if has_more else None
+
+
+def community_member_count(community: str) -> int:
+	"""Members of ``community``, cached for COMMUNITY_COUNT_TTL_SECONDS."""
+	count = member_counts.get(community)
+	if count is None:
+		count = db.session.query(func.count(User.id)).filter(User.community == community).scalar()
+		member_counts.set(community, count)
+	return count
@@ -1,10 +1,21 @@
 import math
-from typing import Tuple
+from typing import Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+# Upper bound on geohash cells enumerated for one radius query
+MAX_COVER_CELLS = 16
+# Above this many points kmeans_once switches to mini-batch updates
+MINIBATCH_THRESHOLD = 50000
+MINIBATCH_SIZE = 4096
 
 
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 	"""Compute great-circle distance in kilometers between two points."""
-	R = 6371.0
+	R = EARTH_RADIUS_KM
 	phi1 = math.radians(lat1)
 	phi2 = math.radians(lat2)
 	dphi = math.radians(lat2 - lat1)
@@ -14,28 +25,232 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 	return R * c
 
 
-def kmeans_once(points: list[Tuple[float, float]], k: int, iters: int = 10) -> list[list[int]]:
-	"""Simple k-means returning clusters as index lists. Not optimized; fine for small sets."""
-	if not points or k <= 0:
-		return []
-	centroids = points[:k] if len(points) >= k else points + [points[-1]] * (k - len(points))
-	clusters: list[list[int]] = [[] for _ in range(k)]
-	for _ in range(iters):
-		clusters = [[] for _ in range(k)]
-		for idx, p in enumerate(points):
-			dists = [haversine_km(p[0], p[1], c[0], c[1]) for c in centroids]
-			ci = dists.index(min(dists))
-			clusters[ci].append(idx)
-		# recompute centroids
-		new_centroids = []
-		for cluster in clusters:
-			if not cluster:
-				new_centroids.append(centroids[0])
-				continue
-			lat = sum(points[i][0] for i in cluster) / len(cluster)
-			lon = sum(points[i][1] for i in cluster) / len(cluster)
-			new_centroids.append((lat, lon))
-		centroids = new_centroids
-	return clusters
+def geohash_encode(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+	"""Standard base32 geohash; prefixes of the result are the enclosing cells."""
+	lat_lo, lat_hi = -90.0, 90.0
+	lon_lo, lon_hi = -180.0, 180.0
+	chars = []
+	bits = 0
+	ch = 0
+	even = True
+	while len(chars) < precision:
+		if even:
+			mid = (lon_lo + lon_hi) / 2
+			if lon >= mid:
+				ch = (ch << 1) | 1
+				lon_lo = mid
+			else:
+				ch <<= 1
+				lon_hi = mid
+		else:
+			mid = (lat_lo + lat_hi) / 2
+			if lat >= mid:
+				ch = (ch << 1) | 1
+				lat_lo = mid
+			else:
+				ch <<= 1
+				lat_hi = mid
+		even = not even
+		bits += 1
+		if bits == 5:
+			chars.append(GEOHASH_ALPHABET[ch])
+			bits = 0
+			ch = 0
+	return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+	"""(height, width) in degrees of a geohash cell at ``precision``."""
+	total = 5 * precision
+	lon_bits = (total + 1) // 2
+	lat_bits = total // 2
+	return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def geohash_cover(lat: float, lon: float, radius_km: float) -> list[str]:
+	"""Geohash prefixes whose cells together cover the circle of ``radius_km``.
+
+	Picks the finest precision that needs at most MAX_COVER_CELLS cells for the
+	circle's bounding box, so a query is a handful of index range scans.
+	"""
+	dlat = radius_km / 111.32
+	dlon = radius_km / (111.32 * max(math.cos(math.radians(lat)), 0.01))
+	if dlon >= 180.0:
+		return [""]
+	for precision in range(GEOHASH_PRECISION, 0, -1):
+		h, w = geohash_cell_size(precision)
+		rows = math.ceil(2 * dlat / h) + 1
+		cols = math.ceil(2 * dlon / w) + 1
+		if rows * cols <= MAX_COVER_CELLS:
+			break
+	else:
+		return [""]
+	# sampling every cell-height/width plus the far edge touches every intersected cell
+	lats = [lat - dlat + i * h for i in range(rows - 1)] + [lat + dlat]
+	lons = [lon - dlon + j * w for j in range(cols - 1)] + [lon + dlon]
+	cells = []
+	for cell_lat in lats:
+		cell_lat = min(max(cell_lat, -90.0), 90.0 - 1e-9)
+		for cell_lon in lons:
+			cell = geohash_encode(cell_lat, (cell_lon + 180.0) % 360.0 - 180.0, precision)
+			if cell not in cells:
+				cells.append(cell)
+	return cells
+
+
+def to_unit_vectors(points) -> np.ndarray:
+	"""Convert (lat, lon) degrees into an (n, 3) array of unit vectors on the sphere."""
+	arr = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+	lat = np.radians(arr[:, 0])
+	lon = np.radians(arr[:, 1])
+	cos_lat = np.cos(lat)
+	return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def to_lat_lon(vectors: np.ndarray) -> np.ndarray:
+	"""Inverse of ``to_unit_vectors``; returns an (n, 2) array of (lat, lon) degrees."""
+	v = np.asarray(vectors, dtype=np.float64).reshape(-1, 3)
+	lat = np.degrees(np.arctan2(v[:, 2], np.hypot(v[:, 0], v[:, 1])))
+	lon = np.degrees(np.arctan2(v[:, 1], v[:, 0]))
+	return np.column_stack((lat, lon))
+
+
+def haversine_matrix_km(a, b) -> np.ndarray:
+	"""Batched great-circle distances between every point in ``a`` and every point in ``b``."""
+	ua = to_unit_vectors(a)
+	ub = to_unit_vectors(b)
+	return _chord_to_km(_sq_chord(ua, ub))
+
+
+def _sq_chord(ua: np.ndarray, ub: np.ndarray) -> np.ndarray:
+	# |a - b|^2 = 2 - 2 a.b for unit vectors; monotonic in great-circle distance
+	return np.maximum(2.0 - 2.0 * (ua @ ub.T), 0.0)
+
+
+def _chord_to_km(sq_chord: np.ndarray) -> np.ndarray:
+	return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.sqrt(sq_chord) / 2.0, 1.0))
 
 
+def _normalize(v: np.ndarray) -> np.ndarray:
+	norms = np.linalg.norm(v, axis=1, keepdims=True)
+	norms[norms == 0] = 1.0
+	return v / norms
+
+
+def _kmeans_pp(X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+	"""k-means++ seeding on unit vectors."""
+	n = X.shape[0]
+	centroids = np.empty((k, 3))
+	centroids[0] = X[rng.integers(n)]
+	closest = _sq_chord(X, centroids[:1])[:, 0]
+	for i in range(1, k):
+		total = closest.sum()
+		if total <= 0:
+			# all remaining points coincide with a centroid
+			centroids[i:] = centroids[0]
+			break
+		idx = rng.choice(n, p=closest / total)
+		centroids[i] = X[idx]
+		closest = np.minimum(closest, _sq_chord(X, centroids[i:i + 1])[:, 0])
+	return centroids
+
+
+def _assign(X: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+	"""Nearest-centroid labels, computed in chunks to bound memory on large inputs."""
+	labels = np.empty(X.shape[0], dtype=np.intp)
+	for start in range(0, X.shape[0], chunk):
+		# maximizing the dot product is the same as minimizing the chord distance
+		labels[start:start + chunk] = np.argmax(X[start:start + chunk] @ centroids.T, axis=1)
+	return labels
+
+
+def _update_centroids(X: np.ndarray, labels: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+	k = centroids.shape[0]
+	sums = np.zeros((k, 3))
+	np.add.at(sums, labels, X)
+	counts = np.bincount(labels, minlength=k)
+	new = centroids.copy()
+	filled = counts > 0
+	new[filled] = _normalize(sums[filled])
+	return new
+
+
+def nearest_centroid(point: Tuple[float, float], centroids) -> int:
+	"""Index of the centroid (given as (lat, lon) pairs) closest to ``point``."""
+	return int(np.argmax(to_unit_vectors(centroids) @ to_unit_vectors([point])[0]))
+
+
+def kmeans(
+	points,
+	k: int,
+	max_iter: int = 100,
+	tol_km: float = 0.01,
+	batch_size: Optional[int] = None,
+	seed: Optional[int] = 0,
+	init=None,
+) -> Tuple[np.ndarray, np.ndarray]:
+	"""Spherical k-means over (lat, lon) points.
+
+	Seeds with k-means++ (or warm-starts from ``init`` centroids), stops early once
+	no centroid moves more than ``tol_km``, and switches to mini-batch updates when
+	``batch_size`` is smaller than the input.
+	Returns ``(labels, centroids)`` where centroids are (lat, lon) degrees.
+	"""
+	X = to_unit_vectors(points)
+	n = X.shape[0]
+	if n == 0 or k <= 0:
+		return np.empty(0, dtype=np.intp), np.empty((0, 2))
+	k = min(k, n)
+	rng = np.random.default_rng(seed)
+	if init is not None and len(init) == k:
+		centroids = to_unit_vectors(init)
+	else:
+		centroids = _kmeans_pp(X, k, rng)
+	# tolerance expressed as squared chord length between old and new centroid
+	tol = (2.0 * math.sin(tol_km / (2.0 * EARTH_RADIUS_KM))) ** 2
+
+	if batch_size and batch_size < n:
+		counts = np.zeros(k)
+		for _ in range(max_iter):
+			batch = X[rng.choice(n, size=batch_size, replace=False)]
+			batch_labels = _assign(batch, centroids)
+			sums = np.zeros((k, 3))
+			np.add.at(sums, batch_labels, batch)
+			batch_counts = np.bincount(batch_labels, minlength=k)
+			counts += batch_counts
+			# per-centre learning rate 1/count (Sculley 2010)
+			step = np.divide(batch_counts, counts, out=np.zeros(k), where=counts > 0)[:, None]
+			means = np.divide(sums, np.maximum(batch_counts, 1)[:, None])
+			new = _normalize(centroids + step * (means - centroids))
+			shift = np.sum((new - centroids) ** 2, axis=1).max()
+			centroids = new
+			if shift <= tol:
+				break
+	else:
+		for _ in range(max_iter):
+			labels = _assign(X, centroids)
+			new = _update_centroids(X, labels, centroids)
+			shift = np.sum((new - centroids) ** 2, axis=1).max()
+			centroids = new
+			if shift <= tol:
+				break
+
+	return _assign(X, centroids), to_lat_lon(centroids)
+
+
+def labels_to_clusters(labels: np.ndarray, k: int) -> list[list[int]]:
+	"""Group point indices by label into ``k`` index lists."""
+	order = np.argsort(labels, kind="stable")
+	bounds = np.searchsorted(labels[order], np.arange(k + 1))
+	return [order[bounds[i]:bounds[i + 1]].tolist() for i in range(k)]
+
+
+def kmeans_once(points: list[Tuple[float, float]], k: int, iters: int = 100) -> list[list[int]]:
+	"""k-means returning clusters as index lists (``k`` lists, some possibly empty).
+	``iters`` is an upper bound; iteration stops early on convergence.
+	"""
+	if not points or k <= 0:
+		return []
+	batch_size = MINIBATCH_SIZE if len(points) > MINIBATCH_THRESHOLD else None
+	labels, _ = kmeans(points, k, max_iter=iters, batch_size=batch_size)
+	return labels_to_clusters(labels, k)
@@ -0,0 +1,181 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Optional
+from flask import current_app, g, has_request_context, jsonify, request
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from ..config import Config
+
+MAX_KEY_LENGTH = 255
+# how long a request may hold its key before a retry is allowed to run it again
+PENDING_TTL_SECONDS = 60
+
+
+class MemoryIdempotencyStore:
+	"""Key -> record in one LRU-ordered dict with per-entry expiry.
+
+	A record is ``{"fp": request fingerprint}`` while the first request runs, then
+	also holds the response (``status``, ``body``, ``mimetype``). Least recently used
+	keys fall off once ``maxsize`` is reached.
+	"""
+
+	def __init__(self, ttl: float, maxsize: int = 100000):
+		self.ttl = ttl
+		self.maxsize = maxsize
+		self._data: OrderedDict = OrderedDict()
+		self._lock = threading.Lock()
+
+	def reserve(self, key: str, fingerprint: str) -> Optional[dict]:
+		"""Claim ``key`` for a new request; returns None if claimed, else the existing record."""
+		now = time.monotonic()
+		with self._lock:
+			item = self._data.get(key)
+			if item is not None and item[0] >= now:
+				self._data.move_to_end(key)
+				return item[1]
+			self._data[key] = (now + PENDING_TTL_SECONDS, {"fp": fingerprint})
+			self._data.move_to_end(key)
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+			return None
+
+	def complete(self, key: str, record: dict) -> None:
+		with self._lock:
+			self._data[key] = (time.monotonic() + self.ttl, record)
+
+	def release(self, key: str) -> None:
+		with self._lock:
+			self._data.pop(key, None)
+
+
+class RedisIdempotencyStore:
+	"""Same interface shared by every worker through Redis (SET NX claims the key)."""
+
+	def __init__(self, client, ttl: float):
+		self._r = client
+		self.ttl = int(ttl)
+
+	def reserve(self, key: str, fingerprint: str) -> Optional[dict]:
+		name = f"idempotency:{key}"
+		if self._r.set(name, json.dumps({"fp": fingerprint}), nx=True, ex=PENDING_TTL_SECONDS):
+			return None
+		raw = self._r.get(name)
+		# expired between the two calls: treat as still running, the client retries
+		return json.loads(raw) if raw else {"fp": fingerprint}
+
+	def complete(self, key: str, record: dict) -> None:
+		self._r.set(f"idempotency:{key}", json.dumps(record), ex=self.ttl)
+
+	def release(self, key: str) -> None:
+		self._r.delete(f"idempotency:{key}")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+	global _store
+	with _store_lock:
+		if _store is None:
+			if Config.IDEMPOTENCY_REDIS_URL:
+				import redis
+				_store = RedisIdempotencyStore(redis.Redis.from_url(Config.IDEMPOTENCY_REDIS_URL), Config.IDEMPOTENCY_TTL_SECONDS)
+			else:
+				_store = MemoryIdempotencyStore(Config.IDEMPOTENCY_TTL_SECONDS, Config.IDEMPOTENCY_MAX_KEYS)
+		return _store
+
+
+def idempotent(fn):
+	"""Replay the stored response for a repeated ``Idempotency-Key`` header.
+
+	Place below @jwt_required_json: keys are scoped to the caller and the path. The
+	first request with a key runs the view and its response is kept for
+	IDEMPOTENCY_TTL_SECONDS. A 5xx response or an exception frees the key for a retry
+	only if nothing was committed; once a write has committed, the failure is stored
+	like any other response so a retry can't apply it twice.
+	A repeat gets the stored response without running the view; a repeat while the
+	first is still running gets 409, and reusing a key with a different body gets 422.
+	Requests without the header run as usual.
+	"""
+
+	@wraps(fn)
+	def wrapper(*args, **kwargs):
+		key = request.headers.get("Idempotency-Key")
+		if not key:
+			return fn(*args, **kwargs)
+		if len(key) > MAX_KEY_LENGTH:
+			return jsonify({"error": "Idempotency-Key too long"}), 400
+
+		scoped = f"{get_jwt_identity()}:{request.path}:{key}"
+		fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+		store = get_store()
+		record = store.reserve(scoped, fingerprint)
+		if record is not None:
+			if record["fp"] != fingerprint:
+				return jsonify({"error": "Idempotency-Key was used with a different request"}), 422
+			if "status" not in record:
+				resp = jsonify({"error": "A request with this Idempotency-Key is still in progress"})
+				resp.headers["Retry-After"] = "1"
+				return resp, 409
+			resp = current_app.response_class(record["body"], status=record["status"], mimetype=record["mimetype"])
+			resp.headers["Idempotent-Replayed"] = "true"
+			return resp
+
+		g.idempotent_write_committed = False
+		try:
+			resp = current_app.make_response(fn(*args, **kwargs))
+		except Exception:
+			if g.idempotent_write_committed:
+				store.complete(scoped, {
+					"fp": fingerprint,
+					"status": 500,
+					"body": json.dumps({"error": "Internal server error"}),
+					"mimetype": "application/json",
+				})
+			else:
+				store.release(scoped)
+			raise
+		if resp.is_streamed:
+			# a committed write keeps the key reserved until PENDING_TTL_SECONDS
+			if not g.idempotent_write_committed:
+				store.release(scoped)
+		elif resp.status_code >= 500 and not g.idempotent_write_committed:
+			store.release(scoped)
+		else:
+			store.complete(scoped, {
+				"fp": fingerprint,
+				"status": resp.status_code,
+				"body": resp.get_data(as_text=True),
+				"mimetype": resp.mimetype,
+			})
+		return resp
+
+	return wrapper
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_write(state):
+	if state.is_insert or state.is_update or state.is_delete:
+		state.session.info["idempotent_wrote"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session, flush_context):
+	session.info["idempotent_wrote"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _note_commit(session):
+	if session.info.pop("idempotent_wrote", False) and has_request_context():
+		g.idempotent_write_committed = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_write(session):
+	session.info.pop("idempotent_wrote", None)
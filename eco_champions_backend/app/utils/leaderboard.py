@@ -0,0 +1,234 @@
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from flask import current_app
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session
+from sortedcontainers import SortedList
+from ..config import Config
+from ..database import db
+from ..models import CoinDailyRollup, User
+
+GLOBAL = "global"
+
+
+def community_board(community: str) -> str:
+	return f"community:{community}"
+
+
+def month_board(month: Optional[str] = None) -> str:
+	return f"month:{month or datetime.utcnow().strftime('%Y-%m')}"
+
+
+class MemoryBoard:
+	"""In-process ranking: a score map plus a SortedList of (-score, member).
+	Updates, rank-of-member and top-N are all O(log n).
+	"""
+
+	def __init__(self):
+		self._scores: dict[str, float] = {}
+		self._order = SortedList()
+		self._lock = threading.Lock()
+
+	def _set(self, member: str, score: float) -> None:
+		old = self._scores.get(member)
+		if old is not None:
+			self._order.remove((-old, member))
+		self._scores[member] = score
+		self._order.add((-score, member))
+
+	def load(self, scores: dict) -> None:
+		with self._lock:
+			self._scores = dict(scores)
+			self._order = SortedList((-s, m) for m, s in scores.items())
+
+	def set(self, member: str, score: float) -> None:
+		with self._lock:
+			self._set(member, score)
+
+	def incr(self, member: str, delta: float) -> None:
+		with self._lock:
+			self._set(member, self._scores.get(member, 0) + delta)
+
+	def rank(self, member: str) -> Optional[tuple[int, float]]:
+		"""0-based rank and score, or None if the member is not ranked."""
+		with self._lock:
+			score = self._scores.get(member)
+			if score is None:
+				return None
+			return self._order.index((-score, member)), score
+
+	def top(self, n: int) -> list[tuple[str, float]]:
+		with self._lock:
+			return [(m, -s) for s, m in self._order.islice(0, n)]
+
+
+class RedisBoard:
+	"""Same interface backed by a Redis sorted set, shared by every worker."""
+
+	def __init__(self, client, key: str):
+		self._r = client
+		self._key = key
+
+	def load(self, scores: dict) -> None:
+		pipe = self._r.pipeline()
+		pipe.delete(self._key)
+		if scores:
+			pipe.zadd(self._key, scores)
+		pipe.execute()
+
+	def set(self, member: str, score: float, pipe=None) -> None:
+		(pipe or self._r).zadd(self._key, {member: score})
+
+	def incr(self, member: str, delta: float, pipe=None) -> None:
+		(pipe or self._r).zincrby(self._key, delta, member)
+
+	def rank(self, member: str) -> Optional[tuple[int, float]]:
+		pipe = self._r.pipeline()
+		pipe.zrevrank(self._key, member)
+		pipe.zscore(self._key, member)
+		rank, score = pipe.execute()
+		return None if rank is None else (rank, score)
+
+	def top(self, n: int) -> list[tuple[str, float]]:
+		return [(m.decode() if isinstance(m, bytes) else m, s) for m, s in self._r.zrevrange(self._key, 0, n - 1, withscores=True)]
+
+
+class Leaderboards:
+	"""Global, per-community and per-month coin rankings, updated on each award.
+
+	Boards are built from the database on first use and then maintained
+	incrementally from committed awards. In-process boards only see this
+	process's awards, so they are rebuilt after LEADERBOARD_RESYNC_SECONDS;
+	set LEADERBOARD_REDIS_URL to share one set of boards across workers.
+	"""
+
+	def __init__(self, redis_url: Optional[str] = None, resync_seconds: float = 300.0):
+		self.resync_seconds = resync_seconds
+		self._redis = None
+		if redis_url:
+			import redis
+			self._redis = redis.Redis.from_url(redis_url)
+		self._boards: dict = {}
+		self._loaded_at: dict[str, float] = {}
+		self._lock = threading.Lock()
+
+	def _board(self, key: str):
+		with self._lock:
+			board = self._boards.get(key)
+			if board is None:
+				board = RedisBoard(self._redis, f"leaderboard:{key}") if self._redis else MemoryBoard()
+				self._boards[key] = board
+			return board
+
+	def _stale(self, key: str) -> bool:
+		loaded = self._loaded_at.get(key)
+		if loaded is None:
+			if self._redis is not None and self._redis.exists(f"leaderboard:{key}"):
+				self._loaded_at[key] = time.monotonic()
+				return False
+			return True
+		return self._redis is None and time.monotonic() - loaded > self.resync_seconds
+
+	def _scores_from_db(self, key: str) -> dict:
+		if key.startswith("month:"):
+			start = datetime.strptime(key[len("month:"):], "%Y-%m")
+			end = start.replace(year=start.year + (start.month == 12), month=start.month % 12 + 1)
+			# from the daily rollups, which outlive the archived raw ledger rows
+			rows = db.session.query(CoinDailyRollup.user_id, func.sum(CoinDailyRollup.total)).filter(
+				CoinDailyRollup.day >= start.date(), CoinDailyRollup.day < end.date()
+			).group_by(CoinDailyRollup.user_id)
+			return {str(uid): total or 0 for uid, total in rows}
+		query = db.session.query(User.id, func.coalesce(User.eco_coins, 0))
+		if key.startswith("community:"):
+			query = query.filter(User.community == key[len("community:"):])
+		return {str(uid): coins for uid, coins in query}
+
+	def board(self, key: str):
+		"""The board for ``key``, (re)built from the database when missing or stale."""
+		if self._stale(key):
+			return self.rebuild(key)
+		return self._board(key)
+
+	def rebuild(self, key: str):
+		"""Reload the board for ``key`` from the database; returns it."""
+		board = self._board(key)
+		board.load(self._scores_from_db(key))
+		self._loaded_at[key] = time.monotonic()
+		return board
+
+	def apply(self, changes: list[tuple]) -> None:
+		"""Apply committed ``(user_id, community, new_total, delta)`` changes to loaded boards.
+		Boards not loaded yet are skipped; they read the committed totals when built.
+		With Redis this is at most two round trips: one EXISTS batch, one write batch.
+		"""
+		month = month_board()
+		updates = []
+		for user_id, community, total, delta in changes:
+			member = str(user_id)
+			updates.append((GLOBAL, member, total, False))
+			if community:
+				updates.append((community_board(community), member, total, False))
+			updates.append((month, member, delta, True))
+		loaded = self._loaded_keys({key for key, *_ in updates})
+		pipe = self._redis.pipeline(transaction=False) if self._redis is not None else None
+		for key, member, value, incr in updates:
+			if key not in loaded:
+				continue
+			board = self._board(key)
+			kwargs = {"pipe": pipe} if pipe is not None else {}
+			if incr:
+				board.incr(member, value, **kwargs)
+			else:
+				board.set(member, value, **kwargs)
+		if pipe is not None and loaded:
+			pipe.execute()
+
+	def mark_stale(self) -> None:
+		"""Rebuild in-process boards from the database on next use. Redis boards are
+		reconciled with the rebuild-leaderboards command.
+		"""
+		self._loaded_at.clear()
+
+	def _loaded_keys(self, keys: set) -> set:
+		"""The subset of ``keys`` whose boards are loaded. Loaded state is cached per
+		board; with Redis the unknown ones are checked in one pipelined EXISTS.
+		"""
+		loaded = {key for key in keys if key in self._loaded_at}
+		unknown = [key for key in keys if key not in loaded]
+		if self._redis is not None and unknown:
+			pipe = self._redis.pipeline(transaction=False)
+			for key in unknown:
+				pipe.exists(f"leaderboard:{key}")
+			now = time.monotonic()
+			for key, exists in zip(unknown, pipe.execute()):
+				if exists:
+					self._loaded_at[key] = now
+					loaded.add(key)
+		return loaded
+
+
+leaderboards = Leaderboards(Config.LEADERBOARD_REDIS_URL, Config.LEADERBOARD_RESYNC_SECONDS)
+
+
+def queue_leaderboard_update(changes: list[tuple]) -> None:
+	"""Stage changes on the current session; they reach the boards only if it commits."""
+	db.session.info.setdefault("leaderboard_changes", []).extend(changes)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_leaderboard_changes(session):
+	changes = session.info.pop("leaderboard_changes", None)
+	if changes:
+		# the rows are committed: a failure here must not turn the commit into an error
+		try:
+			leaderboards.apply(changes)
+		except Exception:
+			current_app.logger.exception("Leaderboard update failed; boards will be rebuilt")
+			leaderboards.mark_stale()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_leaderboard_changes(session):
+	session.info.pop("leaderboard_changes", None)
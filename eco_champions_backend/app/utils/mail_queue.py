@@ -0,0 +1,194 @@
+import random
+import smtplib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Optional
+from flask import Flask
+from ..config import Config
+from .mailer import PooledSMTP, build_message, mail_configured
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+	id INTEGER PRIMARY KEY AUTOINCREMENT,
+	to_email TEXT NOT NULL,
+	subject TEXT NOT NULL,
+	body TEXT NOT NULL,
+	status TEXT NOT NULL DEFAULT 'pending',
+	attempts INTEGER NOT NULL DEFAULT 0,
+	next_attempt_at REAL NOT NULL,
+	claimed_until REAL,
+	last_error TEXT,
+	created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+class MailQueue:
+	"""Durable outbound mail queue in a local SQLite file.
+
+	Workers claim due messages under a lease, so a crashed worker's batch becomes
+	claimable again once the lease expires. Failed sends are retried with
+	exponential backoff until ``max_attempts``, then marked dead.
+	"""
+
+	def __init__(self, path: str, max_attempts: int = 5, retry_base_seconds: float = 30.0):
+		self.path = path
+		self.max_attempts = max_attempts
+		self.retry_base_seconds = retry_base_seconds
+		with closing(self._connect()) as conn:
+			conn.execute("PRAGMA journal_mode=WAL")
+			conn.executescript(_SCHEMA)
+
+	def _connect(self) -> sqlite3.Connection:
+		# a short-lived connection per call keeps this safe across threads and greenlets
+		return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+	def enqueue(self, to_email: str, subject: str, body: str) -> int:
+		now = time.time()
+		with closing(self._connect()) as conn:
+			cur = conn.execute(
+				"INSERT INTO outbox (to_email, subject, body, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?)",
+				(to_email, subject, body, now, now),
+			)
+			return cur.lastrowid
+
+	def claim(self, limit: int, lease_seconds: float = 120.0) -> list[tuple]:
+		"""Lease up to ``limit`` due messages; returns (id, to_email, subject, body, attempts) rows."""
+		now = time.time()
+		conn = self._connect()
+		try:
+			conn.execute("BEGIN IMMEDIATE")
+			rows = conn.execute(
+				"SELECT id, to_email, subject, body, attempts FROM outbox "
+				"WHERE status = 'pending' AND next_attempt_at <= ? AND (claimed_until IS NULL OR claimed_until < ?) "
+				"ORDER BY next_attempt_at LIMIT ?",
+				(now, now, limit),
+			).fetchall()
+			if rows:
+				conn.executemany(
+					"UPDATE outbox SET claimed_until = ? WHERE id = ?",
+					[(now + lease_seconds, row[0]) for row in rows],
+				)
+			conn.execute("COMMIT")
+			return rows
+		except Exception:
+			conn.execute("ROLLBACK")
+			raise
+		finally:
+			conn.close()
+
+	def mark_sent(self, ids: list[int]) -> None:
+		if not ids:
+			return
+		with closing(self._connect()) as conn:
+			conn.executemany("UPDATE outbox SET status = 'sent', claimed_until = NULL WHERE id = ?", [(i,) for i in ids])
+
+	def mark_failed(self, msg_id: int, attempts: int, error: str) -> None:
+		attempts += 1
+		if attempts >= self.max_attempts:
+			status, next_at = "dead", time.time()
+		else:
+			# exponential backoff with jitter so retries of a burst do not align
+			delay = self.retry_base_seconds * (2 ** (attempts - 1))
+			status, next_at = "pending", time.time() + delay * random.uniform(0.8, 1.2)
+		with closing(self._connect()) as conn:
+			conn.execute(
+				"UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, claimed_until = NULL, last_error = ? WHERE id = ?",
+				(status, attempts, next_at, error[:500], msg_id),
+			)
+
+	def counts(self) -> dict:
+		with closing(self._connect()) as conn:
+			return dict(conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+
+_queue: Optional[MailQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> MailQueue:
+	global _queue
+	with _queue_lock:
+		if _queue is None:
+			_queue = MailQueue(Config.MAIL_QUEUE_PATH, Config.MAIL_MAX_ATTEMPTS, Config.MAIL_RETRY_BASE_SECONDS)
+		return _queue
+
+
+def enqueue_mail(to_email: str, subject: str, body: str) -> Optional[str]:
+	"""Queue a plaintext email for background delivery.
+	Returns None when queued, or an error string (same contract as send_mail).
+	"""
+	if not mail_configured():
+		return "Mail server not configured"
+	try:
+		get_queue().enqueue(to_email, subject, body)
+		return None
+	except Exception as e:
+		return str(e)
+
+
+def deliver_batch(queue: MailQueue, smtp: PooledSMTP, limit: int) -> int:
+	"""Send one claimed batch over ``smtp``. Returns how many messages were claimed.
+
+	A refused message is retried later on its own. When the server can't be reached
+	(``smtp.send`` has already retried on a fresh session) the batch stops; the rest
+	keep their lease and are claimed again once it expires.
+	"""
+	rows = queue.claim(limit)
+	sent = []
+	try:
+		for msg_id, to_email, subject, body, attempts in rows:
+			try:
+				smtp.send(build_message(to_email, subject, body))
+				sent.append(msg_id)
+			except (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError) as e:
+				queue.mark_failed(msg_id, attempts, str(e))
+				smtp.close()
+				break
+			except smtplib.SMTPException as e:
+				# this message was refused; the session is still usable
+				queue.mark_failed(msg_id, attempts, str(e))
+			except OSError as e:
+				# socket errors other than the above (SMTPException is an OSError too)
+				queue.mark_failed(msg_id, attempts, str(e))
+				smtp.close()
+				break
+			except Exception as e:
+				queue.mark_failed(msg_id, attempts, str(e))
+	finally:
+		queue.mark_sent(sent)
+	return len(rows)
+
+
+def start_mail_workers(app: Flask) -> list[threading.Thread]:
+	"""Start MAIL_WORKERS delivery threads, each holding its own pooled SMTP session.
+
+	Plain threads are used so blocking SMTP I/O never stalls the eventlet hub when
+	the process is not monkey-patched (under monkey-patching they become greenlets).
+	"""
+	if not mail_configured():
+		return []
+	queue = get_queue()
+	batch = app.config.get("MAIL_BATCH_SIZE", 20)
+	poll = app.config.get("MAIL_POLL_SECONDS", 1.0)
+
+	def loop():
+		smtp = PooledSMTP()
+		while True:
+			try:
+				if deliver_batch(queue, smtp, batch) == 0:
+					time.sleep(poll)
+			except Exception:
+				app.logger.exception("Mail worker error")
+				smtp.close()
+				time.sleep(poll)
+
+	workers = []
+	for i in range(app.config.get("MAIL_WORKERS", 2)):
+		t = threading.Thread(target=loop, name=f"mail-worker-{i}", daemon=True)
+		t.start()
+		workers.append(t)
+	return workers
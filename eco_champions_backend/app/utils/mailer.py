@@ -1,37 +1,86 @@
 import smtplib
+import time
 from email.mime.text import MIMEText
 from typing import Optional
 from ..config import Config
 
 
-def send_mail(to_email: str, subject: str, body: str) -> Optional[str]:
-	"""Send a simple plaintext email using configured SMTP server.
-	Returns None on success, or an error string on failure.
-	"""
-	server = Config.MAIL_SERVER
-	port = Config.MAIL_PORT
-	username = Config.MAIL_USERNAME
-	password = Config.MAIL_PASSWORD
-	use_tls = Config.MAIL_USE_TLS
-	from_email = Config.MAIL_DEFAULT_SENDER or username
-
-	if not (server and port and username and password and from_email):
-		return "Mail server not configured"
+def mail_configured() -> bool:
+	"""Credentials are optional (e.g. a local relay or test stub); server and sender are not."""
+	return bool(Config.MAIL_SERVER and Config.MAIL_PORT and (Config.MAIL_DEFAULT_SENDER or Config.MAIL_USERNAME))
+
 
+def build_message(to_email: str, subject: str, body: str) -> MIMEText:
 	msg = MIMEText(body)
 	msg["Subject"] = subject
-	msg["From"] = from_email
+	msg["From"] = Config.MAIL_DEFAULT_SENDER or Config.MAIL_USERNAME
 	msg["To"] = to_email
+	return msg
 
-	try:
-		smtp = smtplib.SMTP(server, port)
-		if use_tls:
+
+class PooledSMTP:
+	"""A long-lived SMTP session reused across sends.
+
+	Connects (STARTTLS + login) lazily, checks the session with NOOP after it has
+	been idle, and reconnects once on a dropped connection.
+	"""
+
+	def __init__(self, idle_check_seconds: float = 30.0):
+		self.idle_check_seconds = idle_check_seconds
+		self._smtp: Optional[smtplib.SMTP] = None
+		self._last_used = 0.0
+
+	def _connect(self) -> smtplib.SMTP:
+		smtp = smtplib.SMTP(Config.MAIL_SERVER, Config.MAIL_PORT, timeout=30)
+		if Config.MAIL_USE_TLS:
 			smtp.starttls()
-		smtp.login(username, password)
-		smtp.sendmail(from_email, [to_email], msg.as_string())
-		smtp.quit()
+		if Config.MAIL_USERNAME and Config.MAIL_PASSWORD:
+			smtp.login(Config.MAIL_USERNAME, Config.MAIL_PASSWORD)
+		return smtp
+
+	def _session(self) -> smtplib.SMTP:
+		if self._smtp is not None and time.monotonic() - self._last_used > self.idle_check_seconds:
+			try:
+				if self._smtp.noop()[0] != 250:
+					self.close()
+			except smtplib.SMTPException:
+				self.close()
+			except OSError:
+				self.close()
+		if self._smtp is None:
+			self._smtp = self._connect()
+		return self._smtp
+
+	def send(self, msg: MIMEText) -> None:
+		try:
+			self._session().sendmail(msg["From"], [msg["To"]], msg.as_string())
+		except (smtplib.SMTPServerDisconnected, ConnectionError):
+			# server dropped an idle session; retry once on a fresh one
+			self.close()
+			self._session().sendmail(msg["From"], [msg["To"]], msg.as_string())
+		self._last_used = time.monotonic()
+
+	def close(self) -> None:
+		if self._smtp is not None:
+			try:
+				self._smtp.quit()
+			except Exception:
+				pass
+		self._smtp = None
+
+
+def send_mail(to_email: str, subject: str, body: str) -> Optional[str]:
+	"""Send a simple plaintext email on a one-off SMTP session.
+	Returns None on success, or an error string on failure.
+	Routes should prefer utils.mail_queue.enqueue_mail.
+	"""
+	if not mail_configured():
+		return "Mail server not configured"
+	smtp = PooledSMTP()
+	try:
+		smtp.send(build_message(to_email, subject, body))
 		return None
 	except Exception as e:
 		return str(e)
-
-
+	finally:
+		smtp.close()
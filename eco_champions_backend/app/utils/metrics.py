@@ -0,0 +1,163 @@
+import bisect
+import threading
+import time
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Counter:
+	def __init__(self, name: str, help_text: str, labels: tuple = ()):
+		self.name, self.help, self.labels = name, help_text, labels
+		self._values: dict[tuple, float] = {}
+		self._lock = threading.Lock()
+
+	def inc(self, *label_values, amount: float = 1) -> None:
+		with self._lock:
+			self._values[label_values] = self._values.get(label_values, 0) + amount
+
+	def render(self) -> list[str]:
+		lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+		with self._lock:
+			for values, total in sorted(self._values.items()):
+				lines.append(f"{self.name}{_labels(self.labels, values)} {total}")
+		return lines
+
+
+class Histogram:
+	"""Fixed-bucket histogram; observe() is a bisect plus two adds under a lock."""
+
+	def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+		self.name, self.help, self.labels = name, help_text, labels
+		self.buckets = tuple(buckets)
+		# label values -> [per-bucket counts (last is +Inf), sum]
+		self._series: dict[tuple, list] = {}
+		self._lock = threading.Lock()
+
+	def observe(self, value: float, *label_values) -> None:
+		i = bisect.bisect_left(self.buckets, value)
+		with self._lock:
+			series = self._series.get(label_values)
+			if series is None:
+				series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+			series[0][i] += 1
+			series[1] += value
+
+	def totals(self, *label_values) -> tuple[int, float]:
+		"""(count, sum) observed so far for one label combination."""
+		with self._lock:
+			series = self._series.get(label_values)
+			return (sum(series[0]), series[1]) if series else (0, 0.0)
+
+	def render(self) -> list[str]:
+		lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+		with self._lock:
+			series = sorted((values, list(counts), total) for values, (counts, total) in self._series.items())
+		for values, counts, total in series:
+			cumulative = 0
+			for bound, count in zip(self.buckets + ("+Inf",), counts):
+				cumulative += count
+				lines.append(f"{self.name}_bucket{_labels(self.labels + ('le',), values + (bound,))} {cumulative}")
+			lines.append(f"{self.name}_sum{_labels(self.labels, values)} {total}")
+			lines.append(f"{self.name}_count{_labels(self.labels, values)} {cumulative}")
+		return lines
+
+
+def _labels(names: tuple, values: tuple) -> str:
+	if not names:
+		return ""
+	pairs = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+	return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+	return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_LATENCY = Histogram(
+	"http_request_duration_seconds", "HTTP request latency by route.", ("method", "endpoint", "status"))
+REQUEST_QUERIES = Histogram(
+	"http_request_db_queries", "SQL statements executed per HTTP request.", ("method", "endpoint"), QUERY_COUNT_BUCKETS)
+REQUEST_DB_TIME = Histogram(
+	"http_request_db_seconds", "Time spent in SQL per HTTP request.", ("method", "endpoint"))
+QUERY_BUDGET_EXCEEDED = Counter(
+	"http_request_query_budget_exceeded_total", "Requests that ran more SQL statements than QUERY_BUDGET.", ("method", "endpoint"))
+SOCKET_EMITS = Counter(
+	"socketio_emits_total", "Socket.IO emits by event.", ("event",))
+SOCKET_EMIT_ROOMS = Counter(
+	"socketio_emit_rooms_total", "Rooms targeted by Socket.IO emits, by event.", ("event",))
+
+REGISTRY = [REQUEST_LATENCY, REQUEST_QUERIES, REQUEST_DB_TIME, QUERY_BUDGET_EXCEEDED, SOCKET_EMITS, SOCKET_EMIT_ROOMS]
+
+
+def count_emit(event_name: str, rooms: int = 1) -> None:
+	SOCKET_EMITS.inc(event_name)
+	SOCKET_EMIT_ROOMS.inc(event_name, amount=rooms)
+
+
+def render_metrics() -> str:
+	lines = []
+	for metric in REGISTRY:
+		lines.extend(metric.render())
+	return "\n".join(lines) + "\n"
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	if context is not None and has_request_context() and "metrics_start" in g:
+		context._metrics_query_start = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+	start = getattr(context, "_metrics_query_start", None)
+	if start is not None and has_request_context() and "metrics_start" in g:
+		g.metrics_queries += 1
+		g.metrics_db_seconds += time.perf_counter() - start
+
+
+def init_metrics(app: Flask) -> None:
+	"""Time every request, count its SQL, and serve Prometheus text on /metrics.
+	Metrics are per process; scrape each worker (or front them with a per-pod scrape).
+	"""
+	if not app.config.get("METRICS_ENABLED", True):
+		return
+
+	@app.before_request
+	def _start_timer():
+		g.metrics_start = time.perf_counter()
+		g.metrics_queries = 0
+		g.metrics_db_seconds = 0.0
+
+	@app.after_request
+	def _status(response):
+		g.metrics_status = response.status_code
+		return response
+
+	@app.teardown_request
+	def _record(exc):
+		# teardown also runs for unhandled exceptions, which never reach after_request
+		start = g.pop("metrics_start", None)
+		if start is None:
+			return
+		# the URL rule, not the path, keeps label cardinality bounded
+		endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+		if endpoint == "/metrics":
+			return
+		method = request.method
+		status = 500 if exc is not None else g.pop("metrics_status", 500)
+		REQUEST_LATENCY.observe(time.perf_counter() - start, method, endpoint, status)
+		REQUEST_QUERIES.observe(g.metrics_queries, method, endpoint)
+		REQUEST_DB_TIME.observe(g.metrics_db_seconds, method, endpoint)
+		budget = app.config.get("QUERY_BUDGET", 20)
+		if g.metrics_queries > budget:
+			QUERY_BUDGET_EXCEEDED.inc(method, endpoint)
+			app.logger.warning("Possible N+1: %s %s ran %d SQL statements (budget %d)", method, endpoint, g.metrics_queries, budget)
+
+	def metrics():
+		return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+	app.add_url_rule("/metrics", "metrics", metrics)
@@ -0,0 +1,36 @@
+import base64
+import json
+import uuid
+from datetime import datetime
+
+
+def parse_limit(args, default: int = 50, maximum: int = 200) -> int:
+	"""Read ``limit`` from query args, clamped to [1, maximum]. Raises ValueError if not an int."""
+	return min(max(int(args.get("limit", default)), 1), maximum)
+
+
+def encode_cursor(*values) -> str:
+	"""Opaque keyset cursor over the sort-key values of the last row returned."""
+	raw = json.dumps([v.isoformat() if isinstance(v, datetime) else str(v) for v in values])
+	return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[str]:
+	try:
+		raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+		values = json.loads(raw)
+	except (ValueError, TypeError):
+		raise ValueError("Invalid cursor")
+	if not isinstance(values, list):
+		raise ValueError("Invalid cursor")
+	return values
+
+
+def decode_time_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+	"""Decode a (timestamp, id) cursor as produced by ``encode_cursor(ts, id)``."""
+	values = decode_cursor(cursor)
+	try:
+		ts, row_id = values
+		return datetime.fromisoformat(ts), uuid.UUID(row_id)
+	except (ValueError, TypeError):
+		raise ValueError("Invalid cursor")
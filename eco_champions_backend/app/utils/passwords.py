@@ -0,0 +1,37 @@
+from functools import lru_cache
+from werkzeug.security import check_password_hash, generate_password_hash
+from ..config import Config
+
+
+def _offload(fn, *args):
+	"""Run CPU-bound ``fn`` in eventlet's native thread pool so the hub keeps serving
+	other greenlets (sockets included); inline when PASSWORD_HASH_OFFLOAD is off.
+	Pool size: EVENTLET_THREADPOOL_SIZE (default 20).
+	"""
+	if not Config.PASSWORD_HASH_OFFLOAD:
+		return fn(*args)
+	from eventlet import tpool
+	return tpool.execute(fn, *args)
+
+
+def hash_password(password: str) -> str:
+	return _offload(generate_password_hash, password, Config.PASSWORD_HASH_METHOD, Config.PASSWORD_SALT_LENGTH)
+
+
+def verify_password(pwhash: str, password: str) -> bool:
+	if not pwhash:
+		return False
+	return _offload(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash: str) -> bool:
+	"""True if ``pwhash`` was made with other parameters than PASSWORD_HASH_METHOD.
+	Werkzeug hashes look like "<method>$<salt>$<hash>", e.g. "scrypt:32768:8:1$...".
+	"""
+	return pwhash.split("$", 1)[0] != _full_method(Config.PASSWORD_HASH_METHOD)
+
+
+@lru_cache(maxsize=8)
+def _full_method(method: str) -> str:
+	# werkzeug stores defaults explicitly ("scrypt" -> "scrypt:32768:8:1"), so ask it once per method
+	return _offload(generate_password_hash, "", method, 1).split("$", 1)[0]
@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Optional
+from flask import current_app, jsonify, request
+from ..config import Config
+
+
+class MemoryBuckets:
+	"""Token buckets keyed by string, in one LRU-ordered dict.
+
+	Each entry is just (tokens, last_refill). Idle keys fall off the LRU end once
+	``maxsize`` is reached; an evicted key comes back with a full bucket, which is
+	the state it would have refilled to anyway after being idle that long.
+	"""
+
+	def __init__(self, maxsize: int = 100000):
+		self.maxsize = maxsize
+		self._buckets: OrderedDict = OrderedDict()
+		self._lock = threading.Lock()
+
+	def take(self, key: str, rate: float, burst: int) -> float:
+		"""Take one token; returns 0 if allowed, else seconds until a token is available."""
+		now = time.monotonic()
+		with self._lock:
+			tokens, last = self._buckets.get(key, (burst, now))
+			tokens = min(burst, tokens + (now - last) * rate)
+			if tokens >= 1:
+				wait, tokens = 0.0, tokens - 1
+			else:
+				wait = (1 - tokens) / rate
+			self._buckets[key] = (tokens, now)
+			self._buckets.move_to_end(key)
+			while len(self._buckets) > self.maxsize:
+				self._buckets.popitem(last=False)
+			return wait
+
+	def refund(self, key: str, burst: int) -> None:
+		"""Return a token taken by a request that another bucket then rejected."""
+		with self._lock:
+			item = self._buckets.get(key)
+			if item is not None:
+				self._buckets[key] = (min(burst, item[0] + 1), item[1])
+
+
+# refill and take atomically on the Redis server; the key expires once it would be full again
+_TAKE_SCRIPT = """
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 't', 'ts')
+local tokens, last = tonumber(state[1]) or burst, tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - last) * rate)
+local wait = 0
+if tokens >= 1 then tokens = tokens - 1 else wait = (1 - tokens) / rate end
+redis.call('HSET', KEYS[1], 't', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+_REFUND_SCRIPT = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 't'))
+if tokens then redis.call('HSET', KEYS[1], 't', math.min(tonumber(ARGV[1]), tokens + 1)) end
+"""
+
+
+class RedisBuckets:
+	"""Same interface shared by every worker through Redis."""
+
+	def __init__(self, client):
+		self._take = client.register_script(_TAKE_SCRIPT)
+		self._refund = client.register_script(_REFUND_SCRIPT)
+
+	def take(self, key: str, rate: float, burst: int) -> float:
+		return float(self._take(keys=[f"ratelimit:{key}"], args=[rate, burst, time.time()]))
+
+	def refund(self, key: str, burst: int) -> None:
+		self._refund(keys=[f"ratelimit:{key}"], args=[burst])
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+	global _store
+	with _store_lock:
+		if _store is None:
+			if Config.RATE_LIMIT_REDIS_URL:
+				import redis
+				_store = RedisBuckets(redis.Redis.from_url(Config.RATE_LIMIT_REDIS_URL))
+			else:
+				_store = MemoryBuckets(Config.RATE_LIMIT_MAX_KEYS)
+		return _store
+
+
+def client_ip() -> Optional[str]:
+	# the client's address behind PROXY_FIX_HOPS trusted proxies (ProxyFix in create_app)
+	return request.remote_addr
+
+
+def json_email() -> Optional[str]:
+	email = (request.get_json(silent=True) or {}).get("email")
+	return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def rate_limit(scope: str, limits: list[tuple[Callable[[], Optional[str]], str]]):
+	"""Throttle a view with token buckets before it runs.
+
+	``limits`` pairs a key function (e.g. client_ip, json_email) with the name of a
+	config setting holding "<requests>/<seconds>": "10/60" allows a burst of 10,
+	refilled evenly over 60 s. A request is answered 429 with Retry-After as soon as
+	any of its buckets is empty, so throttled requests never reach the view (no DB
+	lookup, no password hash). Keys that resolve to None are not limited. A rejected
+	request gives back the tokens it already took from earlier buckets, so e.g. a
+	throttled email does not also drain its client's IP bucket.
+	"""
+
+	def decorator(fn):
+		@wraps(fn)
+		def wrapper(*args, **kwargs):
+			if current_app.config.get("RATE_LIMIT_ENABLED", True):
+				store = get_store()
+				taken = []
+				for key_fn, setting in limits:
+					key = key_fn()
+					if key is None:
+						continue
+					count, seconds = parse_limit_setting(current_app.config[setting])
+					bucket = f"{scope}:{key_fn.__name__}:{key}"
+					wait = store.take(bucket, count / seconds, count)
+					if wait <= 0:
+						taken.append((bucket, count))
+					else:
+						for earlier, burst in taken:
+							store.refund(earlier, burst)
+						resp = jsonify({"error": "Too many requests"})
+						resp.headers["Retry-After"] = str(int(wait) + 1)
+						return resp, 429
+			return fn(*args, **kwargs)
+		return wrapper
+	return decorator
+
+
+def parse_limit_setting(value: str) -> tuple[int, float]:
+	count, seconds = value.split("/", 1)
+	return int(count), float(seconds)
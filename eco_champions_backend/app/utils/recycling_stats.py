@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Iterable, Optional
+from sqlalchemy import func, update
+from ..database import db, upsert_insert
+from ..models import RecyclingLog, RecyclingMonthlyStat, User
+
+
+def month_key(when: Optional[datetime] = None) -> str:
+	# RecyclingLog.date defaults to utcnow, so months are UTC months
+	return (when or datetime.utcnow()).strftime("%Y-%m")
+
+
+def record_logs(user_id, entries: Iterable[tuple], when: Optional[datetime] = None) -> tuple[int, int]:
+	"""Fold ``(material_type, weight)`` entries into the user's counters. Does not commit.
+
+	Bumps User.recycling_log_count atomically and upserts the monthly per-material
+	rows, all in the caller's transaction. Returns ``(count_before, count_after)``.
+	"""
+	per_material: dict[str, list] = {}
+	for material, weight in entries:
+		agg = per_material.setdefault(material, [0, 0.0])
+		agg[0] += 1
+		agg[1] += weight or 0
+	n = sum(agg[0] for agg in per_material.values())
+	if not n:
+		return 0, 0
+
+	after = db.session.execute(
+		update(User)
+		.where(User.id == user_id)
+		.values(recycling_log_count=func.coalesce(User.recycling_log_count, 0) + n)
+		.returning(User.recycling_log_count)
+		.execution_options(synchronize_session=False)
+	).scalar()
+	if after is None:
+		raise ValueError("User not found")
+
+	stmt = upsert_insert(RecyclingMonthlyStat).values([
+		{"user_id": user_id, "month": month_key(when), "material_type": material, "log_count": count, "total_weight": weight}
+		for material, (count, weight) in per_material.items()
+	])
+	db.session.execute(stmt.on_conflict_do_update(
+		index_elements=["user_id", "month", "material_type"],
+		set_={
+			"log_count": RecyclingMonthlyStat.log_count + stmt.excluded.log_count,
+			"total_weight": RecyclingMonthlyStat.total_weight + stmt.excluded.total_weight,
+		},
+	))
+	return after - n, after
+
+
+def monthly_summary(user_id, month: Optional[str] = None) -> dict:
+	"""Monthly progress (total weight) and material pie chart from the aggregate rows."""
+	rows = RecyclingMonthlyStat.query.filter_by(user_id=user_id, month=month or month_key()).all()
+	total = sum(r.log_count for r in rows) or 1
+	return {
+		"monthlyProgress": round(sum(r.total_weight for r in rows), 2),
+		"pieChart": [{"material": r.material_type, "percent": round(r.log_count * 100.0 / total, 2)} for r in rows],
+	}
+
+
+def rebuild_stats(user_id) -> None:
+	"""Recompute a user's counter and aggregates from RecyclingLog. Does not commit."""
+	db.session.query(RecyclingMonthlyStat).filter_by(user_id=user_id).delete()
+	count = 0
+	per_key: dict[tuple, list] = {}
+	for material, weight, date in db.session.query(
+		RecyclingLog.material_type, RecyclingLog.weight, RecyclingLog.date
+	).filter(RecyclingLog.user_id == user_id):
+		agg = per_key.setdefault((month_key(date), material), [0, 0.0])
+		agg[0] += 1
+		agg[1] += weight or 0
+		count += 1
+	db.session.add_all([
+		RecyclingMonthlyStat(user_id=user_id, month=month, material_type=material, log_count=c, total_weight=w)
+		for (month, material), (c, w) in per_key.items()
+	])
+	db.session.execute(update(User).where(User.id == user_id).values(recycling_log_count=count))
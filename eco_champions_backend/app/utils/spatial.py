@@ -0,0 +1,37 @@
+from typing import Optional
+import numpy as np
+from sqlalchemy import and_, or_
+from ..models import User
+from .geo import geohash_cover, geohash_encode, haversine_matrix_km
+
+# Sorts after every geohash character, so [cell, cell + "{") is the cell's key range
+_CELL_END = "{"
+
+
+def set_user_location(user: User, lat: float, lon: float) -> None:
+	user.latitude = lat
+	user.longitude = lon
+	user.geohash = geohash_encode(lat, lon)
+
+
+def within_cells(query, lat: float, lon: float, radius_km: float):
+	"""Restrict ``query`` to users in the geohash cells covering the radius.
+	Each cell is an index range scan on User.geohash.
+	"""
+	cells = geohash_cover(lat, lon, radius_km)
+	if cells == [""]:
+		return query.filter(User.geohash.isnot(None))
+	return query.filter(or_(*[and_(User.geohash >= c, User.geohash < c + _CELL_END) for c in cells]))
+
+
+def nearby_users(lat: float, lon: float, radius_km: float, limit: Optional[int] = None, query=None) -> list[tuple[User, float]]:
+	"""Users within ``radius_km`` of (lat, lon), nearest first, as (user, distanceKm) pairs."""
+	candidates = within_cells(query if query is not None else User.query, lat, lon, radius_km).all()
+	if not candidates:
+		return []
+	dists = haversine_matrix_km([(lat, lon)], [(u.latitude, u.longitude) for u in candidates])[0]
+	order = np.argsort(dists, kind="stable")
+	order = order[dists[order] <= radius_km]
+	if limit is not None:
+		order = order[:limit]
+	return [(candidates[i], float(dists[i])) for i in order]
@@ -0,0 +1,48 @@
+import uuid
+from flask_jwt_extended import create_access_token, create_refresh_token
+from sqlalchemy import func, update
+from ..database import db
+from ..models import User
+from .user_cache import invalidate_profile_on_commit
+
+
+def issue_tokens(user: User) -> dict:
+	"""An access token plus a refresh token bound to token_version. Neither carries
+	premium, community or role: server-side checks read them from the profile cache
+	(decorators.caller_profile), so a change applies without reissuing tokens.
+	"""
+	ver = user.token_version or 0
+	return {
+		"token": create_access_token(identity=str(user.id)),
+		"refreshToken": create_refresh_token(identity=str(user.id), additional_claims={"ver": ver}),
+	}
+
+
+def token_revoked(jwt_header: dict, jwt_payload: dict) -> bool:
+	"""Blocklist loader: a refresh token is dead once the user's token_version moves past it.
+	Access tokens are not looked up; they stay stateless and lapse at JWT_ACCESS_TOKEN_EXPIRES.
+	"""
+	if jwt_payload.get("type") != "refresh":
+		return False
+	try:
+		user_id = uuid.UUID(str(jwt_payload["sub"]))
+	except (KeyError, ValueError):
+		return True
+	row = db.session.query(User.token_version).filter(User.id == user_id).first()
+	return row is None or (row.token_version or 0) != jwt_payload.get("ver", 0)
+
+
+def revoke_tokens(user_id, commit: bool = True) -> bool:
+	"""Invalidate every refresh token of ``user_id`` (sign out everywhere).
+	Returns False if there is no such user.
+	"""
+	updated = db.session.execute(
+		update(User)
+		.where(User.id == user_id)
+		.values(token_version=func.coalesce(User.token_version, 0) + 1)
+		.execution_options(synchronize_session="fetch")
+	).rowcount
+	invalidate_profile_on_commit(user_id)
+	if commit:
+		db.session.commit()
+	return bool(updated)
@@ -0,0 +1,99 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from ..config import Config
+from ..database import db
+from ..models import User
+
+
+class TTLCache:
+	"""Small thread-safe LRU map whose entries expire after ``ttl`` seconds."""
+
+	def __init__(self, ttl: float, maxsize: int = 10000):
+		self.ttl = ttl
+		self.maxsize = maxsize
+		self._data: OrderedDict = OrderedDict()
+		self._lock = threading.Lock()
+
+	def get(self, key):
+		with self._lock:
+			item = self._data.get(key)
+			if item is None:
+				return None
+			expires, value = item
+			if expires < time.monotonic():
+				del self._data[key]
+				return None
+			self._data.move_to_end(key)
+			return value
+
+	def set(self, key, value) -> None:
+		with self._lock:
+			self._data[key] = (time.monotonic() + self.ttl, value)
+			self._data.move_to_end(key)
+			while len(self._data) > self.maxsize:
+				self._data.popitem(last=False)
+
+	def invalidate(self, key) -> None:
+		with self._lock:
+			self._data.pop(key, None)
+
+	def clear(self) -> None:
+		with self._lock:
+			self._data.clear()
+
+
+# Hot, rarely-changing profile fields used by authorization checks
+profile_cache = TTLCache(Config.USER_CACHE_TTL_SECONDS)
+
+
+def cached_profile(user_id) -> Optional[dict]:
+	"""``{id, is_premium, community, role}`` for ``user_id``, or None if no such user.
+	Served from a short-TTL process cache; writers call ``invalidate_profile_on_commit``.
+	"""
+	key = str(user_id)
+	profile = profile_cache.get(key)
+	if profile is not None:
+		return profile
+	try:
+		user_id = uuid.UUID(key)
+	except ValueError:
+		return None
+	row = db.session.query(User.id, User.is_premium, User.community, User.role).filter(User.id == user_id).first()
+	if row is None:
+		return None
+	profile = {"id": row.id, "is_premium": bool(row.is_premium), "community": row.community, "role": row.role}
+	profile_cache.set(key, profile)
+	return profile
+
+
+def invalidate_profile_on_commit(*user_ids) -> None:
+	"""Stage invalidations on the current session; they run once it commits, so a
+	concurrent reader can't re-cache the pre-commit row after the eviction.
+	"""
+	db.session.info.setdefault("profile_invalidations", set()).update(str(uid) for uid in user_ids)
+
+
+@event.listens_for(Session, "before_flush")
+def _stage_changed_profiles(session, flush_context, instances):
+	# ORM writes to the cached fields (e.g. an upgrade to premium) evict on commit
+	for obj in session.dirty:
+		if isinstance(obj, User):
+			state = inspect(obj)
+			if any(state.attrs[name].history.has_changes() for name in ("is_premium", "community", "role")):
+				session.info.setdefault("profile_invalidations", set()).add(str(obj.id))
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_profile_invalidations(session):
+	for key in session.info.pop("profile_invalidations", ()):
+		profile_cache.invalidate(key)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_profile_invalidations(session):
+	session.info.pop("profile_invalidations", None)
@@ -1,4 +1,40 @@
+import math
+
+
 def require_fields(data: dict, fields: list[str]):
 	missing = [f for f in fields if f not in data or data.get(f) in (None, "")]
 	if missing:
 		raise ValueError(f"Missing fields: {', '.join(missing)}")
+
+
+def parse_weight(value) -> float:
+	"""A weight in kg: a finite, non-negative number. Raises ValueError otherwise."""
+	try:
+		weight = float(value)
+	except (TypeError, ValueError):
+		raise ValueError("weight must be a number")
+	if not math.isfinite(weight) or weight < 0:
+		raise ValueError("weight must be a finite, non-negative number")
+	return weight
+
+
+def parse_coordinates(lat, lon) -> tuple[float, float]:
+	"""(latitude, longitude) in degrees, within -90..90 and -180..180. Raises ValueError otherwise."""
+	try:
+		lat, lon = float(lat), float(lon)
+	except (TypeError, ValueError):
+		raise ValueError("latitude and longitude must be numbers")
+	if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+		raise ValueError("latitude must be within -90..90 and longitude within -180..180")
+	return lat, lon
+
+
+def parse_radius_km(value, default: float, maximum: float) -> float:
+	"""A search radius in km clamped to [0, maximum]. Raises ValueError if not a finite number."""
+	try:
+		radius = float(default if value is None else value)
+	except (TypeError, ValueError):
+		raise ValueError("radiusKm must be a number")
+	if not math.isfinite(radius):
+		raise ValueError("radiusKm must be a number")
+	return min(max(radius, 0.0), maximum)
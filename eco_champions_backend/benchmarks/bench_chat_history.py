@@ -0,0 +1,110 @@
+"""Benchmark opening a conversation: full OR-predicate history vs one keyset page.
+
+Usage: DATABASE_URL=... python -m benchmarks.bench_chat_history [--messages 1000000] [--users 2000]
+Defaults to a throwaway SQLite file. Half of the messages go to one hot
+conversation so the legacy query's cost is visible.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--messages", type=int, default=1000000)
+parser.add_argument("--users", type=int, default=2000)
+parser.add_argument("--limit", type=int, default=50)
+parser.add_argument("--repeat", type=int, default=20)
+args = parser.parse_args()
+
+if "DATABASE_URL" not in os.environ:
+	os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "chat.db")
+
+from sqlalchemy import and_, insert, or_  # noqa: E402
+from app import create_app  # noqa: E402  (config reads DATABASE_URL at import)
+from app.database import db  # noqa: E402
+from app.models import ChatMessage, User, conversation_key  # noqa: E402
+
+app = create_app()
+
+
+def seed():
+	rng = random.Random(0)
+	ids = [uuid.uuid4() for _ in range(args.users)]
+	db.session.execute(insert(User), [
+		{"id": uid, "name": f"u{i}", "email": f"u{i}@bench.local", "password_hash": "x"}
+		for i, uid in enumerate(ids)
+	])
+	hot = (ids[0], ids[1])
+	start = datetime.utcnow() - timedelta(days=365)
+	chunk = []
+	for i in range(args.messages):
+		if i % 2 == 0:
+			a, b = hot if rng.random() < 0.5 else hot[::-1]
+		else:
+			a, b = rng.sample(ids, 2)
+		chunk.append({
+			"id": uuid.uuid4(),
+			"sender_id": a,
+			"receiver_id": b,
+			"conversation_key": conversation_key(a, b),
+			"message": "hello there",
+			"timestamp": start + timedelta(seconds=i * 30),
+		})
+		if len(chunk) == 50000:
+			db.session.execute(insert(ChatMessage), chunk)
+			chunk = []
+	if chunk:
+		db.session.execute(insert(ChatMessage), chunk)
+	db.session.commit()
+	return hot
+
+
+def legacy(me, other):
+	return ChatMessage.query.filter(
+		((ChatMessage.sender_id == me) & (ChatMessage.receiver_id == other)) |
+		((ChatMessage.sender_id == other) & (ChatMessage.receiver_id == me))
+	).order_by(ChatMessage.timestamp.asc()).all()
+
+
+def keyset(me, other, before=None):
+	query = ChatMessage.query.filter(ChatMessage.conversation_key == conversation_key(me, other))
+	if before:
+		ts, msg_id = before
+		query = query.filter(or_(ChatMessage.timestamp < ts, and_(ChatMessage.timestamp == ts, ChatMessage.id < msg_id)))
+	return query.order_by(ChatMessage.timestamp.desc(), ChatMessage.id.desc()).limit(args.limit + 1).all()
+
+
+def timed(repeat, fn, *a):
+	best = float("inf")
+	rows = None
+	for _ in range(repeat):
+		db.session.expunge_all()
+		start = time.perf_counter()
+		rows = fn(*a)
+		best = min(best, time.perf_counter() - start)
+	return best, rows
+
+
+def main():
+	with app.app_context():
+		db.create_all()
+		started = time.perf_counter()
+		me, other = seed()
+		print(f"seeded {args.messages} messages in {time.perf_counter() - started:.1f}s")
+
+		# the legacy query materializes the whole history, so only time it once
+		t_legacy, rows = timed(1, legacy, me, other)
+		print(f"legacy full history: {len(rows)} rows, {t_legacy * 1000:.1f} ms")
+		t_first, page = timed(args.repeat, keyset, me, other)
+		print(f"keyset first page:   {min(len(page), args.limit)} rows, {t_first * 1000:.2f} ms")
+		oldest = page[args.limit - 1]
+		t_next, page = timed(args.repeat, keyset, me, other, (oldest.timestamp, oldest.id))
+		print(f"keyset next page:    {min(len(page), args.limit)} rows, {t_next * 1000:.2f} ms")
+		print(f"speedup (first page vs legacy): {t_legacy / t_first:.0f}x")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,69 @@
+"""Benchmark the NumPy k-means engine against the previous pure-Python loop.
+
+Usage: python -m benchmarks.bench_kmeans [--sizes 10000,100000,1000000] [--k 3]
+The legacy implementation is only timed up to --legacy-max points since it
+grows as users x k x iterations Python calls.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.utils.geo import haversine_km, kmeans_once
+
+
+def legacy_kmeans(points, k, iters=10):
+	centroids = points[:k] if len(points) >= k else points + [points[-1]] * (k - len(points))
+	clusters = [[] for _ in range(k)]
+	for _ in range(iters):
+		clusters = [[] for _ in range(k)]
+		for idx, p in enumerate(points):
+			dists = [haversine_km(p[0], p[1], c[0], c[1]) for c in centroids]
+			clusters[dists.index(min(dists))].append(idx)
+		new_centroids = []
+		for cluster in clusters:
+			if not cluster:
+				new_centroids.append(centroids[0])
+				continue
+			lat = sum(points[i][0] for i in cluster) / len(cluster)
+			lon = sum(points[i][1] for i in cluster) / len(cluster)
+			new_centroids.append((lat, lon))
+		centroids = new_centroids
+	return clusters
+
+
+def synthetic_points(n, seed=0):
+	"""Users scattered around a handful of city centres."""
+	rng = np.random.default_rng(seed)
+	centres = np.array([[28.61, 77.21], [19.08, 72.88], [12.97, 77.59], [22.57, 88.36], [13.08, 80.27]])
+	picks = centres[rng.integers(len(centres), size=n)]
+	pts = picks + rng.normal(scale=0.15, size=(n, 2))
+	return [tuple(p) for p in pts.tolist()]
+
+
+def timed(fn, *args):
+	start = time.perf_counter()
+	fn(*args)
+	return time.perf_counter() - start
+
+
+def main():
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--sizes", default="10000,100000,1000000")
+	parser.add_argument("--k", type=int, default=3)
+	parser.add_argument("--legacy-max", type=int, default=100000)
+	args = parser.parse_args()
+
+	print(f"{'points':>10} {'numpy (s)':>10} {'legacy (s)':>11} {'speedup':>8}")
+	for n in (int(s) for s in args.sizes.split(",")):
+		points = synthetic_points(n)
+		fast = timed(kmeans_once, points, args.k)
+		if n <= args.legacy_max:
+			slow = timed(legacy_kmeans, points, args.k)
+			print(f"{n:>10} {fast:>10.3f} {slow:>11.3f} {slow / fast:>7.1f}x")
+		else:
+			print(f"{n:>10} {fast:>10.3f} {'skipped':>11} {'-':>8}")
+
+
+if __name__ == "__main__":
+	main()
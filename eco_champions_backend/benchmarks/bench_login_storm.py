@@ -0,0 +1,81 @@
+"""Login storm: login throughput and event-loop (socket) latency, hashing inline vs offloaded.
+
+Usage: python -m benchmarks.bench_login_storm [--logins 200] [--concurrency 20]
+Runs ``--concurrency`` greenlets posting /api/auth/login while a probe greenlet
+sleeps 10 ms in a loop. The probe's oversleep is how long the eventlet hub was
+blocked, i.e. the extra delay every socket event would have seen.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--logins", type=int, default=200)
+parser.add_argument("--concurrency", type=int, default=20)
+parser.add_argument("--method", default=None, help="PASSWORD_HASH_METHOD to benchmark")
+args = parser.parse_args()
+
+if "DATABASE_URL" not in os.environ:
+	os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "logins.db")
+
+import eventlet  # noqa: E402
+import numpy as np  # noqa: E402
+from app import create_app  # noqa: E402  (config reads DATABASE_URL at import)
+from app.config import Config  # noqa: E402
+from app.database import db  # noqa: E402
+from app.models import User  # noqa: E402
+
+if args.method:
+	Config.PASSWORD_HASH_METHOD = args.method
+app = create_app()
+# measures hashing, not the login throttle
+app.config["RATE_LIMIT_ENABLED"] = False
+PROBE_INTERVAL = 0.01
+
+
+def run(label: str, offload: bool, users: int) -> None:
+	Config.PASSWORD_HASH_OFFLOAD = offload
+	client = app.test_client()
+	lags = []
+	done = [False]
+
+	def probe():
+		while not done[0]:
+			t = time.perf_counter()
+			eventlet.sleep(PROBE_INTERVAL)
+			lags.append(time.perf_counter() - t - PROBE_INTERVAL)
+
+	def login(i):
+		r = client.post("/api/auth/login", json={"email": f"u{i % users}@bench.local", "password": "pw"})
+		assert r.status_code == 200, (r.status_code, r.get_data(as_text=True)[:200])
+
+	prober = eventlet.spawn(probe)
+	pool = eventlet.GreenPool(args.concurrency)
+	started = time.perf_counter()
+	for _ in pool.imap(login, range(args.logins)):
+		pass
+	elapsed = time.perf_counter() - started
+	done[0] = True
+	prober.wait()
+	lag_ms = np.array(lags or [0.0]) * 1000
+	print(f"{label:>8}: {args.logins / elapsed:7.1f} logins/s   hub lag p50 {np.percentile(lag_ms, 50):7.1f} ms"
+		f"   p99 {np.percentile(lag_ms, 99):7.1f} ms   max {lag_ms.max():7.1f} ms")
+
+
+def main():
+	users = args.concurrency
+	with app.app_context():
+		db.create_all()
+		for i in range(users):
+			user = User(name=f"u{i}", email=f"u{i}@bench.local")
+			user.set_password("pw")
+			db.session.add(user)
+		db.session.commit()
+	print(f"method {Config.PASSWORD_HASH_METHOD}, {args.logins} logins, concurrency {args.concurrency}")
+	run("inline", False, users)
+	run("tpool", True, users)
+
+
+if __name__ == "__main__":
+	main()
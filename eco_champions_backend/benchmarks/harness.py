@@ -0,0 +1,266 @@
+"""End-to-end benchmark harness: seed synthetic data, drive the hot endpoints, keep a baseline.
+
+Usage:
+	python -m benchmarks.harness [--users 10000] [--logs-per-user 5] [--messages 100000]
+		[--projects 5000] [--requests 500] [--concurrency 8] [--sockets 200]
+		[--save baseline.json] [--compare baseline.json --tolerance 0.25]
+
+Runs offline against a throwaway SQLite file, or against any DATABASE_URL (e.g. a
+local Postgres) when set; --users/--messages scale the seed from 10k to 1M rows.
+For each scenario it reports throughput, p50/p99 latency and SQL statements per
+request (from the app's own metrics hooks). --save writes the results as JSON;
+--compare exits non-zero when a scenario's p99 grows past the tolerance or it
+runs more queries per request than the baseline.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--users", type=int, default=10000)
+parser.add_argument("--logs-per-user", type=int, default=5)
+parser.add_argument("--messages", type=int, default=100000)
+parser.add_argument("--projects", type=int, default=5000)
+parser.add_argument("--clusters", type=int, default=50)
+parser.add_argument("--requests", type=int, default=500, help="requests per HTTP scenario")
+parser.add_argument("--concurrency", type=int, default=8)
+parser.add_argument("--sockets", type=int, default=200)
+parser.add_argument("--socket-messages", type=int, default=1000)
+parser.add_argument("--seed", type=int, default=0)
+parser.add_argument("--save", help="write results to this JSON file")
+parser.add_argument("--compare", help="baseline JSON to check for regressions")
+parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p99 increase")
+args = parser.parse_args()
+
+if "DATABASE_URL" not in os.environ:
+	os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "harness.db")
+
+import numpy as np  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app import create_app, socketio  # noqa: E402  (config reads DATABASE_URL at import)
+from app.database import db  # noqa: E402
+from app.models import ChatMessage, Project, RecyclingLog, RecyclingMonthlyStat, User, conversation_key  # noqa: E402
+from app.utils.clustering import refresh_clusters  # noqa: E402
+from app.utils.geo import geohash_encode  # noqa: E402
+from app.utils.metrics import REQUEST_QUERIES  # noqa: E402
+from app.utils.tokens import issue_tokens  # noqa: E402
+
+app = create_app()
+app.config["RATE_LIMIT_ENABLED"] = False
+
+MATERIALS = ["plastic", "paper", "glass", "metal", "e-waste"]
+# (lat, lon) centres the synthetic users are scattered around
+CITIES = [(19.07, 72.87), (28.61, 77.21), (12.97, 77.59), (22.57, 88.36), (13.08, 80.27)]
+CHUNK = 20000
+# users that get tokens and drive the scenarios
+SAMPLE_SIZE = max(args.concurrency * 4, args.sockets, 50)
+
+
+def insert_chunked(model, rows):
+	for i in range(0, len(rows), CHUNK):
+		db.session.execute(insert(model), rows[i:i + CHUNK])
+
+
+def seed(rng: random.Random) -> tuple[list, list]:
+	started = time.perf_counter()
+	ids = [uuid.uuid4() for _ in range(args.users)]
+	users = []
+	for i, uid in enumerate(ids):
+		lat, lon = rng.choice(CITIES)
+		lat, lon = lat + rng.gauss(0, 0.2), lon + rng.gauss(0, 0.2)
+		users.append({
+			"id": uid, "name": f"user{i}", "email": f"user{i}@bench.local", "password_hash": "x",
+			"community": f"c{i % 100}", "latitude": lat, "longitude": lon, "geohash": geohash_encode(lat, lon),
+			"recycling_log_count": args.logs_per_user, "eco_coins": 0, "role": "Eco Learner",
+			# the driven sample users are premium so socket chat can cross communities
+			"is_premium": i < SAMPLE_SIZE,
+		})
+	insert_chunked(User, users)
+
+	# logs plus the monthly aggregates the stats endpoints read
+	now = datetime.utcnow()
+	logs, stats = [], {}
+	for uid in ids:
+		for _ in range(args.logs_per_user):
+			material, weight = rng.choice(MATERIALS), round(rng.uniform(0.1, 5), 2)
+			date = now - timedelta(days=rng.randint(0, 90))
+			logs.append({"id": uuid.uuid4(), "user_id": uid, "material_type": material, "weight": weight, "date": date})
+			key = (uid, date.strftime("%Y-%m"), material)
+			count, total = stats.get(key, (0, 0.0))
+			stats[key] = (count + 1, total + weight)
+	insert_chunked(RecyclingLog, logs)
+	insert_chunked(RecyclingMonthlyStat, [
+		{"user_id": uid, "month": month, "material_type": m, "log_count": n, "total_weight": w}
+		for (uid, month, m), (n, w) in stats.items()
+	])
+
+	insert_chunked(Project, [
+		{
+			"id": uuid.uuid4(), "title": f"Project {i}", "description": "Collect and sort recyclables. " * 20,
+			"goal_material": rng.choice(MATERIALS), "goal_weight": rng.uniform(50, 500), "collected_weight": 0,
+			"status": "Active", "days_left": rng.randint(1, 60), "created_by": rng.choice(ids),
+			"created_at": now - timedelta(minutes=i), "updated_at": now,
+		}
+		for i in range(args.projects)
+	])
+
+	# half of the messages in a few hot conversations (same community), the rest spread out
+	hot = []
+	for _ in range(10):
+		i = rng.randrange(len(ids) - 100)
+		hot.append((ids[i], ids[i + 100]))
+	messages = []
+	start = now - timedelta(days=30)
+	for i in range(args.messages):
+		a, b = rng.choice(hot) if i % 2 == 0 else rng.sample(ids, 2)
+		if rng.random() < 0.5:
+			a, b = b, a
+		messages.append({
+			"id": uuid.uuid4(), "sender_id": a, "receiver_id": b, "conversation_key": conversation_key(a, b),
+			"message": "hello there", "timestamp": start + timedelta(seconds=i),
+		})
+	insert_chunked(ChatMessage, messages)
+	db.session.commit()
+
+	refresh_clusters(args.clusters)
+	rows = len(users) + len(logs) + len(stats) + args.projects + args.messages
+	print(f"seeded {rows:,} rows in {time.perf_counter() - started:.1f}s ({db.engine.url.get_backend_name()})")
+	return ids, hot
+
+
+def run_http(name: str, method: str, rule: str, make_request) -> dict:
+	"""Fire --requests calls from --concurrency threads; make_request(i) -> (path, headers, json)."""
+	count0, queries0 = REQUEST_QUERIES.totals(method, rule)
+
+	def call(i):
+		path, headers, body = make_request(i)
+		client = app.test_client()
+		t = time.perf_counter()
+		r = client.open(path, method=method, headers=headers, json=body)
+		elapsed = time.perf_counter() - t
+		if r.status_code >= 400:
+			raise RuntimeError(f"{name}: {r.status_code} {r.get_data(as_text=True)[:200]}")
+		return elapsed
+
+	started = time.perf_counter()
+	with ThreadPoolExecutor(args.concurrency) as pool:
+		latencies = np.array(list(pool.map(call, range(args.requests))))
+	wall = time.perf_counter() - started
+	count1, queries1 = REQUEST_QUERIES.totals(method, rule)
+	return _result(name, latencies, wall, (queries1 - queries0) / max(count1 - count0, 1))
+
+
+def run_sockets(ids, tokens) -> dict:
+	"""Chat fan-out over --sockets connected clients: send with ack, measure ack latency."""
+	rng = random.Random(args.seed)
+	n = min(args.sockets, len(tokens))
+	clients = [socketio.test_client(app, auth={"token": tokens[i]}) for i in range(n)]
+	latencies = []
+	started = time.perf_counter()
+	for _ in range(args.socket_messages):
+		a, b = rng.sample(range(n), 2)
+		t = time.perf_counter()
+		ack = clients[a].emit("send_message", {"to": str(ids[b]), "message": "hi"}, callback=True)
+		latencies.append(time.perf_counter() - t)
+		if not ack or ack.get("error"):
+			raise RuntimeError(f"socket send failed: {ack}")
+	wall = time.perf_counter() - started
+	delivered = sum(len(c.get_received()) for c in clients)
+	for c in clients:
+		c.disconnect()
+	result = _result("socket send_message", np.array(latencies), wall, None)
+	result["events_delivered"] = delivered
+	return result
+
+
+def _result(name, latencies, wall, queries) -> dict:
+	result = {
+		"name": name,
+		"requests": int(len(latencies)),
+		"throughput_rps": round(len(latencies) / wall, 1),
+		"p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 2),
+		"p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 2),
+		"queries_per_request": None if queries is None else round(queries, 2),
+	}
+	qpr = "-" if queries is None else f"{queries:.1f}"
+	print(f"{name:<32} {result['throughput_rps']:>9.1f} req/s   p50 {result['p50_ms']:>8.2f} ms"
+		f"   p99 {result['p99_ms']:>8.2f} ms   queries/req {qpr:>5}")
+	return result
+
+
+def compare(results: list[dict], baseline_path: str) -> list[str]:
+	with open(baseline_path) as f:
+		baseline = {r["name"]: r for r in json.load(f)["results"]}
+	problems = []
+	for r in results:
+		base = baseline.get(r["name"])
+		if not base:
+			continue
+		if r["p99_ms"] > base["p99_ms"] * (1 + args.tolerance):
+			problems.append(f"{r['name']}: p99 {base['p99_ms']} -> {r['p99_ms']} ms")
+		if r["queries_per_request"] is not None and base.get("queries_per_request") is not None \
+				and r["queries_per_request"] > base["queries_per_request"] + 0.5:
+			problems.append(f"{r['name']}: queries/request {base['queries_per_request']} -> {r['queries_per_request']}")
+	return problems
+
+
+def main():
+	rng = random.Random(args.seed)
+	with app.app_context():
+		db.create_all()
+		ids, hot = seed(rng)
+		sample = ids[:SAMPLE_SIZE]
+		users = {u.id: u for u in User.query.filter(User.id.in_(sample))}
+		tokens = [issue_tokens(users[uid])["token"] for uid in sample]
+		hot_tokens = {}
+		for a, b in hot:
+			for uid in (a, b):
+				hot_tokens[uid] = issue_tokens(db.session.get(User, uid))["token"]
+
+	def auth(token):
+		return {"Authorization": f"Bearer {token}"}
+
+	results = [
+		run_http("POST /api/recycling/log", "POST", "/api/recycling/log", lambda i: (
+			"/api/recycling/log", auth(tokens[i % len(tokens)]),
+			{"materialType": MATERIALS[i % len(MATERIALS)], "weight": 1.5},
+		)),
+		run_http("GET /api/community/clusters", "GET", "/api/community/clusters", lambda i: (
+			"/api/community/clusters?radiusKm=5", auth(tokens[i % len(tokens)]), None,
+		)),
+		run_http("GET /api/chat/conversation", "GET", "/api/chat/conversation/<user_id>", lambda i: (
+			f"/api/chat/conversation/{hot[i % len(hot)][1]}", auth(hot_tokens[hot[i % len(hot)][0]]), None,
+		)),
+		run_http("GET /api/projects", "GET", "/api/projects", lambda i: (
+			"/api/projects?limit=50&fields=summary", auth(tokens[i % len(tokens)]), None,
+		)),
+		run_sockets(sample, tokens),
+	]
+
+	if args.save:
+		with open(args.save, "w") as f:
+			json.dump({
+				"created_at": datetime.utcnow().isoformat(),
+				"database": os.environ["DATABASE_URL"].split(":", 1)[0],
+				"params": vars(args),
+				"results": results,
+			}, f, indent=2)
+		print(f"saved {args.save}")
+	if args.compare:
+		problems = compare(results, args.compare)
+		for p in problems:
+			print("REGRESSION", p)
+		if problems:
+			sys.exit(1)
+		print(f"no regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+	main()
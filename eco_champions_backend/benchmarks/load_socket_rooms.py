@@ -0,0 +1,79 @@
+"""Socket.IO fan-out load test: room-targeted delivery vs the old global broadcast.
+
+Usage: python -m benchmarks.load_socket_rooms [--sockets 10000] [--messages 200]
+Connects ``--sockets`` in-process test clients (one user each, authenticated
+with a JWT), sends ``--messages`` chat messages between random pairs, and
+reports delivered events per second and events received per client.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--sockets", type=int, default=10000)
+parser.add_argument("--messages", type=int, default=200)
+parser.add_argument("--communities", type=int, default=50)
+args = parser.parse_args()
+
+if "DATABASE_URL" not in os.environ:
+	os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "sockets.db")
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+from app import create_app, socketio  # noqa: E402  (config reads DATABASE_URL at import)
+from app.database import db  # noqa: E402
+from app.models import User  # noqa: E402
+
+app = create_app()
+
+
+def drain(clients):
+	return sum(len(c.get_received()) for c in clients)
+
+
+def run(label, clients, ids, send):
+	drain(clients)
+	rng = random.Random(1)
+	started = time.perf_counter()
+	for _ in range(args.messages):
+		a, b = rng.sample(range(len(clients)), 2)
+		send(clients[a], ids[b])
+	delivered = drain(clients)
+	elapsed = time.perf_counter() - started
+	print(f"{label:>10}: {delivered} events delivered in {elapsed:.2f}s "
+		f"({delivered / elapsed:,.0f} events/s, {delivered / len(clients):.2f} per client, "
+		f"{args.messages / elapsed:,.0f} messages/s)")
+
+
+def main():
+	with app.app_context():
+		db.create_all()
+		ids = [uuid.uuid4() for _ in range(args.sockets)]
+		db.session.execute(insert(User), [
+			{"id": uid, "name": f"u{i}", "email": f"u{i}-{uid}@bench.local", "password_hash": "x", "community": f"c{i % args.communities}"}
+			for i, uid in enumerate(ids)
+		])
+		db.session.commit()
+		tokens = [create_access_token(identity=str(uid)) for uid in ids]
+
+	started = time.perf_counter()
+	clients = [socketio.test_client(app, auth={"token": t}) for t in tokens]
+	print(f"connected {len(clients)} sockets in {time.perf_counter() - started:.1f}s")
+
+	run("rooms", clients, ids, lambda c, to: c.emit("send_message", {"to": str(to), "message": "hi"}))
+
+	# the previous handler: every message broadcast to every connected socket
+	def broadcast(c, to):
+		with app.test_request_context("/"):
+			socketio.emit("receive_message", {"to": str(to), "message": "hi"})
+	run("broadcast", clients, ids, broadcast)
+
+	for c in clients:
+		c.disconnect()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,73 @@
+"""Concurrency stress test for coin awards: no increment may be lost.
+
+Usage: DATABASE_URL=postgresql+psycopg://... python -m benchmarks.stress_coins [--workers 200] [--awards 5]
+Defaults to a throwaway SQLite file. Each worker thread awards ``--awards`` coins
+one at a time to the same user; every award must succeed and the final balance
+and ledger size must match.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--workers", type=int, default=200)
+parser.add_argument("--awards", type=int, default=5)
+args = parser.parse_args()
+
+if "DATABASE_URL" not in os.environ:
+	os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "stress.db")
+
+from app import create_app  # noqa: E402  (config reads DATABASE_URL at import)
+from app.database import db  # noqa: E402
+from app.models import CoinTransaction, User  # noqa: E402
+from app.utils.coin_manager import award_coins  # noqa: E402
+
+app = create_app()
+
+
+def main():
+	with app.app_context():
+		db.create_all()
+		user = User(name="stress", email=f"stress-{time.time_ns()}@example.com", password_hash="x", eco_coins=0)
+		db.session.add(user)
+		db.session.commit()
+		user_id = user.id
+
+	start_gate = threading.Barrier(args.workers)
+	errors = []
+
+	def worker():
+		with app.app_context():
+			start_gate.wait()
+			for _ in range(args.awards):
+				try:
+					award_coins(user_id, 1, "Stress")
+				except Exception as e:
+					db.session.rollback()
+					errors.append(e)
+
+	threads = [threading.Thread(target=worker) for _ in range(args.workers)]
+	started = time.perf_counter()
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	elapsed = time.perf_counter() - started
+
+	with app.app_context():
+		user = db.session.get(User, user_id)
+		ledger = CoinTransaction.query.filter_by(user_id=user_id).count()
+		expected = args.workers * args.awards
+		print(f"{args.workers} workers x {args.awards} awards in {elapsed:.2f}s, {len(errors)} failed")
+		print(f"expected {expected} coins, balance {user.eco_coins}, ledger rows {ledger}, role {user.role}")
+		if errors:
+			raise SystemExit(f"FAILED AWARDS: {len(errors)}, first: {errors[0]!r}")
+		if user.eco_coins != expected or ledger != expected:
+			raise SystemExit("LOST UPDATES")
+		print("OK: no lost coins")
+
+
+if __name__ == "__main__":
+	main()
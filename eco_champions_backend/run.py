@@ -1,7 +1,14 @@
+import os
 from app import create_app, socketio
+from app.utils.clustering import start_cluster_refresher
+from app.utils.mail_queue import start_mail_workers
 
 app = create_app()
 
 if __name__ == "__main__":
-	# For Socket.IO dev server use eventlet or gevent if installed
+	# the reloader re-runs this file in a child process; start the jobs only there
+	if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+		start_cluster_refresher(app)
+		start_mail_workers(app)
+	# Development server (debugger, reloader); production runs serve.py
 	socketio.run(app, host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,134 @@
+"""Production entry point: eventlet WSGI server without the debugger or reloader.
+
+Usage: python serve.py [--host 0.0.0.0] [--port 5000] [--workers 1] [--no-jobs]
+Defaults come from Config (SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_GREENLETS).
+
+Each worker is one eventlet process serving up to SERVER_GREENLETS concurrent
+connections. With --workers N > 1, workers listen on ports port..port+N-1 and must
+sit behind a load balancer with sticky sessions (Socket.IO polling requires it),
+with REDIS_URL set so emits reach sockets held by other workers. Behind a load
+balancer, set PROXY_FIX_HOPS so per-IP rate limits see client addresses.
+
+The background jobs run in worker 0 only; the other workers get --no-jobs. Mail
+delivery runs on every host, as each host queues mail in its own outbox file; when
+several hosts run serve.py, set SERVER_RUN_JOBS=0 on all but one of them so the
+cluster refresh runs once.
+
+On SIGTERM/SIGINT a worker stops accepting connections, tells connected sockets
+"server_shutdown" and disconnects them (clients reconnect to another worker), then
+exits with status 0 as soon as in-flight requests have finished, or with status 1
+if some are still running after SHUTDOWN_GRACE_SECONDS.
+"""
+import eventlet
+
+eventlet.monkey_patch()
+
+import argparse  # noqa: E402
+import logging  # noqa: E402
+import os  # noqa: E402
+import signal  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from eventlet import wsgi  # noqa: E402
+from app import create_app, socketio  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.utils.clustering import start_cluster_refresher  # noqa: E402
+from app.utils.mail_queue import start_mail_workers  # noqa: E402
+
+
+def disconnect_sockets(app) -> int:
+	"""Notify and disconnect every socket held by this worker; returns how many."""
+	try:
+		sids = [sid for sid, _ in socketio.server.manager.get_participants("/", None)]
+	except KeyError:
+		# nobody has connected to this worker yet
+		sids = []
+	socketio.emit("server_shutdown", {"reconnect": True})
+	for sid in sids:
+		socketio.server.disconnect(sid, namespace="/")
+	return len(sids)
+
+
+def serve(host: str, port: int, run_jobs: bool = True) -> None:
+	app = create_app()
+	if run_jobs:
+		if app.config["SERVER_RUN_JOBS"]:
+			start_cluster_refresher(app)
+		start_mail_workers(app)
+
+	listener = eventlet.listen((host, port))
+	# one greenlet per connection; its running count is the number of in-flight requests
+	pool = eventlet.GreenPool(app.config["SERVER_GREENLETS"])
+	server = eventlet.spawn(wsgi.server, listener, app, custom_pool=pool, log_output=False)
+	draining = []
+
+	def drain():
+		app.logger.info("Shutting down: draining worker on port %d", port)
+		count = disconnect_sockets(app)
+		app.logger.info("Disconnected %d sockets", count)
+		# let the socket writer greenlets flush the notice and close frames
+		eventlet.sleep(1)
+		# the accept loop exits on SystemExit and closes idle keep-alive connections;
+		# the server greenlet finishes, ending the main loop, once the pool is empty
+		server.kill(SystemExit)
+		deadline = time.monotonic() + app.config["SHUTDOWN_GRACE_SECONDS"]
+		while pool.running() and time.monotonic() < deadline:
+			eventlet.sleep(0.1)
+		if pool.running():
+			app.logger.warning(
+				"%d requests still running after %ss; exiting anyway",
+				pool.running(), app.config["SHUTDOWN_GRACE_SECONDS"],
+			)
+			os._exit(1)
+
+	def on_signal(signum, frame):
+		if not draining:
+			draining.append(eventlet.spawn(drain))
+
+	signal.signal(signal.SIGTERM, on_signal)
+	signal.signal(signal.SIGINT, on_signal)
+
+	# short sleeps keep the hub waking up: a signal handler only runs between its waits,
+	# and the drain greenlet it spawns would otherwise wait for the next network event
+	while not server.dead:
+		eventlet.sleep(0.5)
+	app.logger.info("Worker on port %d stopped", port)
+
+
+def supervise(host: str, port: int, workers: int, run_jobs: bool = True) -> int:
+	"""Run ``workers`` single-worker processes and forward shutdown signals to them.
+	Only the first runs the background jobs.
+	"""
+	if not Config.SOCKETIO_MESSAGE_QUEUE:
+		sys.exit("--workers > 1 needs REDIS_URL so sockets on different workers can reach each other")
+	procs = [
+		subprocess.Popen(
+			[sys.executable, __file__, "--host", host, "--port", str(port + i), "--workers", "1"]
+			+ ([] if run_jobs and i == 0 else ["--no-jobs"])
+		)
+		for i in range(workers)
+	]
+
+	def forward(signum, frame):
+		for p in procs:
+			if p.poll() is None:
+				p.send_signal(signum)
+
+	signal.signal(signal.SIGTERM, forward)
+	signal.signal(signal.SIGINT, forward)
+	return max(p.wait() for p in procs)
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser()
+	parser.add_argument("--host", default=Config.SERVER_HOST)
+	parser.add_argument("--port", type=int, default=Config.SERVER_PORT)
+	parser.add_argument("--workers", type=int, default=Config.SERVER_WORKERS)
+	parser.add_argument("--no-jobs", action="store_true", help="do not run the background jobs in this process")
+	args = parser.parse_args()
+	run_jobs = not args.no_jobs
+	logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s [%(process)d] %(message)s")
+	if args.workers > 1:
+		sys.exit(supervise(args.host, args.port, args.workers, run_jobs))
+	serve(args.host, args.port, run_jobs)
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Config reads the environment at import, so this must run before the app is imported.
+# TEST_DATABASE_URL points the suite at a scratch Postgres database instead of SQLite.
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["JWT_SECRET_KEY"] = "test-jwt-secret-" + "x" * 32
+os.environ["RATE_LIMIT_ENABLED"] = "0"
+os.environ.pop("MAIL_SERVER", None)
+
+from app import create_app  # noqa: E402
+from app.database import db  # noqa: E402
+from app.utils.leaderboard import leaderboards  # noqa: E402
+from app.utils.user_cache import profile_cache  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def app():
+	app = create_app()
+	app.config["TESTING"] = True
+	return app
+
+
+@pytest.fixture(autouse=True)
+def database(app):
+	with app.app_context():
+		db.create_all()
+	# process-wide caches would otherwise outlive the tables
+	leaderboards.mark_stale()
+	profile_cache.clear()
+	yield
+	with app.app_context():
+		db.session.remove()
+		db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+	return app.test_client()
+
+
+@pytest.fixture
+def signup(client):
+	"""Create a user through the API; returns (access token, user id)."""
+
+	def make(name=None, community="c1"):
+		name = name or f"user-{uuid.uuid4().hex[:8]}"
+		r = client.post("/api/auth/signup", json={
+			"name": name, "email": f"{name}@example.com", "password": "pw", "community": community,
+		})
+		assert r.status_code == 201, r.get_json()
+		data = r.get_json()
+		return data["token"], data["user"]["id"]
+
+	return make
+
+
+def auth(token, **headers):
+	return {"Authorization": f"Bearer {token}", **headers}
+
+
+@pytest.fixture
+def outbox(tmp_path, monkeypatch):
+	"""Mail configured against a fresh outbox file; returns the MailQueue."""
+	from app.config import Config
+	import app.utils.mail_queue as mail_queue
+
+	monkeypatch.setattr(Config, "MAIL_SERVER", "127.0.0.1")
+	monkeypatch.setattr(Config, "MAIL_DEFAULT_SENDER", "noreply@example.com")
+	queue = mail_queue.MailQueue(str(tmp_path / "outbox.db"), max_attempts=3, retry_base_seconds=30)
+	monkeypatch.setattr(mail_queue, "_queue", queue)
+	return queue
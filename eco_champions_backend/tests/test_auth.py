@@ -0,0 +1,40 @@
+import uuid
+from datetime import timedelta
+
+from flask_jwt_extended import decode_token
+
+from app.database import db
+from app.models import User
+from conftest import auth
+
+
+def _set_premium(app, user_id, value):
+	with app.app_context():
+		db.session.get(User, uuid.UUID(user_id)).is_premium = value
+		db.session.commit()
+
+
+def test_access_tokens_last_the_default_and_carry_no_profile_claims(app, signup):
+	token, _ = signup()
+	with app.app_context():
+		claims = decode_token(token)
+	assert timedelta(seconds=claims["exp"] - claims["iat"]) == timedelta(days=7)
+	assert not {"premium", "community", "role"} & set(claims)
+
+
+def test_premium_follows_the_database_not_the_token(app, client, signup):
+	token, user_id = signup()
+	assert client.get("/api/chat/global", headers=auth(token)).status_code == 403
+	_set_premium(app, user_id, True)
+	assert client.get("/api/chat/global", headers=auth(token)).status_code == 200
+	_set_premium(app, user_id, False)
+	assert client.get("/api/chat/global", headers=auth(token)).status_code == 403
+
+
+def test_revoke_kills_refresh_tokens(client):
+	r = client.post("/api/auth/signup", json={"name": "r", "email": "r@example.com", "password": "pw"})
+	tokens = r.get_json()
+	refreshed = client.post("/api/auth/refresh", headers=auth(tokens["refreshToken"]))
+	assert refreshed.status_code == 200
+	assert client.post("/api/auth/revoke", headers=auth(tokens["token"])).status_code == 200
+	assert client.post("/api/auth/refresh", headers=auth(tokens["refreshToken"])).status_code == 401
@@ -0,0 +1,69 @@
+import threading
+
+from app.database import db
+from app.models import ChatMessage
+from app.utils.chat_writer import MessageWriter, new_message_row
+
+
+def _write_concurrently(app, writer, rows):
+	gate = threading.Barrier(len(rows))
+	results = [None] * len(rows)
+
+	def write(i):
+		with app.app_context():
+			gate.wait()
+			results[i] = writer.write(rows[i])
+
+	threads = [threading.Thread(target=write, args=(i,)) for i in range(len(rows))]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+	return results
+
+
+def _count_flushes(writer, monkeypatch):
+	flushes = []
+	flush = writer._flush
+
+	def counting(batch):
+		flushes.append(len(batch.rows))
+		flush(batch)
+
+	monkeypatch.setattr(writer, "_flush", counting)
+	return flushes
+
+
+def test_concurrent_writes_share_commits(app, signup, monkeypatch):
+	(_, a), (_, b) = signup(), signup()
+	writer = MessageWriter(window_ms=50, max_batch=500)
+	flushes = _count_flushes(writer, monkeypatch)
+	rows = [new_message_row(a, b, f"m{i}") for i in range(20)]
+
+	assert _write_concurrently(app, writer, rows) == [None] * 20
+	assert sum(flushes) == 20 and len(flushes) < 20
+	with app.app_context():
+		assert ChatMessage.query.count() == 20
+
+
+def test_batches_are_capped_at_max_batch(app, signup, monkeypatch):
+	(_, a), (_, b) = signup(), signup()
+	writer = MessageWriter(window_ms=50, max_batch=4)
+	flushes = _count_flushes(writer, monkeypatch)
+	rows = [new_message_row(a, b, f"m{i}") for i in range(12)]
+
+	assert _write_concurrently(app, writer, rows) == [None] * 12
+	assert max(flushes) <= 4
+
+
+def test_failed_batch_reports_error_to_every_writer(app, signup):
+	(_, a), (_, b) = signup(), signup()
+	# a wide window so all five land in one batch
+	writer = MessageWriter(window_ms=300)
+	rows = [new_message_row(a, b, f"m{i}") for i in range(5)]
+	rows[-1]["id"] = rows[0]["id"]  # primary key clash fails the whole insert
+
+	results = _write_concurrently(app, writer, rows)
+	assert all(results)
+	with app.app_context():
+		assert db.session.query(ChatMessage).count() == 0
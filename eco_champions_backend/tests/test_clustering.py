@@ -0,0 +1,54 @@
+import uuid
+
+from app.database import db
+from app.models import CommunityCluster, User
+from app.utils.clustering import refresh_clusters
+from conftest import auth
+
+
+def _place(client, token, lat, lon):
+	r = client.post("/api/community/location", json={"latitude": lat, "longitude": lon}, headers=auth(token))
+	assert r.status_code == 200
+
+
+def _assignments(app, ids):
+	with app.app_context():
+		return {i: db.session.get(User, uuid.UUID(i)).cluster_id for i in ids}
+
+
+def test_cluster_ids_stable_with_fewer_users_than_k(app, client, signup):
+	(t1, u1), (t2, u2) = signup(), signup()
+	_place(client, t1, 51.5, -0.1)
+	_place(client, t2, 40.7, -74.0)
+	with app.app_context():
+		refresh_clusters(3)
+		assert CommunityCluster.query.count() == 2
+	before = _assignments(app, [u1, u2])
+	with app.app_context():
+		assert refresh_clusters(3) == 0
+	assert _assignments(app, [u1, u2]) == before
+
+	# a third user far from both gets the new cluster; the others keep theirs
+	t3, u3 = signup()
+	_place(client, t3, -33.9, 151.2)
+	with app.app_context():
+		refresh_clusters(3)
+		assert CommunityCluster.query.count() == 3
+	after = _assignments(app, [u1, u2, u3])
+	assert {u1: after[u1], u2: after[u2]} == before
+	assert after[u3] not in before.values()
+
+
+def test_clusters_503_until_seeded(client, signup):
+	token, _ = signup()
+	_place(client, token, 51.5, -0.1)
+	r = client.get("/api/community/clusters", headers=auth(token))
+	assert r.status_code == 503 and r.headers["Retry-After"] == "30"
+
+
+def test_refresh_cli_seeds_clusters(app, client, signup):
+	token, _ = signup()
+	_place(client, token, 51.5, -0.1)
+	result = app.test_cli_runner().invoke(args=["community", "refresh-clusters"])
+	assert "Reassigned 1 users" in result.output
+	assert client.get("/api/community/clusters", headers=auth(token)).status_code == 200
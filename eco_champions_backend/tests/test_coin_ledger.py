@@ -0,0 +1,102 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app.database import db
+from app.models import CoinDailyRollup, CoinTransaction
+from app.utils.coin_ledger import (
+	_month_windows, _partition_name, _table_exists, archive_before, convert_to_partitioned, earned_summary,
+	ensure_partitions, history_page, is_partitioned,
+)
+from app.utils.coin_manager import award_coins_bulk
+
+
+def _postgres(app):
+	with app.app_context():
+		return db.engine.dialect.name == "postgresql"
+
+
+@pytest.fixture
+def postgres(app):
+	if not _postgres(app):
+		pytest.skip("partitioning needs TEST_DATABASE_URL pointing at Postgres")
+
+
+def _raw(user_id, amount, when):
+	# ledger rows written without their rollups, as before the rollup backfill
+	db.session.add(CoinTransaction(user_id=uuid.UUID(user_id), amount=amount, reason="old", timestamp=when))
+
+
+def test_month_windows_split_at_month_boundaries():
+	assert list(_month_windows(datetime(2025, 12, 15), datetime(2026, 2, 10))) == [
+		(datetime(2025, 12, 15), datetime(2026, 1, 1)),
+		(datetime(2026, 1, 1), datetime(2026, 2, 1)),
+		(datetime(2026, 2, 1), datetime(2026, 2, 10)),
+	]
+	assert list(_month_windows(datetime(2026, 3, 1), datetime(2026, 3, 1))) == []
+
+
+def test_archive_compacts_old_rows_into_rollups(app, signup):
+	_, alice = signup()
+	old = datetime.utcnow().replace(hour=12) - timedelta(days=60)
+	older = old - timedelta(days=40)
+	with app.app_context():
+		_raw(alice, 3, old)
+		_raw(alice, 4, old + timedelta(hours=1))
+		_raw(alice, 5, older)
+		db.session.commit()
+		award_coins_bulk([(alice, 2, "recent")])
+
+		assert archive_before(datetime.utcnow() - timedelta(days=30)) == 3
+		rows, cursor = history_page(uuid.UUID(alice), limit=10)
+		assert [(r.amount, r.reason) for r in rows] == [(2, "recent")] and cursor is None
+		rollups = {r.day: (r.total, r.tx_count) for r in CoinDailyRollup.query.all()}
+		assert rollups[old.date()] == (7, 2) and rollups[older.date()] == (5, 1)
+		assert earned_summary(uuid.UUID(alice))["today"] == 2
+		assert archive_before(datetime.utcnow() - timedelta(days=30)) == 0
+
+
+def test_sqlite_ledger_is_never_partitioned(app):
+	if _postgres(app):
+		pytest.skip("SQLite only")
+	with app.app_context():
+		assert is_partitioned() is False
+
+
+def test_partitioned_archive_drops_whole_months(app, signup, postgres):
+	_, alice = signup()
+	this_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+	year_ago = this_month.replace(year=this_month.year - 1)
+	with app.app_context():
+		_raw(alice, 3, year_ago + timedelta(days=2))
+		_raw(alice, 4, year_ago + timedelta(days=3))
+		db.session.commit()
+		assert convert_to_partitioned(months_ahead=1) == 2
+		assert is_partitioned()
+		name = _partition_name(year_ago)
+		assert _table_exists(name)
+
+		assert archive_before(year_ago + timedelta(days=40)) == 2
+		assert not _table_exists(name)
+		assert CoinTransaction.query.count() == 0
+		assert db.session.get(CoinDailyRollup, (uuid.UUID(alice), (year_ago + timedelta(days=2)).date())).total == 3
+
+
+def test_ensure_partitions_moves_rows_out_of_the_default(app, signup, postgres):
+	_, alice = signup()
+	with app.app_context():
+		convert_to_partitioned(months_ahead=0)
+		ahead = datetime.utcnow().replace(day=1) + timedelta(days=95)
+		_raw(alice, 6, ahead)
+		db.session.commit()
+		assert db.session.execute(text("SELECT count(*) FROM coin_transaction_default")).scalar() == 1
+
+		created = ensure_partitions(months_ahead=4)
+		db.session.commit()
+		name = _partition_name(ahead)
+		assert name in created
+		assert db.session.execute(text(f"SELECT count(*) FROM {name}")).scalar() == 1
+		assert db.session.execute(text("SELECT count(*) FROM coin_transaction_default")).scalar() == 0
+		assert CoinTransaction.query.one().amount == 6
@@ -0,0 +1,61 @@
+import threading
+import uuid
+
+from app.database import db
+from app.models import CoinTransaction, User
+from app.utils.coin_manager import award_coins_bulk
+
+
+def test_bulk_award_sums_per_user_and_skips_unknown(app, signup):
+	_, alice = signup()
+	_, bob = signup()
+	with app.app_context():
+		result = award_coins_bulk([(alice, 5, "a"), (bob, 3, "b"), (alice, 2, "c"), (uuid.uuid4(), 9, "ghost")])
+		assert {str(uid): coins for uid, (coins, _) in result.items()} == {alice: 7, bob: 3}
+		assert CoinTransaction.query.filter(CoinTransaction.user_id.isnot(None)).count() == 3
+
+
+def test_bulk_award_rolls_back_as_a_unit(app, signup):
+	_, alice = signup()
+	with app.app_context():
+		award_coins_bulk([(alice, 5, "a")], commit=False)
+		db.session.rollback()
+		assert db.session.get(User, uuid.UUID(alice)).eco_coins == 0
+		assert CoinTransaction.query.count() == 0
+
+
+def test_concurrent_bulk_awards_lose_nothing(app, signup):
+	_, alice = signup()
+	_, bob = signup()
+	workers, rounds = 8, 5
+	gate = threading.Barrier(workers)
+	errors = []
+
+	def worker():
+		gate.wait()
+		for _ in range(rounds):
+			with app.app_context():
+				try:
+					award_coins_bulk([(alice, 1, "a"), (bob, 2, "b")])
+				except Exception as e:
+					errors.append(e)
+
+	threads = [threading.Thread(target=worker) for _ in range(workers)]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+
+	assert errors == []
+	with app.app_context():
+		assert db.session.get(User, uuid.UUID(alice)).eco_coins == workers * rounds
+		assert db.session.get(User, uuid.UUID(bob)).eco_coins == 2 * workers * rounds
+		assert CoinTransaction.query.count() == 2 * workers * rounds
+
+
+def test_role_follows_the_new_balance(app, signup):
+	_, alice = signup()
+	with app.app_context():
+		assert award_coins_bulk([(alice, 9, "a")])[uuid.UUID(alice)] == (9, "Eco Learner")
+		assert award_coins_bulk([(alice, 1, "a")])[uuid.UUID(alice)] == (10, "Eco Explorer")
+		assert award_coins_bulk([(alice, 60, "a")])[uuid.UUID(alice)] == (70, "Eco Enabler")
@@ -0,0 +1,99 @@
+import threading
+from contextlib import closing
+
+from app.database import db
+from app.models import Event, EventRegistration
+from conftest import auth
+
+
+def _create(client, token, **body):
+	r = client.post("/api/events/create", json=body, headers=auth(token))
+	assert r.status_code == 201
+	return r.get_json()["eventId"]
+
+
+def test_unknown_event_is_created_unlimited_and_unowned(app, client, signup):
+	token, _ = signup()
+	r = client.post("/api/events/register", json={"eventId": "1", "free": True, "title": "Park cleanup"}, headers=auth(token))
+	assert r.status_code == 200
+	assert r.get_json()["capacity"] is None
+	with app.app_context():
+		event = db.session.get(Event, "1")
+		assert (event.title, event.created_by, event.registered_count) == ("Park cleanup", None, 1)
+
+
+def test_create_ignores_client_chosen_id(client, signup):
+	token, _ = signup()
+	event_id = _create(client, token, eventId="1", capacity=0)
+	assert event_id != "1"
+	other, _ = signup()
+	assert client.post("/api/events/register", json={"eventId": "1", "free": True}, headers=auth(other)).status_code == 200
+
+
+def test_concurrent_registrations_never_exceed_capacity(app, signup):
+	owner, _ = signup()
+	capacity, attendees = 5, 20
+	event_id = _create(app.test_client(), owner, capacity=capacity)
+	tokens = [signup()[0] for _ in range(attendees)]
+	gate = threading.Barrier(attendees)
+	statuses = []
+
+	def register(token):
+		c = app.test_client()
+		gate.wait()
+		statuses.append(c.post("/api/events/register", json={"eventId": event_id, "free": True}, headers=auth(token)).status_code)
+
+	threads = [threading.Thread(target=register, args=(t,)) for t in tokens]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+
+	assert sorted(statuses) == [200] * capacity + [409] * (attendees - capacity)
+	with app.app_context():
+		assert db.session.get(Event, event_id).registered_count == capacity
+		assert EventRegistration.query.filter_by(event_id=event_id).count() == capacity
+
+
+def test_repeat_registration_takes_one_seat(client, signup):
+	owner, _ = signup()
+	event_id = _create(client, owner, capacity=2)
+	token, _ = signup()
+	body = {"eventId": event_id, "free": True}
+	assert client.post("/api/events/register", json=body, headers=auth(token)).get_json()["registeredCount"] == 1
+	assert client.post("/api/events/register", json=body, headers=auth(token)).get_json()["alreadyRegistered"] is True
+
+
+def test_only_creator_changes_capacity(client, signup):
+	owner, _ = signup()
+	other, _ = signup()
+	event_id = _create(client, owner, capacity=1)
+	assert client.post("/api/events/register", json={"eventId": event_id, "free": True}, headers=auth(other)).status_code == 200
+
+	assert client.patch(f"/api/events/{event_id}", json={"capacity": 5}, headers=auth(other)).status_code == 403
+	assert client.patch(f"/api/events/{event_id}", json={"capacity": 0}, headers=auth(owner)).status_code == 409
+	r = client.patch(f"/api/events/{event_id}", json={"capacity": 5}, headers=auth(owner))
+	assert r.status_code == 200 and r.get_json()["capacity"] == 5
+
+
+def test_operator_sets_capacity_of_unowned_event(app, client, signup):
+	first, _ = signup()
+	client.post("/api/events/register", json={"eventId": "7", "free": True}, headers=auth(first))
+	runner = app.test_cli_runner()
+	assert runner.invoke(args=["events", "set-capacity", "7", "0"]).exit_code != 0
+	assert runner.invoke(args=["events", "set-capacity", "7", "1"]).exit_code == 0
+	second, _ = signup()
+	assert client.post("/api/events/register", json={"eventId": "7", "free": True}, headers=auth(second)).status_code == 409
+
+
+def test_confirmation_is_queued_only_for_a_seat(client, signup, outbox):
+	owner, _ = signup()
+	event_id = _create(client, owner, title="Beach cleanup", capacity=1)
+	first, _ = signup("first")
+	second, _ = signup("second")
+	client.post("/api/events/register", json={"eventId": event_id, "free": True}, headers=auth(first))
+	assert client.post("/api/events/register", json={"eventId": event_id, "free": True}, headers=auth(second)).status_code == 409
+
+	with closing(outbox._connect()) as conn:
+		rows = conn.execute("SELECT to_email, body FROM outbox").fetchall()
+	assert rows == [("first@example.com", "Thank you for registering for Beach cleanup. See you there!")]
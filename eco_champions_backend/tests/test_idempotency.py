@@ -0,0 +1,81 @@
+import pytest
+
+from app.utils.idempotency import MemoryIdempotencyStore
+from conftest import auth
+
+
+def test_repeat_replays_stored_response(client, signup):
+	token, _ = signup()
+	headers = auth(token, **{"Idempotency-Key": "award-1"})
+	first = client.post("/api/eco/award", json={"amount": 5}, headers=headers)
+	again = client.post("/api/eco/award", json={"amount": 5}, headers=headers)
+
+	assert first.status_code == again.status_code == 200
+	assert again.get_json() == first.get_json()
+	assert again.headers.get("Idempotent-Replayed") == "true"
+	assert "Idempotent-Replayed" not in first.headers
+	profile = client.get("/api/user/profile", headers=auth(token)).get_json()
+	assert profile["ecoCoins"] == first.get_json()["ecoCoins"]
+
+
+def test_key_reused_with_different_body_is_422(client, signup):
+	token, _ = signup()
+	headers = auth(token, **{"Idempotency-Key": "award-2"})
+	assert client.post("/api/eco/award", json={"amount": 5}, headers=headers).status_code == 200
+	r = client.post("/api/eco/award", json={"amount": 6}, headers=headers)
+	assert r.status_code == 422
+
+
+def test_keys_are_scoped_to_the_caller(client, signup):
+	alice, _ = signup()
+	bob, _ = signup()
+	r1 = client.post("/api/eco/award", json={"amount": 5}, headers=auth(alice, **{"Idempotency-Key": "same"}))
+	r2 = client.post("/api/eco/award", json={"amount": 5}, headers=auth(bob, **{"Idempotency-Key": "same"}))
+	assert r1.status_code == r2.status_code == 200
+	assert "Idempotent-Replayed" not in r2.headers
+
+
+def test_store_reports_request_in_progress():
+	store = MemoryIdempotencyStore(ttl=60)
+	assert store.reserve("k", "fp") is None
+	assert store.reserve("k", "fp") == {"fp": "fp"}
+	store.release("k")
+	assert store.reserve("k", "fp") is None
+
+
+def test_failure_after_commit_is_not_run_again(client, signup, monkeypatch):
+	import app.routes.eco_score as eco_score
+
+	token, _ = signup()
+	headers = auth(token, **{"Idempotency-Key": "award-3"})
+
+	def broken(*args, **kwargs):
+		raise RuntimeError("response failed")
+
+	monkeypatch.setattr(eco_score, "jsonify", broken)
+	with pytest.raises(RuntimeError):
+		client.post("/api/eco/award", json={"amount": 4}, headers=headers)
+	monkeypatch.undo()
+
+	retry = client.post("/api/eco/award", json={"amount": 4}, headers=headers)
+	assert retry.status_code == 500
+	assert retry.headers.get("Idempotent-Replayed") == "true"
+	assert client.get("/api/user/profile", headers=auth(token)).get_json()["ecoCoins"] == 4
+
+
+def test_failure_before_commit_frees_the_key(client, signup, monkeypatch):
+	import app.routes.eco_score as eco_score
+
+	token, _ = signup()
+	headers = auth(token, **{"Idempotency-Key": "award-4"})
+
+	def broken(*args, **kwargs):
+		raise RuntimeError("database down")
+
+	monkeypatch.setattr(eco_score, "award_coins_bulk", broken)
+	with pytest.raises(RuntimeError):
+		client.post("/api/eco/award", json={"amount": 4}, headers=headers)
+	monkeypatch.undo()
+
+	retry = client.post("/api/eco/award", json={"amount": 4}, headers=headers)
+	assert retry.status_code == 200 and retry.get_json()["ecoCoins"] == 4
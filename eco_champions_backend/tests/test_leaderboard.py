@@ -0,0 +1,28 @@
+from app.utils.leaderboard import leaderboards
+from conftest import auth
+
+
+def test_award_updates_loaded_board(client, signup):
+	token, user_id = signup()
+	assert client.get("/api/eco/leaderboard", headers=auth(token)).status_code == 200
+	client.post("/api/eco/award", json={"amount": 7}, headers=auth(token))
+	r = client.get("/api/eco/leaderboard", headers=auth(token)).get_json()
+	assert r["me"] == {"rank": 1, "score": 7}
+
+
+def test_leaderboard_failure_does_not_fail_committed_award(client, signup, monkeypatch):
+	token, _ = signup()
+
+	def broken(changes):
+		raise ConnectionError("redis down")
+
+	monkeypatch.setattr(leaderboards, "apply", broken)
+	headers = auth(token, **{"Idempotency-Key": "lb-1"})
+	first = client.post("/api/eco/award", json={"amount": 3}, headers=headers)
+	again = client.post("/api/eco/award", json={"amount": 3}, headers=headers)
+
+	assert first.status_code == again.status_code == 200
+	assert client.get("/api/user/profile", headers=auth(token)).get_json()["ecoCoins"] == 3
+	monkeypatch.undo()
+	# the boards were marked stale, so the next read rebuilds from the committed rows
+	assert client.get("/api/eco/leaderboard", headers=auth(token)).get_json()["me"]["score"] == 3
@@ -0,0 +1,67 @@
+import smtplib
+
+import app.utils.mail_queue as mail_queue
+from app.utils.mail_queue import deliver_batch, enqueue_mail
+
+
+class FakeSMTP:
+	"""Records sends; ``fail`` maps a recipient to the exception its send raises."""
+
+	def __init__(self, fail=None):
+		self.fail = fail or {}
+		self.sent = []
+		self.closed = 0
+
+	def send(self, msg):
+		error = self.fail.get(msg["To"])
+		if error:
+			raise error
+		self.sent.append(msg["To"])
+
+	def close(self):
+		self.closed += 1
+
+
+def test_unreachable_server_stops_the_batch(outbox):
+	for i in range(4):
+		outbox.enqueue(f"u{i}@example.com", "s", "b")
+	smtp = FakeSMTP({"u1@example.com": smtplib.SMTPServerDisconnected("gone")})
+	assert deliver_batch(outbox, smtp, 10) == 4
+	assert smtp.sent == ["u0@example.com"]
+	# u1 backs off; u2 and u3 stay leased and are not retried on this pass
+	assert outbox.counts() == {"sent": 1, "pending": 3}
+	assert outbox.claim(10) == []
+
+
+def test_refused_message_does_not_stop_the_batch(outbox):
+	for i in range(3):
+		outbox.enqueue(f"u{i}@example.com", "s", "b")
+	smtp = FakeSMTP({"u1@example.com": smtplib.SMTPRecipientsRefused({"u1@example.com": (550, b"no")})})
+	deliver_batch(outbox, smtp, 10)
+	assert smtp.sent == ["u0@example.com", "u2@example.com"]
+	assert smtp.closed == 0
+
+
+def test_claim_leases_messages_until_expiry(outbox, monkeypatch):
+	outbox.enqueue("a@example.com", "s", "b")
+	assert len(outbox.claim(10, lease_seconds=60)) == 1
+	assert outbox.claim(10) == []
+	now = mail_queue.time.time()
+	monkeypatch.setattr(mail_queue.time, "time", lambda: now + 61)
+	assert len(outbox.claim(10)) == 1
+
+
+def test_failures_back_off_then_go_dead(outbox, monkeypatch):
+	msg_id = outbox.enqueue("a@example.com", "s", "b")
+	now = mail_queue.time.time()
+	outbox.mark_failed(msg_id, 0, "boom")
+	assert outbox.claim(10) == []
+	# first retry after retry_base_seconds (30 s, +/- 20% jitter)
+	monkeypatch.setattr(mail_queue.time, "time", lambda: now + 37)
+	assert [row[0] for row in outbox.claim(10)] == [msg_id]
+	outbox.mark_failed(msg_id, 2, "boom")
+	assert outbox.counts() == {"dead": 1}
+
+
+def test_enqueue_needs_mail_configured():
+	assert enqueue_mail("a@example.com", "s", "b") == "Mail server not configured"
@@ -0,0 +1,90 @@
+import threading
+import uuid
+
+from app.database import db
+from app.models import CoinTransaction, Project
+from conftest import auth
+
+
+def _create(client, token, material="plastic", goal=10, title="p"):
+	r = client.post("/api/projects/create", json={
+		"title": title, "description": "d", "goalMaterial": material, "goalWeight": goal, "daysLeft": 3,
+	}, headers=auth(token))
+	assert r.status_code == 201
+	return r.get_json()["id"]
+
+
+def test_listing_is_keyset_paginated_newest_first(client, signup):
+	token, _ = signup()
+	ids = [_create(client, token, title=f"p{i}") for i in range(5)]
+	seen, cursor = [], None
+	while True:
+		r = client.get("/api/projects?limit=2" + (f"&cursor={cursor}" if cursor else ""), headers=auth(token)).get_json()
+		seen += [p["id"] for p in r["projects"]]
+		cursor = r["nextCursor"]
+		if not cursor:
+			break
+	assert seen == ids[::-1]
+
+
+def test_filters_and_summary_fields(client, signup):
+	token, _ = signup()
+	glass = _create(client, token, material="glass")
+	_create(client, token, material="plastic")
+	r = client.get("/api/projects?material=glass&fields=summary", headers=auth(token)).get_json()
+	assert [p["id"] for p in r["projects"]] == [glass]
+	assert "description" not in r["projects"][0]
+
+
+def test_etag_answers_304_until_something_changes(client, signup):
+	token, _ = signup()
+	project_id = _create(client, token)
+	first = client.get("/api/projects", headers=auth(token))
+	etag = first.headers["ETag"]
+	assert client.get("/api/projects", headers=auth(token, **{"If-None-Match": etag})).status_code == 304
+
+	client.post(f"/api/projects/participate/{project_id}", json={"contributedWeight": 1}, headers=auth(token))
+	changed = client.get("/api/projects", headers=auth(token, **{"If-None-Match": etag}))
+	assert changed.status_code == 200 and changed.headers["ETag"] != etag
+
+
+def test_backfill_fills_missing_updated_at(app, client, signup):
+	token, _ = signup()
+	_create(client, token)
+	with app.app_context():
+		db.session.execute(Project.__table__.update().values(updated_at=None))
+		db.session.commit()
+	result = app.test_cli_runner().invoke(args=["projects", "backfill-updated-at"])
+	assert "Backfilled 1 projects" in result.output
+	with app.app_context():
+		project = Project.query.one()
+		assert project.updated_at == project.created_at
+
+
+def test_concurrent_joins_complete_the_project_once(app, signup):
+	owner, _ = signup()
+	project_id = _create(app.test_client(), owner, goal=5)
+	joiners = [signup() for _ in range(10)]
+	gate = threading.Barrier(len(joiners))
+	results = []
+
+	def join(token):
+		c = app.test_client()
+		gate.wait()
+		r = c.post(f"/api/projects/participate/{project_id}", json={"contributedWeight": 1}, headers=auth(token))
+		results.append((r.status_code, r.get_json()))
+
+	threads = [threading.Thread(target=join, args=(t,)) for t, _ in joiners]
+	for t in threads:
+		t.start()
+	for t in threads:
+		t.join()
+
+	assert [status for status, _ in results] == [200] * 10
+	assert sum(body["completed"] for _, body in results) == 1
+	with app.app_context():
+		project = db.session.get(Project, uuid.UUID(project_id))
+		assert (project.collected_weight, project.status) == (10, "Completed")
+		completion = CoinTransaction.query.filter_by(reason="Complete Project").count()
+	# only those who had joined when the goal was crossed, each rewarded once
+	assert completion == 5
@@ -0,0 +1,56 @@
+import pytest
+
+import app.utils.rate_limit as rate_limit
+from app.utils.rate_limit import MemoryBuckets
+
+
+def test_bucket_allows_burst_then_rejects():
+	buckets = MemoryBuckets()
+	assert [buckets.take("k", 1.0, 3) for _ in range(3)] == [0, 0, 0]
+	wait = buckets.take("k", 1.0, 3)
+	assert 0 < wait <= 1.0
+
+
+def test_bucket_refills_at_rate(monkeypatch):
+	now = [1000.0]
+	monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+	buckets = MemoryBuckets()
+	for _ in range(2):
+		buckets.take("k", 0.5, 2)
+	assert buckets.take("k", 0.5, 2) == pytest.approx(2.0)
+	now[0] += 2.0
+	assert buckets.take("k", 0.5, 2) == 0
+
+
+def test_refund_is_capped_at_burst():
+	buckets = MemoryBuckets()
+	buckets.take("k", 1.0, 1)
+	buckets.refund("k", 1)
+	buckets.refund("k", 1)
+	assert buckets.take("k", 1.0, 1) == 0
+	assert buckets.take("k", 1.0, 1) > 0
+
+
+def test_lru_eviction_bounds_memory():
+	buckets = MemoryBuckets(maxsize=2)
+	for key in ("a", "b", "c"):
+		buckets.take(key, 1.0, 1)
+	assert list(buckets._buckets) == ["b", "c"]
+
+
+def test_rejected_email_does_not_spend_ip_token(app, client, monkeypatch):
+	monkeypatch.setattr(rate_limit, "_store", MemoryBuckets())
+	monkeypatch.setitem(app.config, "RATE_LIMIT_ENABLED", True)
+	monkeypatch.setitem(app.config, "LOGIN_LIMIT_PER_IP", "3/60")
+	monkeypatch.setitem(app.config, "LOGIN_LIMIT_PER_EMAIL", "1/60")
+
+	def login(email):
+		return client.post("/api/auth/login", json={"email": email, "password": "wrong"}).status_code
+
+	assert login("a@example.com") == 401
+	r = client.post("/api/auth/login", json={"email": "a@example.com", "password": "wrong"})
+	assert r.status_code == 429 and int(r.headers["Retry-After"]) >= 1
+	# the throttled attempts above left the IP bucket with two tokens
+	assert login("b@example.com") == 401
+	assert login("c@example.com") == 401
+	assert login("d@example.com") == 429
@@ -0,0 +1,91 @@
+import uuid
+
+import pytest
+
+from app.database import db, upsert_insert
+from app.models import RecyclingMonthlyStat
+from app.utils.recycling_stats import monthly_summary, rebuild_stats
+from conftest import auth
+
+
+def _log(client, token, material, weight):
+	return client.post("/api/recycling/log", json={"materialType": material, "weight": weight}, headers=auth(token))
+
+
+def test_log_updates_monthly_stats_incrementally(app, client, signup):
+	token, user_id = signup()
+	for material, weight in [("Plastic", 1.5), ("plastic", 2), ("Glass", 0.5)]:
+		assert _log(client, token, material, weight).status_code == 201
+
+	stats = client.get("/api/recycling/stats", headers=auth(token)).get_json()
+	assert stats["totalLogs"] == 3
+	assert stats["monthlyProgress"] == 4.0
+	assert {p["material"]: p["percent"] for p in stats["pieChart"]} == {"plastic": 66.67, "glass": 33.33}
+	with app.app_context():
+		assert RecyclingMonthlyStat.query.count() == 2
+		incremental = monthly_summary(uuid.UUID(user_id))
+		rebuild_stats(uuid.UUID(user_id))
+		db.session.commit()
+		assert monthly_summary(uuid.UUID(user_id)) == incremental
+
+
+def test_every_third_log_earns_the_bonus(client, signup):
+	token, _ = signup()
+	coins = [_log(client, token, "paper", 1).get_json()["ecoCoins"] for _ in range(3)]
+	assert coins == [5, 10, 30]
+
+
+@pytest.mark.parametrize("weight", ["nan", "inf", -1, "abc"])
+def test_log_rejects_bad_weight(client, signup, weight):
+	token, _ = signup()
+	assert _log(client, token, "paper", weight).status_code == 400
+	assert client.get("/api/recycling/stats", headers=auth(token)).get_json()["totalLogs"] == 0
+
+
+def test_upsert_names_supported_databases(app, monkeypatch):
+	with app.app_context():
+		monkeypatch.setattr(db.session.get_bind().dialect, "name", "mysql")
+		with pytest.raises(RuntimeError, match="postgresql, sqlite"):
+			upsert_insert(RecyclingMonthlyStat)
+
+
+def test_bulk_accepts_good_rows_and_reports_bad_ones(client, signup):
+	token, _ = signup()
+	assert _log(client, token, "plastic", 1).status_code == 201
+	entries = [
+		{"materialType": "Plastic", "weight": 2},
+		{"materialType": "glass", "weight": "inf"},
+		{"materialType": "glass"},
+		{"materialType": "Glass", "weight": 1},
+		"junk",
+		{"materialType": "paper", "weight": 3},
+	]
+	r = client.post("/api/recycling/bulk", json={"entries": entries}, headers=auth(token))
+	assert r.status_code == 201
+	body = r.get_json()
+	assert (body["accepted"], body["rejected"], body["bonuses"]) == (3, 3, 1)
+	assert [row["status"] for row in body["rows"]] == ["ok", "error", "error", "ok", "error", "ok"]
+	# 4 logs at 5 coins plus one bonus at the third
+	assert body["ecoCoins"] == 4 * 5 + 15
+
+	stats = client.get("/api/recycling/stats", headers=auth(token)).get_json()
+	assert stats["totalLogs"] == 4
+	assert stats["monthlyProgress"] == 7.0
+	assert {p["material"]: p["percent"] for p in stats["pieChart"]} == {"plastic": 50.0, "glass": 25.0, "paper": 25.0}
+
+
+@pytest.mark.parametrize("mimetype, body", [
+	("text/csv", "materialType,weight,photo\nplastic,1,\nglass,2,\n"),
+	("application/x-ndjson", '{"materialType": "plastic", "weight": 1}\n\n{"materialType": "glass", "weight": 2}\n'),
+])
+def test_bulk_streams_csv_and_ndjson(client, signup, mimetype, body):
+	token, _ = signup()
+	r = client.post("/api/recycling/bulk", data=body, content_type=mimetype, headers=auth(token))
+	assert r.status_code == 201 and r.get_json()["accepted"] == 2
+
+
+def test_bulk_with_no_valid_rows_is_400(client, signup):
+	token, _ = signup()
+	r = client.post("/api/recycling/bulk", json=[{"materialType": "glass", "weight": "nan"}], headers=auth(token))
+	assert r.status_code == 400
+	assert client.get("/api/recycling/stats", headers=auth(token)).get_json()["totalLogs"] == 0
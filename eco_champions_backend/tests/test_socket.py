@@ -0,0 +1,40 @@
+from app import socketio
+
+
+def _connect(app, token):
+	return socketio.test_client(app, auth={"token": token})
+
+
+def test_connect_requires_access_token(app, signup):
+	assert not _connect(app, "not-a-token").is_connected()
+	token, _ = signup()
+	client = _connect(app, token)
+	assert client.is_connected()
+	client.disconnect()
+
+
+def test_message_reaches_only_sender_and_recipient(app, signup):
+	(ta, a), (tb, b), (tc, _) = signup(), signup(), signup()
+	ca, cb, cc = _connect(app, ta), _connect(app, tb), _connect(app, tc)
+	for c in (ca, cb, cc):
+		c.get_received()
+
+	ack = ca.emit("send_message", {"to": b, "message": "hi"}, callback=True)
+	assert "id" in ack
+
+	def delivered(client):
+		return [e["args"][0] for e in client.get_received() if e["name"] == "receive_message"]
+
+	assert [m["message"] for m in delivered(cb)] == ["hi"]
+	assert [m["from"] for m in delivered(ca)] == [a]
+	assert delivered(cc) == []
+	for c in (ca, cb, cc):
+		c.disconnect()
+
+
+def test_free_users_cannot_message_other_communities(app, signup):
+	(ta, _), (_, b) = signup(community="north"), signup(community="south")
+	ca = _connect(app, ta)
+	ack = ca.emit("send_message", {"to": b, "message": "hi"}, callback=True)
+	assert ack == {"error": "Free users can only chat within community"}
+	ca.disconnect()
@@ -0,0 +1,35 @@
+import pytest
+
+from conftest import auth
+
+
+def _place(client, token, lat, lon):
+	return client.post("/api/community/location", json={"latitude": lat, "longitude": lon}, headers=auth(token))
+
+
+@pytest.mark.parametrize("lat, lon", [(200, 0), (0, 181), ("abc", 0), (0, [1])])
+def test_location_rejects_bad_coordinates(client, signup, lat, lon):
+	token, _ = signup()
+	assert _place(client, token, lat, lon).status_code == 400
+
+
+def test_nearby_is_ordered_and_bounded_by_radius(client, signup):
+	me, _ = signup()
+	near, near_id = signup()
+	mid, mid_id = signup()
+	far, _ = signup()
+	_place(client, me, 51.5000, -0.1000)
+	_place(client, near, 51.5010, -0.1000)
+	_place(client, mid, 51.5300, -0.1000)
+	_place(client, far, 48.8566, 2.3522)
+
+	users = client.get("/api/community/nearby?radiusKm=10", headers=auth(me)).get_json()["users"]
+	assert [u["id"] for u in users] == [near_id, mid_id]
+	assert users[0]["distanceKm"] < users[1]["distanceKm"] <= 10
+
+
+@pytest.mark.parametrize("path", ["/api/community/nearby?radiusKm=abc", "/api/community/clusters?radiusKm=abc", "/api/community/clusters?radiusKm=nan"])
+def test_radius_must_be_a_number(client, signup, path):
+	token, _ = signup()
+	_place(client, token, 51.5, -0.1)
+	assert client.get(path, headers=auth(token)).status_code == 400
@@ -0,0 +1,54 @@
+import uuid
+
+from app.database import db
+from app.models import User
+from app.utils.coin_manager import award_coins_bulk
+from app.utils.user_cache import cached_profile, profile_cache
+
+
+def test_cached_profile_reads_and_caches(app, signup):
+	_, alice = signup(community="north")
+	with app.app_context():
+		profile = cached_profile(alice)
+		assert (str(profile["id"]), profile["is_premium"], profile["community"]) == (alice, False, "north")
+		assert profile_cache.get(alice) is profile
+		assert cached_profile(uuid.uuid4()) is None
+
+
+def test_invalid_id_keeps_pending_work(app, signup):
+	_, alice = signup()
+	with app.app_context():
+		user = db.session.get(User, uuid.UUID(alice))
+		user.name = "renamed"
+		assert cached_profile("not-a-uuid") is None
+		db.session.commit()
+		db.session.expire_all()
+		assert db.session.get(User, uuid.UUID(alice)).name == "renamed"
+
+
+def test_premium_change_evicts_only_on_commit(app, signup):
+	_, alice = signup()
+	with app.app_context():
+		cached_profile(alice)
+		user = db.session.get(User, uuid.UUID(alice))
+		user.is_premium = True
+		db.session.flush()
+		assert profile_cache.get(alice) is not None
+		db.session.rollback()
+		assert cached_profile(alice)["is_premium"] is False
+
+		db.session.get(User, uuid.UUID(alice)).is_premium = True
+		db.session.commit()
+		assert profile_cache.get(alice) is None
+		assert cached_profile(alice)["is_premium"] is True
+
+
+def test_award_evicts_on_commit(app, signup):
+	_, alice = signup()
+	with app.app_context():
+		cached_profile(alice)
+		award_coins_bulk([(alice, 5, "a")], commit=False)
+		db.session.rollback()
+		assert profile_cache.get(alice) is not None
+		award_coins_bulk([(alice, 5, "a")])
+		assert profile_cache.get(alice) is None